@@ -1,40 +1,152 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Query
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import List, Optional
 from contextlib import asynccontextmanager
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-import joblib
-import pandas as pd
-import numpy as np
+import functools
+import threading
 from datetime import datetime, timedelta
 import os
 from pathlib import Path
 import warnings
 
+from forecasting import (
+    FEATURE_NAMES,
+    get_risk_level,
+    build_horizon_climate,
+    build_weekly_forecast,
+    forecast_weeks,
+    score_batch,
+)
+from inference import InferenceExecutor, InferenceSaturated
+from feature_pipeline import DEFAULT_BARANGAYS
+from barangay_registry import BarangayRegistry, BARANGAY_REGISTRY_PATH
+from model_bundle import load_model_bundle, model_files_signature
+from forecast_cache import ForecastCache
+from climatology import Climatology
+from risk_grid import build_risk_grid, RISK_GRID_DAYS, RISK_GRID_REFRESH_HOURS
+from case_store import CaseReportStore, CaseReportWriter, RISK_KEYS
+from retrain_jobs import RetrainJobManager
+from ingest import ingest_csv, iter_upload_rows, CSVValidationError
+from columnar_store import HISTORY_FORMAT, HISTORY_DIR, append_csv, load_history_frame
+from metrics import (
+    METRICS_ENABLED,
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    REGISTRY as metrics_registry,
+    BATCH_ROWS,
+    RISK_GRID_LOOKUPS,
+    MetricsMiddleware,
+    loop_lag_probe,
+    record_stages,
+)
+from profiling import (
+    PROFILE_ENABLED,
+    PROFILE_ADMIN_TOKEN,
+    PROFILE_MODES,
+    RequestProfiler,
+    ProfilingMiddleware,
+)
+
 # Suppress sklearn version warnings
 warnings.filterwarnings('ignore', category=UserWarning)
 
-# Optimized lifespan - preload model at startup for faster responses
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    print("🚀 Starting mosKITA API...")
-    print("📦 Pre-loading model for faster responses...")
-    # Preload model synchronously at startup
+# "blocking" (default): load the model before the server starts accepting requests.
+# "background": bind immediately and answer liveness probes while the scientific
+# stack and the model are loaded by a warm-up task (see /ready).
+WARMUP_MODE = os.getenv("WARMUP_MODE", "blocking").lower()
+warmup_state = {
+    "ready": False,
+    "stage": "starting",
+    "started_at": None,
+    "duration_seconds": None,
+    "error": None,
+}
+
+def warm_up():
+    """Import the scientific stack and load the model + historical climate"""
+    import time
+    start_time = time.time()
+    warmup_state["started_at"] = datetime.now().isoformat()
     try:
+        warmup_state["stage"] = "importing"
+        import numpy  # noqa: F401
+        import pandas  # noqa: F401
+        warmup_state["stage"] = "loading_model"
         load_model()
         load_historical_climate()
-        if model is not None:
+        if model_bundle is not None:
             print("✅ Model pre-loaded successfully!")
         else:
             print("⚠️  Model will load on first request")
     except Exception as e:
+        warmup_state["error"] = str(e)
         print(f"⚠️  Model pre-load failed: {e}")
         print("⚠️  Model will load on first request")
+    warmup_state["duration_seconds"] = round(time.time() - start_time, 3)
+    warmup_state["stage"] = "done"
+    warmup_state["ready"] = model_bundle is not None
+
+def preload():
+    """
+    Load everything read-only in a pre-fork parent (gunicorn preload_app, see
+    gunicorn.conf.py) so workers share it copy-on-write instead of each
+    loading its own copy. The workers' own warm-up then finds it loaded.
+    """
+    import gc
+    warm_up()
+    if STORAGE_BACKEND != "sqlite":
+        # The JSONL index is worth sharing; SQLite is read on demand by each worker
+        case_store.refresh()
+    gc.collect()
+    # Objects that exist now are never scanned by the collector again, so the
+    # workers do not write to (and un-share) their pages
+    gc.freeze()
+    print(f"✅ Preloaded for workers ({gc.get_freeze_count()} objects frozen)")
+
+# Optimized lifespan - preload model at startup for faster responses
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global server_loop
+    print("🚀 Starting mosKITA API...")
+    server_loop = asyncio.get_running_loop()
+    if barangay_registry is None:
+        # Off the loop before serving, not lazily inside the first request
+        await asyncio.to_thread(refresh_barangay_registry)
+    if WARMUP_MODE == "background":
+        print("📦 Warming up in the background (liveness probes are answered right away)...")
+        warmup_task = asyncio.create_task(asyncio.to_thread(warm_up))
+    else:
+        print("📦 Pre-loading model for faster responses...")
+        # Preload model synchronously at startup
+        warm_up()
+        warmup_task = None
+    if STORAGE_BACKEND == "sqlite":
+        # One-shot import of the flat files into an empty database
+        migration = case_store.migrate_from_files(CASE_REPORTS_PATH, DATA_DIR)
+        if not migration.get("skipped"):
+            print(f"✅ Migrated files into SQLite: {migration}")
+    # Index existing case reports once; later reads only pick up appended lines
+    case_store.refresh()
+    print(f"✅ Indexed {len(case_store)} case reports")
+    case_writer.start()
+    # Materialize the default-climate risk grid in the background
+    grid_task = asyncio.create_task(risk_grid_loop()) if RISK_GRID_DAYS > 0 else None
+    # Hot-reload the model when retraining (in any worker) replaces its files
+    watch_task = asyncio.create_task(model_watch_loop()) if MODEL_WATCH_SECONDS > 0 else None
+    lag_task = asyncio.create_task(loop_lag_probe()) if METRICS_ENABLED else None
+    request_profiler.start()
     yield
     print("👋 Shutting down mosKITA API...")
+    # Commit reports that are still queued before exiting
+    await case_writer.close()
+    await retrain_jobs.close()
+    request_profiler.stop()
+    for task in (warmup_task, grid_task, watch_task, lag_task):
+        if task is not None:
+            task.cancel()
+    inference_executor.shutdown()
 
 app = FastAPI(
     title="mosKITA API", 
@@ -68,66 +180,129 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency histograms for /metrics (not installed at all when disabled)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Sampled request profiles (see profiling.py); only installed if it can ever be switched on
+request_profiler = RequestProfiler()
+if PROFILE_ENABLED or PROFILE_ADMIN_TOKEN:
+    app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
+
 # Load model
-MODEL_PATH = Path(__file__).parent.parent / "rf_dengue_model.pkl"
-ENCODER_PATH = Path(__file__).parent.parent / "barangay_encoder.pkl"
-CLIMATE_DATA_PATH = Path(__file__).parent.parent / "climate.csv"
-model = None
-barangay_encoder = None
-historical_climate = None  # Cache historical climate data
-feature_names = ['rainfall', 'temperature', 'humidity', 'barangay_encoded']  # Includes barangay!
+MODEL_PATH = Path(os.getenv("MODEL_PATH", Path(__file__).parent.parent / "rf_dengue_model.pkl"))
+ENCODER_PATH = Path(os.getenv("ENCODER_PATH", Path(__file__).parent.parent / "barangay_encoder.pkl"))
+CLIMATE_DATA_PATH = Path(os.getenv("CLIMATE_DATA_PATH", Path(__file__).parent.parent / "climate.csv"))
+DENGUE_DATA_PATH = Path(os.getenv("DENGUE_DATA_PATH", Path(__file__).parent.parent / "dengue_cases.csv"))
+# How often workers look for climate uploads saved by other workers
+CLIMATOLOGY_REFRESH_SECONDS = float(os.getenv("CLIMATOLOGY_REFRESH_SECONDS", 60))
+# "pickle" (default) unpickles the files above; "mmap" maps the exported .npy artifact instead
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "pickle").lower()
+MODEL_ARTIFACT_DIR = Path(os.getenv("MODEL_ARTIFACT_DIR", Path(__file__).parent.parent / "model_artifact"))
+model_bundle = None  # ModelBundle being served (model, encoder, version); replaced in one assignment on reload
+model_load_lock = threading.Lock()
+model_failed_signature = None  # Files that failed to load, not retried until they change again
+# How often each worker checks whether the model files were replaced (0 disables hot reload)
+MODEL_WATCH_SECONDS = float(os.getenv("MODEL_WATCH_SECONDS", 5))
+climatology = Climatology()  # Running weekly/monthly climate means (see load_historical_climate)
+climatology_checked_at = 0.0
+climate_areas = (None, None, {})  # (climatology version, registry, canonical name -> climatology name)
+inference_executor = InferenceExecutor()  # All model calls run here, off the event loop
+forecast_cache = ForecastCache()  # Weekly forecasts keyed on barangay/date/climate/model_version
+risk_grid = None  # Precomputed default-climate forecasts (see refresh_risk_grid)
+barangay_registry = None  # BarangayRegistry for the served model (see refresh_barangay_registry)
+risk_grid_stale = asyncio.Event()  # Set to rebuild the grid early (e.g. after retraining); loop only
+server_loop = None  # The event loop serving requests (set in lifespan), see mark_risk_grid_stale
+# Encoded default-climate /predict/all-barangays bodies, keyed on grid, registry, model, climatology
+# and start date; the same inputs give the same bytes, so repeated dashboard loads skip the JSON encoding
+all_barangays_responses = {}
+ALL_BARANGAYS_RESPONSES_MAX = 64
+feature_names = FEATURE_NAMES  # Includes barangay!
+# Uploads, case reports and other mutable data (overridable, e.g. for benchmarks on synthetic data)
+DATA_DIR = Path(os.getenv("DATA_DIR", Path(__file__).parent / "data"))
+CASE_REPORTS_PATH = Path(os.getenv("CASE_REPORTS_PATH", DATA_DIR / "case_reports.jsonl"))
+# "files" (default): case_reports.jsonl + CSV files; "sqlite": indexed SQLite database (see sqlite_store.py)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "files").lower()
+if STORAGE_BACKEND == "sqlite":
+    from sqlite_store import SQLiteStore, SQLITE_PATH
+    case_store = SQLiteStore(SQLITE_PATH)
+else:
+    case_store = CaseReportStore(CASE_REPORTS_PATH)  # Recency index + running analytics over case_reports.jsonl
+case_writer = CaseReportWriter(case_store)  # Group-commits /report-case writes off the event loop
+# Single-flight background runs of retrain_model.py (see retrain_jobs.py)
+retrain_jobs = RetrainJobManager(Path(__file__).parent / "retrain_model.py", Path(__file__).parent.parent)
+# Retraining started by /upload/dengue: "off" (default), "incremental" (warm-start update) or "full"
+RETRAIN_ON_UPLOAD = os.getenv("RETRAIN_ON_UPLOAD", "off").lower()
 
 def load_historical_climate():
-    """Load and cache historical climate data for weekly averages"""
-    global historical_climate
-    if historical_climate is None and CLIMATE_DATA_PATH.exists():
+    """
+    Historical climatology (weekly / monthly means), loaded once from climate.csv
+    (if there is one) plus the climate uploads in data/. Uploads saved since (by
+    this or another worker) are folded in incrementally at most every
+    CLIMATOLOGY_REFRESH_SECONDS.
+    """
+    global climatology_checked_at
+    import time
+    had_data = bool(climatology.sources)
+    if str(CLIMATE_DATA_PATH) not in climatology.sources and CLIMATE_DATA_PATH.exists():
         try:
-            df = pd.read_csv(CLIMATE_DATA_PATH)
-            df['date'] = pd.to_datetime(df['date'], errors='coerce')
-            df = df.dropna()
-            
-            # Filter out invalid data (negative values, extreme outliers)
-            df = df[
-                (df['rainfall'] >= 0) & (df['rainfall'] <= 500) &
-                (df['temperature'] >= 20) & (df['temperature'] <= 35) &
-                (df['humidity'] >= 40) & (df['humidity'] <= 100)
-            ]
-            
-            # Calculate average by week of year for more granular predictions
-            df['week_of_year'] = df['date'].dt.isocalendar().week
-            df['month'] = df['date'].dt.month
-            
-            # Use week-of-year if we have enough data, otherwise fall back to month
-            weekly_avg = df.groupby('week_of_year').agg({
-                'rainfall': 'mean',
-                'temperature': 'mean',
-                'humidity': 'mean'
-            }).round(2)
-            
-            monthly_avg = df.groupby('month').agg({
-                'rainfall': 'mean',
-                'temperature': 'mean',
-                'humidity': 'mean'
-            }).round(2)
-            
-            historical_climate = {
-                'weekly': weekly_avg.to_dict('index'),
-                'monthly': monthly_avg.to_dict('index')
-            }
-            print(f"✅ Historical climate data loaded!")
-            print(f"   Weekly averages: {len(weekly_avg)} weeks")
-            print(f"   Monthly averages: {len(monthly_avg)} months")
-            return historical_climate
+            df = load_history_frame(CLIMATE_DATA_PATH, "climate")
+            climatology.add_frame(df, source=str(CLIMATE_DATA_PATH))
         except Exception as e:
             print(f"⚠️  Error loading historical climate: {e}")
-            return None
-    return historical_climate
+    # Uploads count with or without climate.csv: folded in on the first call, then periodically
+    now = time.monotonic()
+    if not climatology_checked_at or now - climatology_checked_at >= CLIMATOLOGY_REFRESH_SECONDS:
+        climatology_checked_at = now
+        fold_climate_uploads()
+    if climatology.sources and not had_data:
+        stats = climatology.stats()
+        print(f"✅ Historical climate data loaded!")
+        print(f"   Weekly averages: {stats['weeks']} weeks")
+        print(f"   Monthly averages: {stats['months']} months")
+    return climatology if climatology.sources else None
+
+def fold_climate_uploads() -> int:
+    """Add climate uploads not seen yet to the climatology; returns the rows added"""
+    added = 0
+    for path in sorted(DATA_DIR.glob("climate_*.csv")):
+        try:
+            added += climatology.add_csv(path)
+        except Exception as e:
+            print(f"⚠️  Skipping climate upload {path.name}: {e}")
+    if added:
+        print(f"✅ Climatology updated with {added} uploaded rows (version {climatology.version})")
+        mark_risk_grid_stale()
+    return added
 
-def get_historical_climate_for_date(target_date: datetime, base_climate: dict = None, week_offset: int = 0):
+def mark_risk_grid_stale():
+    """
+    Have risk_grid_loop rebuild the grid. Safe from any thread: asyncio.Event
+    is not, so from worker threads the set() is handed to the server's loop.
+    """
+    loop = server_loop
+    if loop is None:
+        return  # Not serving yet: the grid is built at startup anyway
+    try:
+        on_loop = asyncio.get_running_loop() is loop
+    except RuntimeError:
+        on_loop = False
+    if on_loop:
+        risk_grid_stale.set()
+        return
+    try:
+        loop.call_soon_threadsafe(risk_grid_stale.set)
+    except RuntimeError:
+        pass  # Loop already closed (shutting down)
+
+def get_historical_climate_for_date(target_date: datetime, base_climate: dict = None, week_offset: int = 0,
+                                    barangay: str = None):
     """
     Get historical average climate for a specific date.
     Uses week-of-year for more accurate predictions, with progressive variation.
     Falls back to month-based averages if weekly data not available.
+    With barangay (the climatology's name, see climate_area), that barangay's
+    own history is used where it has some.
     """
     historical = load_historical_climate()
     
@@ -143,43 +318,24 @@ def get_historical_climate_for_date(target_date: datetime, base_climate: dict =
             }
         return {'rainfall': 100.0, 'temperature': 28.0, 'humidity': 75.0}
     
-    # Try to get week-of-year data first (more accurate)
-    week_of_year = target_date.isocalendar().week
-    month = target_date.month
-    
-    # Check if we have weekly data
-    if isinstance(historical, dict) and 'weekly' in historical:
-        weekly_data = historical['weekly']
-        if week_of_year in weekly_data:
-            climate = {
-                'rainfall': float(weekly_data[week_of_year]['rainfall']),
-                'temperature': float(weekly_data[week_of_year]['temperature']),
-                'humidity': float(weekly_data[week_of_year]['humidity'])
-            }
-            # Add progressive variation for weeks 2-4 to ensure differences
-            if week_offset > 0:
+    # Week-of-year averages first (more accurate), then the month's
+    found = historical.lookup(target_date, barangay)
+    if found is not None:
+        kind, (rainfall, temperature, humidity) = found
+        climate = {'rainfall': rainfall, 'temperature': temperature, 'humidity': humidity}
+        # Add progressive variation for weeks 2-4 to ensure differences
+        if week_offset > 0:
+            if kind == 'weekly':
                 # Small progressive changes to simulate seasonal progression
                 climate['rainfall'] *= (1 + week_offset * 0.03)  # 3% increase per week
                 climate['temperature'] += week_offset * 0.2  # 0.2°C increase per week
                 climate['humidity'] += week_offset * 0.3  # 0.3% increase per week
-            return climate
-    
-    # Fallback to monthly data
-    if isinstance(historical, dict) and 'monthly' in historical:
-        monthly_data = historical['monthly']
-        if month in monthly_data:
-            climate = {
-                'rainfall': float(monthly_data[month]['rainfall']),
-                'temperature': float(monthly_data[month]['temperature']),
-                'humidity': float(monthly_data[month]['humidity'])
-            }
-            # Add progressive variation for weeks 2-4
-            if week_offset > 0:
+            else:
                 # Progressive changes to differentiate weeks
                 climate['rainfall'] *= (1 + week_offset * 0.05)  # 5% variation per week
                 climate['temperature'] += week_offset * 0.3  # 0.3°C variation per week
                 climate['humidity'] += week_offset * 0.5  # 0.5% variation per week
-            return climate
+        return climate
     
     # Final fallback
     if base_climate:
@@ -193,43 +349,118 @@ def get_historical_climate_for_date(target_date: datetime, base_climate: dict =
     return {'rainfall': 100.0, 'temperature': 28.0, 'humidity': 75.0}
 
 def load_model():
-    global model, barangay_encoder
-    if model is None and MODEL_PATH.exists():
+    """
+    The model bundle being served, loaded on first use; concurrent callers
+    (warm-up, executor threads) wait for the first load. Returns None if there is no model.
+    """
+    bundle = model_bundle
+    if bundle is not None:
+        return bundle
+    with model_load_lock:
+        if model_bundle is None:
+            _swap_model_bundle()
+        return model_bundle
+
+def _swap_model_bundle():
+    """Load the model files into a new bundle and serve it (caller holds model_load_lock)"""
+    global model_bundle, model_failed_signature
+    current = model_bundle
+    try:
+        bundle = load_model_bundle(
+            MODEL_PATH, ENCODER_PATH, MODEL_ARTIFACT_DIR, MODEL_FORMAT,
+            generation=current.generation + 1 if current is not None else 1
+        )
+    except Exception as e:
+        print(f"❌ Error loading model: {e}")
+        import traceback
+        traceback.print_exc()
+        model_failed_signature = model_files_signature(MODEL_PATH, ENCODER_PATH)
+        return None
+    if bundle is not None:
+        # The swap: requests that already hold the old bundle finish with it
+        model_bundle = bundle
+        model_failed_signature = None
+        refresh_barangay_registry(bundle)
+        # Load historical climate data
+        load_historical_climate()
+    return bundle
+
+def refresh_barangay_registry(bundle=None):
+    """Rebuild the barangay registry (official list + model encoder + case data) and swap it in"""
+    global barangay_registry
+    bundle = bundle if bundle is not None else model_bundle
+    case_paths = [DENGUE_DATA_PATH] + sorted(DATA_DIR.glob("dengue_*.csv"))
+    registry = BarangayRegistry.load(BARANGAY_REGISTRY_PATH, [p for p in case_paths if p.exists()],
+                                     bundle.pipeline if bundle is not None else None)
+    barangay_registry = registry
+    print(f"✅ Barangay registry: {len(registry)} barangays, {len(registry.modelled)} known to the model")
+    return registry
+
+def get_barangay_registry():
+    """
+    The current registry (before the model is loaded it has no codes). The
+    server builds it at startup; scripts get it built on first use.
+    """
+    registry = barangay_registry
+    return registry if registry is not None else refresh_barangay_registry()
+
+def climate_area(barangay: str) -> Optional[str]:
+    """
+    The climatology's name for a barangay that has climate history of its
+    own (uploads with a barangay column), or None: it uses the city-wide one.
+    """
+    global climate_areas
+    registry = get_barangay_registry()
+    version, known_registry, areas = climate_areas
+    if version != climatology.version or known_registry is not registry:
+        version = climatology.version
+        areas = {registry.canonical(name): name for name in climatology.barangays}
+        climate_areas = (version, registry, areas)
+    return areas.get(registry.canonical(barangay)) if areas else None
+
+def reload_model(force: bool = False) -> bool:
+    """
+    Load the model files again if they were replaced (or if force) and swap
+    the new bundle in; the current bundle keeps serving while it loads and if
+    loading fails. Returns True if the model version changed.
+    """
+    def unchanged():
+        signature = model_files_signature(MODEL_PATH, ENCODER_PATH)
+        if signature == model_failed_signature:
+            return True
+        return model_bundle is not None and signature == model_bundle.signature
+    
+    if not force and unchanged():
+        return False
+    with model_load_lock:
+        if not force and unchanged():
+            return False
+        current = model_bundle
+        bundle = _swap_model_bundle()
+    if bundle is None:
+        return False
+    changed = current is None or bundle.version != current.version
+    if changed:
+        forecast_cache.clear()
+    return changed
+
+async def apply_model_reload(force: bool = False) -> bool:
+    """reload_model off the event loop, then refresh what depends on the model"""
+    changed = await asyncio.to_thread(reload_model, force)
+    if changed:
+        inference_executor.reload()
+        risk_grid_stale.set()
+    return changed
+
+async def model_watch_loop():
+    """Background job: hot-reload the model when its files are replaced (e.g. retrained by another worker)"""
+    while True:
+        await asyncio.sleep(MODEL_WATCH_SECONDS)
         try:
-            import time
-            start_time = time.time()
-            print(f"📦 Loading model from {MODEL_PATH}...")
-            
-            # Try loading with timeout protection
-            model = joblib.load(MODEL_PATH)
-            
-            load_time = time.time() - start_time
-            print(f"✅ Model loaded successfully in {load_time:.2f} seconds!")
-            print(f"   Model type: {type(model).__name__}")
-            if hasattr(model, 'n_estimators'):
-                print(f"   Number of trees: {model.n_estimators}")
-            if hasattr(model, 'feature_names_in_'):
-                print(f"   Expected features: {list(model.feature_names_in_)}")
-            
-            # Load barangay encoder if it exists
-            if ENCODER_PATH.exists():
-                barangay_encoder = joblib.load(ENCODER_PATH)
-                print(f"✅ Barangay encoder loaded!")
-                if hasattr(barangay_encoder, 'classes_'):
-                    print(f"   Barangays: {list(barangay_encoder.classes_)}")
-            else:
-                print(f"⚠️  Barangay encoder not found - using fallback")
-            
-            # Load historical climate data
-            load_historical_climate()
-            
-            return model
+            if await apply_model_reload():
+                print(f"✅ Hot-reloaded model version {model_bundle.version} (generation {model_bundle.generation})")
         except Exception as e:
-            print(f"❌ Error loading model: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
-    return model
+            print(f"⚠️  Model reload check failed: {e}")
 
 # Model is loaded during startup via lifespan context manager
 
@@ -293,79 +524,246 @@ class CaseReport(BaseModel):
     # Remarks
     remarks: Optional[str] = None
 
-# Barangay list - Updated to match frontend
-BARANGAYS = [
-    "Bagumbayan Norte",
-    "Concepcion Grande",
-    "Tinago",
-    "Balatas",
-    "San Felipe"
-]
+def served_barangays() -> List[str]:
+    """
+    Barangays of /barangays and /predict/all-barangays: every registry entry the
+    model can score, the original five first (the order the frontend always got)
+    """
+    modelled = [entry.name for entry in get_barangay_registry().modelled]
+    if not modelled:
+        return list(DEFAULT_BARANGAYS)
+    first = [b for b in DEFAULT_BARANGAYS if b in modelled]
+    return first + [b for b in modelled if b not in first]
+
+# Climate used when the caller does not provide one (/predict/weekly, /predict/all-barangays)
+DEFAULT_CLIMATE = {'rainfall': 100.0, 'temperature': 28.0, 'humidity': 75.0}
+
+@functools.lru_cache(maxsize=256)
+def parse_start_date(value: str) -> datetime:
+    """strptime of a YYYY-MM-DD start date, cached: a batch usually repeats the same few dates"""
+    return datetime.strptime(value, "%Y-%m-%d")
 
-def get_risk_level(probability: float) -> str:
+def validate_prediction_request(request: PredictionRequest):
     """
-    Convert prediction probability to risk level.
-    Based on the model's probability of outbreak (cases > 0).
+    Validate climate inputs and parse the start date of a prediction request.
+    Returns (start_date, base_climate) or raises HTTPException(400).
+    """
+    if not (0 <= request.climate.temperature <= 50):
+        raise HTTPException(status_code=400, detail="Temperature must be between 0 and 50°C")
+    if not (0 <= request.climate.humidity <= 100):
+        raise HTTPException(status_code=400, detail="Humidity must be between 0 and 100%")
+    if request.climate.rainfall < 0:
+        raise HTTPException(status_code=400, detail="Rainfall cannot be negative")
     
-    Thresholds optimized for dengue prediction:
-    - Low: < 30% chance of outbreak
-    - Moderate: 30-60% chance of outbreak  
-    - High: > 60% chance of outbreak
-    """
-    if probability < 0.30:
-        return "Low"
-    elif probability < 0.60:
-        return "Moderate"
-    else:
-        return "High"
-
-def format_week_range(start_date: datetime) -> str:
-    """Format date range for week display"""
-    end_date = start_date + timedelta(days=6)
-    start_str = start_date.strftime("%B %d")
-    end_str = end_date.strftime("%d")
-    if start_date.month == end_date.month:
-        return f"{start_str}–{end_str}"
-    else:
-        return f"{start_str} – {end_date.strftime('%B %d')}"
+    # Parse start date
+    try:
+        start_date = parse_start_date(request.date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    
+    # Base climate from user input (for week 1)
+    base_climate = {
+        'rainfall': request.climate.rainfall,
+        'temperature': request.climate.temperature,
+        'humidity': request.climate.humidity
+    }
+    return start_date, base_climate
 
-def prepare_features(rainfall: float, temperature: float, humidity: float, barangay: str) -> pd.DataFrame:
+def run_forecasts(bundle, requests: List[PredictionRequest], timings: dict = None) -> list:
     """
-    Prepare features in the exact format the model expects.
-    Uses DataFrame with column names to match training data.
-    NOW INCLUDES BARANGAY as a feature!
+    Forecast many requests with a single predict_proba call.
+    Builds one (requests x weeks) feature matrix, scores it once and splits the
+    probabilities back per request. Each entry of the result is either that
+    request's weekly_forecast list or the HTTPException that rejected it, so one
+    bad item (e.g. a malformed date) does not fail the rest.
+    If timings is a dict, the seconds spent per stage are stored in it.
     """
-    # Encode barangay
-    if barangay_encoder is not None:
+    import time
+    started = time.perf_counter() if timings is not None else None
+    outcomes = [None] * len(requests)
+    prepared = []
+    registry = get_barangay_registry()
+    horizons = {}  # Same start date + climate + climate area (e.g. /predict/all-barangays): one horizon
+    for i, request in enumerate(requests):
         try:
-            barangay_encoded = barangay_encoder.transform([barangay])[0]
-        except ValueError:
-            # Barangay not in encoder, use default (most common)
-            print(f"⚠️  Barangay '{barangay}' not in encoder, using default")
-            barangay_encoded = 0
-    else:
-        # Fallback: map barangay names to numbers
-        barangay_map = {
-            "Bagumbayan Norte": 0,
-            "Concepcion Grande": 1,
-            "Tinago": 2,
-            "Balatas": 3,
-            "San Felipe": 4
-        }
-        barangay_encoded = barangay_map.get(barangay, 0)
+            start_date, base_climate = validate_prediction_request(request)
+        except HTTPException as e:
+            outcomes[i] = e
+            continue
+        
+        # Week 1: Use current/input climate data
+        # Weeks 2-4: Use historical averages for those specific dates with progressive variation
+        # Barangays with their own climate history get their own horizon, the rest share the city's
+        area = climate_area(request.barangay)
+        horizon_key = (start_date, tuple(base_climate.values()), area)
+        horizon = horizons.get(horizon_key)
+        if horizon is None:
+            climate_for_date = get_historical_climate_for_date
+            if area is not None:
+                climate_for_date = functools.partial(get_historical_climate_for_date, barangay=area)
+            climates = build_horizon_climate(start_date, base_climate, climate_for_date)
+            horizon = horizons[horizon_key] = (climates, forecast_weeks(start_date, climates))
+        climates, weeks = horizon
+        # Order: rainfall, temperature, humidity, barangay_encoded (the bundle's feature pipeline);
+        # aliases and other spellings resolve to the name the encoder was trained on
+        features = bundle.pipeline.horizon_matrix(climates, registry.model_name(request.barangay))
+        prepared.append((i, start_date, climates, weeks, features))
     
-    # Create DataFrame with exact column names and order from training
-    features_df = pd.DataFrame({
-        'rainfall': [rainfall],
-        'temperature': [temperature],
-        'humidity': [humidity],
-        'barangay_encoded': [barangay_encoded]
-    })
+    if timings is not None:
+        built = time.perf_counter()
+        timings["feature_build"] = built - started
+    scored = score_batch(bundle.inference_model, [features for *_, features in prepared])
+    if timings is not None:
+        scored_at = time.perf_counter()
+        timings["model_score"] = scored_at - built
+    for (i, start_date, climates, weeks, _), probabilities in zip(prepared, scored):
+        outcomes[i] = build_weekly_forecast(start_date, climates, probabilities, weeks)
+    if timings is not None:
+        timings["response_build"] = time.perf_counter() - scored_at
+    return outcomes
+
+def build_model_info(bundle) -> dict:
+    """Model metadata attached to every forecast response"""
+    return {
+        "model_type": bundle.model_type,
+        "features_used": feature_names,
+        "prediction_date": datetime.now().isoformat()
+    }
+
+def forecast_job(requests: List[PredictionRequest]):
+    """
+    Unit of work submitted to the inference executor.
+    HTTPException does not pickle, so per-item rejections travel back as
+    (status_code, detail) tuples and are rebuilt by score_requests.
+    The whole job uses one model bundle, even if a reload swaps it meanwhile.
+    Stage timings (METRICS_ENABLED) are returned too, since a process worker
+    cannot record them in the server's registry.
+    """
+    import time
+    started = time.time()
+    bundle = load_model()
+    if bundle is None:
+        return None, None, None, None
+    timings = {} if METRICS_ENABLED else None
+    outcomes = run_forecasts(bundle, requests, timings)
+    portable = [(o.status_code, o.detail) if isinstance(o, HTTPException) else o for o in outcomes]
+    if timings is not None:
+        timings["started_at"] = started
+    return portable, build_model_info(bundle), bundle.version, timings
+
+async def score_requests(requests: List[PredictionRequest]):
+    """
+    Run forecasts on the inference executor without blocking the event loop.
+    Requests already in the forecast cache are answered from memory; only the
+    misses are scored. Returns (outcomes, model_info); raises 503 if the model
+    is missing or the executor queue is full.
+    """
+    import time
+    bundle = model_bundle
+    version = bundle.version if bundle is not None else None
+    registry = get_barangay_registry()
+    keys = [
+        forecast_cache.make_key(registry.canonical(r.barangay), r.date, r.climate.model_dump(), version, climatology.version)
+        if version is not None else None
+        for r in requests
+    ]
+    outcomes = [forecast_cache.get(key) if key is not None else None for key in keys]
+    pending = [i for i, outcome in enumerate(outcomes) if outcome is None]
+    if not pending:
+        return outcomes, build_model_info(bundle)
     
-    # Ensure correct column order
-    features_df = features_df[feature_names]
+    submitted = time.time()
+    scored, model_info, scored_version, timings = await inference_executor.run(
+        forecast_job, [requests[i] for i in pending])
+    if timings is not None:
+        # Wall clock, so it also works when the job ran in another process
+        timings["executor_wait"] = max(0.0, timings.pop("started_at") - submitted)
+        record_stages(timings)
+        BATCH_ROWS.observe(len(pending))
+    if scored is None:
+        raise HTTPException(status_code=503, detail="Model not loaded. Please ensure rf_dengue_model.pkl exists.")
+    for i, outcome in zip(pending, scored):
+        if isinstance(outcome, tuple):
+            outcomes[i] = HTTPException(status_code=outcome[0], detail=outcome[1])
+        else:
+            outcomes[i] = outcome
+            # A reload may have swapped the model between the lookup and the scoring
+            if keys[i] is not None and scored_version == version:
+                forecast_cache.put(keys[i], outcome)
+    return outcomes, model_info
+
+def refresh_risk_grid():
+    """
+    Materialize the default-climate forecast for every barangay x the next
+    RISK_GRID_DAYS start dates in one predict_proba call.
+    """
+    global risk_grid
+    bundle = load_model()
+    if bundle is None:
+        return None
+    pipeline = bundle.pipeline
+    # Codes straight from this bundle's pipeline, in case the registry was swapped meanwhile
+    # The grid shares one city-wide horizon, so barangays with climate history of their own are
+    # left out and scored on request (lookup_risk_grid misses them)
+    modelled = [(entry.name, pipeline.codes.get(entry.model_name)) for entry in get_barangay_registry().modelled
+                if climate_area(entry.name) is None]
+    barangays = [name for name, code in modelled if code is not None]
     
-    return features_df
+    import time
+    start_time = time.time()
+    risk_grid = build_risk_grid(
+        bundle.inference_model,
+        barangays,
+        [code for _, code in modelled if code is not None],
+        DEFAULT_CLIMATE,
+        datetime.now(),
+        RISK_GRID_DAYS,
+        get_historical_climate_for_date,
+        bundle.version,
+        climate_version=climatology.version
+    )
+    print(f"✅ Risk grid built in {time.time() - start_time:.2f} seconds "
+          f"({len(barangays)} barangays x {RISK_GRID_DAYS} days)")
+    return risk_grid
+
+async def risk_grid_loop():
+    """Background job: rebuild the grid at startup, every RISK_GRID_REFRESH_HOURS and when marked stale"""
+    while True:
+        # Cleared before the build, so a mark that arrives while it runs triggers another one
+        risk_grid_stale.clear()
+        try:
+            await asyncio.to_thread(refresh_risk_grid)
+        except Exception as e:
+            print(f"⚠️  Risk grid build failed: {e}")
+        try:
+            await asyncio.wait_for(risk_grid_stale.wait(), timeout=RISK_GRID_REFRESH_HOURS * 3600)
+        except asyncio.TimeoutError:
+            pass
+
+def lookup_risk_grid(barangay: str, start_date: str, climate: dict):
+    """
+    Serve a forecast straight from the risk grid when possible.
+    Returns (weekly_forecast, generated_at) or None (non-default climate, date
+    outside the window, unknown barangay or one with its own climate history,
+    or grid built for another model).
+    """
+    return lookup_risk_grid_many([barangay], start_date, climate)[0]
+
+def lookup_risk_grid_many(barangays: List[str], start_date: str, climate: dict):
+    """lookup_risk_grid() for several barangays at once (one date parse, one gather from the grid)"""
+    grid = risk_grid
+    bundle = model_bundle
+    if (grid is None or bundle is None or grid.model_version != bundle.version
+            or grid.climate_version != climatology.version
+            or climate != DEFAULT_CLIMATE):
+        return [None] * len(barangays)
+    try:
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+    except ValueError:
+        return [None] * len(barangays)
+    registry = get_barangay_registry()
+    forecasts = grid.lookup_many([registry.canonical(barangay) for barangay in barangays], start_dt)
+    return [None if forecast is None else (forecast, grid.generated_at) for forecast in forecasts]
 
 @app.get("/")
 async def root():
@@ -373,7 +771,7 @@ async def root():
     return {
         "status": "ok",
         "message": "mosKITA API - Outsmart the Bite Before It Strikes",
-        "model_loaded": model is not None,
+        "model_loaded": model_bundle is not None,
         "version": "1.0.0"
     }
 
@@ -382,22 +780,49 @@ async def health_check():
     """Health check endpoint for monitoring"""
     return {
         "status": "healthy",
-        "model_loaded": model is not None,
+        "model_loaded": model_bundle is not None,
+        "model": model_bundle.stats() if model_bundle is not None else None,
+        "inference": inference_executor.stats(),
+        "case_writes": case_writer.stats(),
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once warm-up has finished and the model is loaded, 503 before"""
+    ready = warmup_state["ready"] and model_bundle is not None
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            **warmup_state,
+            "ready": ready,
+            "model_loaded": model_bundle is not None,
+            "warmup_mode": WARMUP_MODE,
+            "timestamp": datetime.now().isoformat()
+        }
+    )
+
 @app.get("/barangays")
 async def get_barangays():
-    return {"barangays": BARANGAYS}
+    """Barangays the model can forecast; "registered" also has the ones it was not trained on"""
+    return {"barangays": served_barangays(), "registered": get_barangay_registry().names}
+
+@app.get("/barangays/registry")
+async def get_barangay_registry_entries():
+    """Registry entries with municipality, aliases and sources"""
+    registry = get_barangay_registry()
+    return {"stats": registry.stats(), "barangays": [entry.to_dict() for entry in registry.entries]}
 
 @app.get("/model/info")
 async def get_model_info():
     """Get information about the loaded model"""
-    if model is None:
+    bundle = model_bundle
+    if bundle is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
+    model = bundle.model
     
     info = {
-        "model_type": type(model).__name__,
+        "model_type": bundle.model_type,
         "model_loaded": True,
         "feature_names": feature_names,
     }
@@ -406,9 +831,52 @@ async def get_model_info():
         info["n_estimators"] = model.n_estimators
     if hasattr(model, 'feature_names_in_'):
         info["expected_features"] = list(model.feature_names_in_)
+    info["model_version"] = bundle.version
+    info["feature_schema"] = bundle.pipeline.fingerprint
+    info["model_generation"] = bundle.generation
+    info["model_loaded_at"] = bundle.loaded_at
+    info["inference_backend"] = type(bundle.inference_model).__name__
+    info["barangays"] = get_barangay_registry().stats()
     
     return info
 
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Forecast cache hit/miss/eviction counters"""
+    return {
+        "forecast_cache": forecast_cache.stats(),
+        "climatology": climatology.stats(),
+        "risk_grid": risk_grid.stats() if risk_grid is not None else None,
+        "model_version": model_bundle.version if model_bundle is not None else None
+    }
+
+# State that already has counters is read at scrape time instead of being double-counted
+metrics_registry.counter("moskita_forecast_cache_hits", "Forecast cache hits",
+                         lambda: forecast_cache.stats()["hits"])
+metrics_registry.counter("moskita_forecast_cache_misses", "Forecast cache misses",
+                         lambda: forecast_cache.stats()["misses"])
+metrics_registry.counter("moskita_forecast_cache_evictions", "Forecast cache LRU evictions",
+                         lambda: forecast_cache.stats()["evictions"])
+metrics_registry.gauge("moskita_forecast_cache_entries", "Forecasts held in the cache",
+                       lambda: forecast_cache.stats()["size"])
+metrics_registry.gauge("moskita_inference_pending", "Jobs queued or running on the inference executor",
+                       lambda: inference_executor.stats()["pending"])
+metrics_registry.counter("moskita_inference_jobs", "Inference executor jobs by outcome",
+                         lambda: {("completed",): inference_executor.completed,
+                                  ("failed",): inference_executor.failed,
+                                  ("rejected",): inference_executor.rejected},
+                         ("result",))
+metrics_registry.gauge("moskita_model_info", "Model being served (value is always 1)",
+                       lambda: {(model_bundle.version, str(model_bundle.generation)): 1} if model_bundle else None,
+                       ("version", "generation"))
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of this worker's metrics (404 unless METRICS_ENABLED)"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled. Set METRICS_ENABLED=1 to expose them.")
+    return PlainTextResponse(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
 @app.post("/predict", response_model=PredictionResponse)
 async def predict(request: PredictionRequest):
     """
@@ -417,95 +885,12 @@ async def predict(request: PredictionRequest):
     Features must be in exact order: rainfall, temperature, humidity
     """
     try:
-        model = load_model()
-        if model is None:
-            raise HTTPException(status_code=503, detail="Model not loaded. Please ensure rf_dengue_model.pkl exists.")
-        
-        # Validate inputs
-        if not (0 <= request.climate.temperature <= 50):
-            raise HTTPException(status_code=400, detail="Temperature must be between 0 and 50°C")
-        if not (0 <= request.climate.humidity <= 100):
-            raise HTTPException(status_code=400, detail="Humidity must be between 0 and 100%")
-        if request.climate.rainfall < 0:
-            raise HTTPException(status_code=400, detail="Rainfall cannot be negative")
-        
-        # Parse start date
-        try:
-            start_date = datetime.strptime(request.date, "%Y-%m-%d")
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-        
-        # Generate 4 weeks of forecasts
-        weekly_forecast = []
-        
-        # Base climate from user input (for week 1)
-        base_climate = {
-            'rainfall': request.climate.rainfall,
-            'temperature': request.climate.temperature,
-            'humidity': request.climate.humidity
-        }
-        
-        for week_num in range(4):
-            week_start = start_date + timedelta(weeks=week_num)
-            
-            # Week 1: Use current/input climate data
-            # Weeks 2-4: Use historical averages for those specific dates with progressive variation
-            if week_num == 0:
-                # First week uses the input climate data
-                climate_data = base_climate
-            else:
-                # Future weeks use historical averages for that time of year
-                # Pass week_num as week_offset to add progressive variation
-                climate_data = get_historical_climate_for_date(week_start, base_climate, week_offset=week_num)
-            
-            # Prepare features in exact format model expects
-            # Order: rainfall, temperature, humidity, barangay_encoded (as per training)
-            features_df = prepare_features(
-                rainfall=climate_data['rainfall'],
-                temperature=climate_data['temperature'],
-                humidity=climate_data['humidity'],
-                barangay=request.barangay
-            )
-            
-            # Get prediction probability
-            # predict_proba returns [probability_class_0, probability_class_1]
-            # class_0 = no outbreak (cases = 0)
-            # class_1 = outbreak (cases > 0)
-            probabilities = model.predict_proba(features_df)[0]
-            no_outbreak_prob = probabilities[0]
-            outbreak_prob = probabilities[1]
-            
-            # Use outbreak probability for risk assessment
-            probability = float(outbreak_prob)
-            
-            # Convert to risk level
-            risk = get_risk_level(probability)
-            
-            # Format week range
-            week_str = format_week_range(week_start)
-            
-            weekly_forecast.append({
-                "week": week_str,
-                "risk": risk,
-                "probability": round(probability, 4),  # More precision
-                "outbreak_probability": round(probability, 4),
-                "climate_used": {
-                    "rainfall": round(climate_data['rainfall'], 1),
-                    "temperature": round(climate_data['temperature'], 1),
-                    "humidity": round(climate_data['humidity'], 1),
-                    "source": "current" if week_num == 0 else "historical_average"
-                }
-            })
-        
-        # Get model info
-        model_info = {
-            "model_type": type(model).__name__,
-            "features_used": feature_names,
-            "prediction_date": datetime.now().isoformat()
-        }
+        outcomes, model_info = await score_requests([request])
+        if isinstance(outcomes[0], HTTPException):
+            raise outcomes[0]
         
         return PredictionResponse(
-            weekly_forecast=weekly_forecast,
+            weekly_forecast=outcomes[0],
             model_info=model_info
         )
     
@@ -519,22 +904,34 @@ async def predict(request: PredictionRequest):
 
 @app.post("/predict/batch")
 async def predict_batch(requests: List[PredictionRequest]):
-    """Batch prediction for multiple barangays/dates"""
+    """
+    Batch prediction for multiple barangays/dates.
+    All items are scored together in one predict_proba call; errors stay per item.
+    """
+    try:
+        outcomes, model_info = await score_requests(requests)
+    except InferenceSaturated:
+        raise
+    except HTTPException as e:
+        outcomes = [e] * len(requests)
+    except Exception as e:
+        print(f"Batch prediction error: {e}")
+        outcomes = [HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")] * len(requests)
+    
     results = []
-    for req in requests:
-        try:
-            response = await predict(req)
+    for req, outcome in zip(requests, outcomes):
+        if isinstance(outcome, Exception):
             results.append({
                 "barangay": req.barangay,
                 "date": req.date,
-                "forecast": response.weekly_forecast,
-                "model_info": response.model_info
+                "error": str(outcome)
             })
-        except Exception as e:
+        else:
             results.append({
                 "barangay": req.barangay,
                 "date": req.date,
-                "error": str(e)
+                "forecast": outcome,
+                "model_info": model_info
             })
     return {"results": results}
 
@@ -554,47 +951,53 @@ async def get_weekly_predictions(barangay: str, start_date: str = Query(..., des
     """
     try:
         # Use default climate data (can be enhanced to use current weather)
-        climate_input = ClimateInput(
-            temperature=28.0,
-            humidity=75.0,
-            rainfall=100.0
-        )
-        
-        request = PredictionRequest(
-            barangay=barangay,
-            climate=climate_input,
-            date=start_date
-        )
-        
-        response = await predict(request)
+        grid_hit = lookup_risk_grid(barangay, start_date, DEFAULT_CLIMATE)
+        if grid_hit is not None:
+            weekly_forecast, generated_at = grid_hit
+        else:
+            climate_input = ClimateInput(**DEFAULT_CLIMATE)
+            
+            request = PredictionRequest(
+                barangay=barangay,
+                climate=climate_input,
+                date=start_date
+            )
+            
+            response = await predict(request)
+            weekly_forecast = [week.model_dump() for week in response.weekly_forecast]
+            generated_at = datetime.now().isoformat()
         
         # Transform to requested format
         weekly_predictions = {}
         start_dt = datetime.strptime(start_date, "%Y-%m-%d")
         
-        for week_num, week_forecast in enumerate(response.weekly_forecast):
+        for week_num, week_forecast in enumerate(weekly_forecast):
             week_start = start_dt + timedelta(weeks=week_num)
             date_key = week_start.strftime("%Y-%m-%d")
-            weekly_predictions[date_key] = week_forecast.risk
+            weekly_predictions[date_key] = week_forecast["risk"]
         
         return {
             "barangay": barangay,
-            "weekly_predictions": weekly_predictions
+            "weekly_predictions": weekly_predictions,
+            "generated_at": generated_at
         }
     
+    except InferenceSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating weekly predictions: {str(e)}")
 
 @app.get("/predict/all-barangays")
 async def get_all_barangay_predictions(
     start_date: str = Query(default=None, description="Start date in YYYY-MM-DD format (defaults to today)"),
-    temperature: float = Query(default=28.0, description="Temperature in Celsius"),
-    humidity: float = Query(default=75.0, description="Humidity percentage"),
-    rainfall: float = Query(default=100.0, description="Rainfall in mm")
+    temperature: float = Query(default=DEFAULT_CLIMATE['temperature'], description="Temperature in Celsius"),
+    humidity: float = Query(default=DEFAULT_CLIMATE['humidity'], description="Humidity percentage"),
+    rainfall: float = Query(default=DEFAULT_CLIMATE['rainfall'], description="Rainfall in mm")
 ):
     """
     Get predictions for all barangays at once.
     Returns predictions in format compatible with frontend.
+    With the default climate the answer is a lookup in the precomputed risk grid.
     """
     try:
         if start_date is None:
@@ -606,29 +1009,67 @@ async def get_all_barangay_predictions(
             rainfall=rainfall
         )
         
-        results = {}
-        for barangay in BARANGAYS:
+        climate = {'rainfall': rainfall, 'temperature': temperature, 'humidity': humidity}
+        barangays = served_barangays()
+        grid, bundle = risk_grid, model_bundle
+        response_key = None
+        if climate == DEFAULT_CLIMATE and grid is not None and bundle is not None:
+            response_key = (grid, get_barangay_registry(), bundle.version, climatology.version, start_date)
+            body = all_barangays_responses.get(response_key)
+            if body is not None:
+                if METRICS_ENABLED:
+                    RISK_GRID_LOOKUPS.inc("hit", amount=len(barangays))
+                return Response(content=body, media_type="application/json")
+        grid_hits = lookup_risk_grid_many(barangays, start_date, climate)
+        if METRICS_ENABLED:
+            misses = grid_hits.count(None)
+            RISK_GRID_LOOKUPS.inc("hit", amount=len(grid_hits) - misses)
+            RISK_GRID_LOOKUPS.inc("miss", amount=misses)
+        
+        requests = [
+            PredictionRequest(barangay=barangay, climate=climate_input, date=start_date)
+            for barangay, hit in zip(barangays, grid_hits) if hit is None
+        ]
+        
+        # One feature matrix (barangays x weeks) for whatever the grid did not cover
+        outcomes = []
+        if requests:
             try:
-                request = PredictionRequest(
-                    barangay=barangay,
-                    climate=climate_input,
-                    date=start_date
-                )
-                response = await predict(request)
-                results[barangay] = {
-                    "barangay": barangay,
-                    "full_forecast": response.weekly_forecast
-                }
+                outcomes, _ = await score_requests(requests)
+            except InferenceSaturated:
+                raise
             except Exception as e:
-                print(f"Error predicting for {barangay}: {e}")
+                outcomes = [e] * len(requests)
+        live = iter(outcomes)
+        generated_at = datetime.now().isoformat()
+        
+        results = {}
+        for barangay, hit in zip(barangays, grid_hits):
+            if hit is not None:
+                outcome, as_of = hit
+            else:
+                outcome, as_of = next(live), generated_at
+            if isinstance(outcome, Exception):
+                print(f"Error predicting for {barangay}: {outcome}")
                 # Provide fallback data
-                results[barangay] = {
-                    "barangay": barangay,
-                    "full_forecast": []
-                }
+                outcome = []
+            results[barangay] = {
+                "barangay": barangay,
+                "full_forecast": outcome,
+                "generated_at": as_of
+            }
         
-        return results
+        # Plain dicts, lists and floats: skip FastAPI's recursive jsonable_encoder, which
+        # costs more than the forecasts themselves once there are thousands of barangays
+        response = JSONResponse(content=results)
+        if response_key is not None and None not in grid_hits:
+            if len(all_barangays_responses) >= ALL_BARANGAYS_RESPONSES_MAX:
+                all_barangays_responses.clear()  # Also drops bodies of replaced grids and models
+            all_barangays_responses[response_key] = response.body
+        return response
     
+    except InferenceSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating all predictions: {str(e)}")
 
@@ -636,15 +1077,14 @@ async def get_all_barangay_predictions(
 async def test_prediction():
     """Test endpoint to verify model is working correctly"""
     try:
-        model = load_model()
-        if model is None:
+        bundle = load_model()
+        if bundle is None:
             raise HTTPException(status_code=503, detail="Model not loaded")
+        model = bundle.model
         
         # Test with sample data from training
-        test_features = prepare_features(
-            rainfall=100.0,
-            temperature=28.0,
-            humidity=75.0,
+        test_features = bundle.pipeline.horizon_matrix(
+            [{"rainfall": 100.0, "temperature": 28.0, "humidity": 75.0}],
             barangay="Santa Cruz"
         )
         
@@ -668,37 +1108,49 @@ async def test_prediction():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Test error: {str(e)}")
 
+def append_upload_history(kind: str, file_path: Path):
+    """Add an upload to the columnar uploads_<kind> dataset (the CSV on disk stays the source of truth)"""
+    try:
+        append_csv(file_path, HISTORY_DIR / f"uploads_{kind}")
+    except Exception as e:
+        print(f"⚠️ Could not add {file_path.name} to the columnar history: {e}")
+
 @app.post("/upload/climate")
 async def upload_climate_data(file: UploadFile = File(...)):
     """Upload new climate CSV data"""
     try:
-        # Read uploaded file
-        contents = await file.read()
-        df = pd.read_csv(pd.io.common.BytesIO(contents))
-        
-        # Validate columns
-        required_cols = ["date", "rainfall", "temperature", "humidity"]
-        if not all(col in df.columns for col in required_cols):
-            raise HTTPException(
-                status_code=400,
-                detail=f"CSV must contain columns: {', '.join(required_cols)}"
-            )
-        
-        # Save to data directory
-        data_dir = Path(__file__).parent / "data"
-        data_dir.mkdir(exist_ok=True)
-        
+        # Stream, validate and normalize the upload straight to disk (never fully in memory)
+        data_dir = DATA_DIR
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         file_path = data_dir / f"climate_{timestamp}.csv"
-        df.to_csv(file_path, index=False)
+        climate_version = climatology.version
+        try:
+            summary = await asyncio.to_thread(ingest_csv, file.file, "climate", file_path)
+        except CSVValidationError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if STORAGE_BACKEND == "sqlite":
+            # Index the rows so they can be queried without reading the CSV again
+            await asyncio.to_thread(
+                case_store.record_upload, "climate", file_path, iter_upload_rows(file_path, "climate"), file.filename
+            )
+        if HISTORY_FORMAT == "columnar":
+            await asyncio.to_thread(append_upload_history, "climate", file_path)
+        # New readings shift the weekly/monthly means used for weeks 2-4
+        await asyncio.to_thread(climatology.add_csv, file_path)
+        if climatology.version != climate_version:
+            inference_executor.reload()
+            risk_grid_stale.set()
         
         return {
             "message": "Climate data uploaded successfully",
             "filename": file.filename,
             "saved_as": str(file_path),
-            "rows": len(df)
+            "rows": summary["rows"],
+            "date_range": summary["date_range"]
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload error: {str(e)}")
 
@@ -706,40 +1158,53 @@ async def upload_climate_data(file: UploadFile = File(...)):
 async def upload_dengue_data(file: UploadFile = File(...)):
     """Upload new dengue cases CSV data"""
     try:
-        # Read uploaded file
-        contents = await file.read()
-        df = pd.read_csv(pd.io.common.BytesIO(contents))
-        
-        # Validate columns
-        required_cols = ["date", "barangay", "cases"]
-        if not all(col in df.columns for col in required_cols):
-            raise HTTPException(
-                status_code=400,
-                detail=f"CSV must contain columns: {', '.join(required_cols)}"
-            )
-        
-        # Save to data directory
-        data_dir = Path(__file__).parent / "data"
-        data_dir.mkdir(exist_ok=True)
-        
+        # Stream, validate and normalize the upload straight to disk (never fully in memory)
+        data_dir = DATA_DIR
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         file_path = data_dir / f"dengue_{timestamp}.csv"
-        df.to_csv(file_path, index=False)
+        try:
+            summary = await asyncio.to_thread(ingest_csv, file.file, "dengue", file_path)
+        except CSVValidationError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if STORAGE_BACKEND == "sqlite":
+            # Index the rows so they can be queried without reading the CSV again
+            await asyncio.to_thread(
+                case_store.record_upload, "dengue", file_path, iter_upload_rows(file_path, "dengue"), file.filename
+            )
+        if HISTORY_FORMAT == "columnar":
+            await asyncio.to_thread(append_upload_history, "dengue", file_path)
+        # New barangays in the upload join the registry (they are scored once a retrain learns them)
+        await asyncio.to_thread(refresh_barangay_registry)
         
-        return {
+        response = {
             "message": "Dengue cases data uploaded successfully",
             "filename": file.filename,
             "saved_as": str(file_path),
-            "rows": len(df)
+            "rows": summary["rows"],
+            "date_range": summary["date_range"]
         }
+        if RETRAIN_ON_UPLOAD in ("incremental", "full"):
+            # Learn from the new rows in the background; poll the job like /model/retrain
+            try:
+                job, started = retrain_jobs.submit(["--mode", RETRAIN_ON_UPLOAD], trigger="upload")
+                response["retrain_job"] = {"job_id": job["id"], "status": job["status"], "started": started,
+                                           "status_url": f"/model/retrain/{job['id']}"}
+            except RuntimeError as e:
+                print(f"⚠️  Could not start retraining after upload: {e}")
+        return response
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload error: {str(e)}")
 
 @app.get("/uploads")
 async def list_uploads():
     """List all uploaded data files"""
-    data_dir = Path(__file__).parent / "data"
+    if STORAGE_BACKEND == "sqlite":
+        # Off the event loop: a writer holding the database lock can keep a read waiting (busy_timeout)
+        return {"uploads": await asyncio.to_thread(case_store.list_uploads)}
+    data_dir = DATA_DIR
     if not data_dir.exists():
         return {"uploads": []}
     
@@ -754,6 +1219,85 @@ async def list_uploads():
     
     return {"uploads": files}
 
+def require_sqlite():
+    if STORAGE_BACKEND != "sqlite":
+        raise HTTPException(status_code=501, detail="Dataset queries need STORAGE_BACKEND=sqlite")
+
+def require_profiling_admin(token: Optional[str]):
+    import hmac
+    if not PROFILE_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Profiling admin is disabled. Set PROFILE_ADMIN_TOKEN to enable it.")
+    if token is None or not hmac.compare_digest(token, PROFILE_ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Admin-Token header")
+
+@app.get("/admin/profiling")
+async def get_profiling(x_admin_token: Optional[str] = Header(default=None)):
+    """Profiler settings and the profiles kept by this worker (newest first)"""
+    require_profiling_admin(x_admin_token)
+    return request_profiler.status()
+
+@app.post("/admin/profiling")
+async def configure_profiling(
+    x_admin_token: Optional[str] = Header(default=None),
+    enabled: Optional[bool] = Query(default=None, description="Switch profiling on or off"),
+    mode: Optional[str] = Query(default=None, pattern=f"^({'|'.join(PROFILE_MODES)})$"),
+    sample_rate: Optional[float] = Query(default=None, ge=0, le=1, description="Fraction of requests profiled"),
+    slow_ms: Optional[float] = Query(default=None, ge=0, description="Also keep requests slower than this (0 = off)")
+):
+    """Change the profiler settings of this worker at runtime"""
+    require_profiling_admin(x_admin_token)
+    return request_profiler.configure(enabled=enabled, mode=mode, sample_rate=sample_rate, slow_ms=slow_ms)
+
+@app.delete("/admin/profiling")
+async def clear_profiles(x_admin_token: Optional[str] = Header(default=None)):
+    """Drop the kept profiles"""
+    require_profiling_admin(x_admin_token)
+    return {"cleared": request_profiler.clear()}
+
+@app.get("/admin/profiling/{profile_id}")
+async def download_profile(
+    profile_id: int,
+    x_admin_token: Optional[str] = Header(default=None),
+    format: str = Query(default="pstats", pattern="^(pstats|collapsed)$",
+                        description="pstats (snakeviz, python -m pstats) or collapsed stacks (flamegraph.pl, speedscope)")
+):
+    """Download one kept profile"""
+    require_profiling_admin(x_admin_token)
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found (kept: last {request_profiler.profiles.maxlen})")
+    try:
+        data = request_profiler.export(profile, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    filename = f"profile-{profile_id}.{'prof' if format == 'pstats' else 'folded'}"
+    media_type = "application/octet-stream" if format == "pstats" else "text/plain"
+    return Response(content=data, media_type=media_type,
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.get("/data/climate")
+async def query_climate_rows(
+    date_from: Optional[str] = Query(default=None, description="From date (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(default=None, description="To date (YYYY-MM-DD)"),
+    limit: int = Query(default=1000, ge=1, le=10000)
+):
+    """Uploaded climate rows in a date range (indexed query, SQLite backend only)"""
+    require_sqlite()
+    rows = await asyncio.to_thread(case_store.climate_rows, date_from, date_to, limit)
+    return {"rows": rows, "count": len(rows)}
+
+@app.get("/data/dengue")
+async def query_dengue_rows(
+    barangay: Optional[str] = Query(default=None, description="Barangay name"),
+    date_from: Optional[str] = Query(default=None, description="From date (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(default=None, description="To date (YYYY-MM-DD)"),
+    limit: int = Query(default=1000, ge=1, le=10000)
+):
+    """Uploaded dengue case rows by barangay and date range (indexed query, SQLite backend only)"""
+    require_sqlite()
+    rows = await asyncio.to_thread(case_store.dengue_rows, barangay, date_from, date_to, limit)
+    return {"rows": rows, "count": len(rows)}
+
 @app.post("/report-case")
 async def report_case(report: CaseReport):
     """Allow anonymous reporting of dengue cases/symptoms with detailed patient information"""
@@ -803,14 +1347,8 @@ async def report_case(report: CaseReport):
             "reported_at": datetime.now().isoformat()
         }
         
-        # Save to reports file
-        reports_dir = Path(__file__).parent / "data"
-        reports_dir.mkdir(exist_ok=True)
-        reports_file = reports_dir / "case_reports.jsonl"
-        
-        import json
-        with open(reports_file, "a") as f:
-            f.write(json.dumps(report_dict) + "\n")
+        # Save to reports file: queued, group-committed with other reports and indexed
+        await case_writer.submit(report_dict)
         
         return {
             "message": "Case report submitted successfully",
@@ -820,13 +1358,47 @@ async def report_case(report: CaseReport):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Report error: {str(e)}")
 
+CASE_REPORTS_MAX_PAGE = 1000
+
+def case_report_filter(barangay, date_from, date_to, risk):
+    """Validate the /case-reports filters; returns the ones that are set"""
+    for value in (date_from, date_to):
+        if value:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if risk and risk not in RISK_KEYS:
+        raise HTTPException(status_code=400, detail=f"risk must be one of: {', '.join(RISK_KEYS)}")
+    filters = {"barangay": barangay, "date_from": date_from, "date_to": date_to, "risk": risk}
+    return {key: value for key, value in filters.items() if value}
+
 @app.get("/case-reports")
-async def get_case_reports():
-    """Retrieve all case reports with optional analytics"""
+async def get_case_reports(
+    limit: Optional[int] = Query(default=None, ge=1, le=CASE_REPORTS_MAX_PAGE, description="Page size (omit for every report)"),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page"),
+    barangay: Optional[str] = Query(default=None, description="Only reports from this barangay"),
+    date_from: Optional[str] = Query(default=None, description="Reported on or after (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(default=None, description="Reported on or before (YYYY-MM-DD)"),
+    risk: Optional[str] = Query(default=None, description="Risk classification: red, yellow or green"),
+    include_analytics: bool = Query(default=True, description="Include the analytics block")
+):
+    """Retrieve case reports (newest first, optionally paginated and filtered) with analytics"""
+    filters = case_report_filter(barangay, date_from, date_to, risk)
     try:
-        reports_file = Path(__file__).parent / "data" / "case_reports.jsonl"
-        
-        if not reports_file.exists():
+        # Store reads block (file scans, or SQLite waiting for a writer's lock), so they run in a thread
+        return await asyncio.to_thread(read_case_reports, limit, cursor, filters, include_analytics)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving case reports: {str(e)}")
+
+def read_case_reports(limit, cursor, filters: dict, include_analytics: bool) -> dict:
+    """Body of GET /case-reports (runs in a worker thread)"""
+    # Picks up reports appended by other workers since the last request
+    case_store.refresh()
+    
+    if limit is None and cursor is None and not filters:
+        # Unpaginated: every report, as the admin dashboard expects
+        if not case_store.exists():
             return {
                 "reports": [],
                 "analytics": {
@@ -839,80 +1411,42 @@ async def get_case_reports():
                 }
             }
         
-        reports = []
-        import json
-        with open(reports_file, "r") as f:
-            for line in f:
-                if line.strip():
-                    try:
-                        reports.append(json.loads(line))
-                    except json.JSONDecodeError:
-                        continue
-        
-        # Sort by reported_at (most recent first)
-        reports.sort(key=lambda x: x.get("reported_at", ""), reverse=True)
-        
-        # Calculate analytics
-        analytics = {
-            "total_reports": len(reports),
-            "by_barangay": {},
-            "by_risk": {"red": 0, "yellow": 0, "green": 0},
-            "by_symptoms": {
-                "fever": 0,
-                "headache": 0,
-                "musclePain": 0,
-                "rash": 0,
-                "nausea": 0,
-                "abdominalPain": 0,
-                "bleeding": 0
-            },
-            "by_date": {},
-            "by_action": {
-                "referredToFacility": 0,
-                "advisedMonitoring": 0,
-                "notifiedFamily": 0
-            },
-            "recent_reports": reports[:10]  # Last 10 reports
-        }
-        
-        for report in reports:
-            # By barangay
-            barangay = report.get("barangay", "Unknown")
-            analytics["by_barangay"][barangay] = analytics["by_barangay"].get(barangay, 0) + 1
-            
-            # By risk classification
-            risk_class = report.get("riskClassification", {})
-            if risk_class.get("red"):
-                analytics["by_risk"]["red"] += 1
-            elif risk_class.get("yellow"):
-                analytics["by_risk"]["yellow"] += 1
-            elif risk_class.get("green"):
-                analytics["by_risk"]["green"] += 1
-            
-            # By symptoms
-            symptoms = report.get("symptoms", {})
-            for symptom, present in symptoms.items():
-                if present:
-                    analytics["by_symptoms"][symptom] = analytics["by_symptoms"].get(symptom, 0) + 1
-            
-            # By date (date reported)
-            date_reported = report.get("dateReported", "")
-            if date_reported:
-                analytics["by_date"][date_reported] = analytics["by_date"].get(date_reported, 0) + 1
-            
-            # By action taken
-            actions = report.get("actionTaken", {})
-            for action, taken in actions.items():
-                if taken:
-                    analytics["by_action"][action] = analytics["by_action"].get(action, 0) + 1
-        
-        return {
+        response = {"reports": case_store.newest()}  # Most recent first
+    else:
+        reports, next_cursor = case_store.page(limit or CASE_REPORTS_MAX_PAGE, cursor, **filters)
+        response = {
             "reports": reports,
-            "analytics": analytics
+            "count": len(reports),
+            "next_cursor": next_cursor
         }
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error retrieving case reports: {str(e)}")
+    if include_analytics:
+        response["analytics"] = case_store.analytics()
+    return response
+
+@app.get("/case-reports/analytics")
+async def get_case_report_analytics(recent: int = Query(default=10, ge=0, le=100, description="Number of recent reports to include")):
+    """Case-report analytics only (no report list)"""
+    def read():
+        case_store.refresh()
+        return case_store.analytics(recent=recent)
+    return await asyncio.to_thread(read)
+
+@app.get("/case-reports/export")
+async def export_case_reports(
+    barangay: Optional[str] = Query(default=None, description="Only reports from this barangay"),
+    date_from: Optional[str] = Query(default=None, description="Reported on or after (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(default=None, description="Reported on or before (YYYY-MM-DD)"),
+    risk: Optional[str] = Query(default=None, description="Risk classification: red, yellow or green")
+):
+    """Stream case reports as NDJSON (one report per line, oldest first) without loading them all"""
+    filters = case_report_filter(barangay, date_from, date_to, risk)
+    filename = f"case_reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson"
+    # A plain generator: Starlette iterates it in its threadpool, so the queries stay off the event loop
+    return StreamingResponse(
+        case_store.export_lines(**filters),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @app.get("/insights")
 async def get_insights():
@@ -958,47 +1492,49 @@ async def get_insights():
             "generated_at": datetime.now().isoformat()
         }
 
-@app.post("/model/retrain")
-async def retrain_model():
+async def reload_after_retrain(job: dict):
+    """Retrain job success hook: swap the new model in here (other workers pick it up via model_watch_loop)"""
+    await apply_model_reload(force=True)
+    job["result"]["model_loaded"] = model_bundle is not None
+    job["result"]["model_version"] = model_bundle.version if model_bundle is not None else None
+
+retrain_jobs.on_success = reload_after_retrain
+
+@app.post("/model/retrain", status_code=202)
+async def retrain_model(mode: str = Query("full", pattern="^(full|incremental)$",
+                                          description="full rebuild or incremental warm-start update")):
     """
-    Retrain the Random Forest model with latest data.
-    This ensures maximum accuracy.
+    Start retraining the Random Forest model with the latest data.
+    Returns the job right away; poll /model/retrain/{job_id} for progress and output.
+    Only one training runs at a time: while one is running, its job is returned.
     """
+    if not retrain_jobs.script.exists():
+        raise HTTPException(status_code=404, detail="Retrain script not found")
     try:
-        import subprocess
-        import sys
-        
-        retrain_script = Path(__file__).parent / "retrain_model.py"
-        if not retrain_script.exists():
-            raise HTTPException(status_code=404, detail="Retrain script not found")
-        
-        # Run retraining script
-        result = subprocess.run(
-            [sys.executable, str(retrain_script)],
-            capture_output=True,
-            text=True,
-            cwd=str(Path(__file__).parent.parent)
-        )
-        
-        if result.returncode != 0:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Retraining failed: {result.stderr}"
-            )
-        
-        # Reload model
-        global model
-        model = None
-        model = load_model()
-        
-        return {
-            "message": "Model retrained successfully",
-            "output": result.stdout,
-            "model_loaded": model is not None
-        }
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Retraining error: {str(e)}")
+        job, started = retrain_jobs.submit(["--mode", mode])
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {
+        "message": "Retraining started" if started else "Retraining already in progress",
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"/model/retrain/{job['id']}",
+        "job": job
+    }
+
+@app.get("/model/retrain/jobs")
+async def list_retrain_jobs(limit: int = Query(20, ge=1, le=100)):
+    """Recent retraining jobs, newest first"""
+    return {"jobs": await asyncio.to_thread(retrain_jobs.list, limit)}
+
+@app.get("/model/retrain/{job_id}")
+async def get_retrain_job(job_id: str, since: int = Query(0, ge=0, description="First output line to return")):
+    """Status, progress and output (from line `since` on) of a retraining job"""
+    job = await asyncio.to_thread(retrain_jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Retrain job {job_id} not found")
+    output = await asyncio.to_thread(retrain_jobs.log_lines, job_id, since)
+    return {**job, "output": output, "next_since": since + len(output)}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,185 @@
+"""
+Barangay registry: every area the API knows, with O(1) name lookup.
+
+Names are merged from three sources, in this order:
+
+1. barangays.csv (repo root): the official list with municipality and
+   aliases - the 27 Naga City barangays; add rows to cover neighbouring
+   municipalities
+2. the barangay encoder of the served model: the areas it can score
+3. the dengue case data (dengue_cases.csv and uploaded data/dengue_*.csv)
+
+Every lookup goes through normalize(), which ignores case, accents,
+punctuation and the usual abbreviations (Sta., Sto., Gen., Brgy.), so
+"sta. cruz", "Santa Cruz" and "SANTA CRUZ" are the same barangay. An
+entry keeps the display name of the first source that named it, and the
+encoder's spelling and code when the model knows it, so the feature
+pipeline gets the exact name it was trained on.
+
+The names of each case CSV are cached with its (inode, size, mtime), so
+the rebuild after an upload or a model reload reads only new or changed
+files, not the whole case history again.
+
+Only the csv module is used, so importing this module (and app.py) stays
+cheap.
+
+Configuration (environment variables):
+    BARANGAY_REGISTRY_PATH   the official list (default <repo>/barangays.csv)
+"""
+import csv
+import os
+import re
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+BARANGAY_REGISTRY_PATH = Path(os.getenv("BARANGAY_REGISTRY_PATH", Path(__file__).parent.parent / "barangays.csv"))
+
+ABBREVIATIONS = {"sta": "santa", "sto": "santo", "gen": "general", "pob": "poblacion", "brgy": "", "bgy": ""}
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_case_names = {}  # str(path) -> ((inode, size, mtime), sorted barangay names) of a case CSV
+
+
+def normalize(name: str) -> str:
+    """Lookup key for a barangay name: no case, accents, punctuation or abbreviations"""
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode()
+    words = _PUNCTUATION.sub(" ", text.casefold()).split()
+    return " ".join(word for word in (ABBREVIATIONS.get(w, w) for w in words) if word)
+
+
+def case_file_names(path) -> List[str]:
+    """Sorted barangay names of a case CSV, read again only when the file changes"""
+    st = os.stat(path)
+    signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+    cached = _case_names.get(str(path))
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    with open(path, newline="", encoding="utf-8") as f:
+        names = sorted({row.get("barangay") for row in csv.DictReader(f)} - {None, ""})
+    _case_names[str(path)] = (signature, names)
+    return names
+
+
+class Barangay:
+    """One area: display name, aliases, and its model name/code if the model knows it"""
+
+    __slots__ = ("name", "municipality", "aliases", "model_name", "code", "sources")
+
+    def __init__(self, name: str, municipality: Optional[str] = None):
+        self.name = name
+        self.municipality = municipality
+        self.aliases = []
+        self.model_name = None  # Spelling in the encoder
+        self.code = None
+        self.sources = []
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "municipality": self.municipality,
+            "aliases": self.aliases,
+            "modelled": self.code is not None,
+            "sources": self.sources,
+        }
+
+
+class BarangayRegistry:
+    """Read-only once built; rebuilt and swapped in when the model or the case data change"""
+
+    def __init__(self):
+        self.entries: List[Barangay] = []
+        self._index: Dict[str, Barangay] = {}  # normalize(name or alias) -> entry
+        self._exact: Dict[str, Barangay] = {}  # Names and aliases as spelled, skips normalize()
+        self.conflicts = 0
+
+    def add(self, name: str, source: str, municipality: Optional[str] = None,
+            aliases: Iterable[str] = ()) -> Optional[Barangay]:
+        """Register a name (or find the entry it already normalizes to) and its aliases"""
+        name = str(name).strip()
+        key = normalize(name)
+        if not key:
+            return None
+        entry = self._index.get(key)
+        if entry is None:
+            entry = Barangay(name, municipality)
+            self.entries.append(entry)
+            self._index[key] = entry
+        elif entry.name != name and name not in entry.aliases:
+            entry.aliases.append(name)
+        self._exact.setdefault(name, entry)
+        if source not in entry.sources:
+            entry.sources.append(source)
+        for alias in aliases:
+            alias = alias.strip()
+            alias_key = normalize(alias)
+            if not alias_key:
+                continue
+            other = self._index.setdefault(alias_key, entry)
+            if other is not entry:
+                self.conflicts += 1
+                print(f"⚠️  Barangay alias '{alias}' of {entry.name} already names {other.name}, ignoring it")
+            else:
+                self._exact.setdefault(alias, entry)
+                if alias not in entry.aliases:
+                    entry.aliases.append(alias)
+        return entry
+
+    def resolve(self, name: str) -> Optional[Barangay]:
+        """Entry for any spelling or alias of a barangay, or None"""
+        entry = self._exact.get(name)
+        return entry if entry is not None else self._index.get(normalize(name))
+
+    def canonical(self, name: str) -> str:
+        """Display name of a barangay; unknown names are returned unchanged"""
+        entry = self.resolve(name)
+        return entry.name if entry is not None else name
+
+    def model_name(self, name: str) -> str:
+        """The encoder's spelling of a barangay (what the feature pipeline expects), or name itself"""
+        entry = self.resolve(name)
+        return entry.model_name if entry is not None and entry.model_name is not None else name
+
+    @property
+    def names(self) -> List[str]:
+        return [entry.name for entry in self.entries]
+
+    @property
+    def modelled(self) -> List[Barangay]:
+        """Entries the served model was trained on, in registry order"""
+        return [entry for entry in self.entries if entry.code is not None]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def stats(self) -> dict:
+        return {
+            "barangays": len(self.entries),
+            "modelled": len(self.modelled),
+            "lookup_keys": len(self._index),
+            "alias_conflicts": self.conflicts,
+        }
+
+    @classmethod
+    def load(cls, registry_path: Path = BARANGAY_REGISTRY_PATH, case_paths: Iterable[Path] = (),
+             pipeline=None) -> "BarangayRegistry":
+        """Build the registry from the official list, the model's feature pipeline and the case CSVs"""
+        registry = cls()
+        if registry_path is not None and Path(registry_path).exists():
+            with open(registry_path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    aliases = [a for a in (row.get("aliases") or "").split("|") if a.strip()]
+                    registry.add(row["name"], "registry", row.get("municipality") or None, aliases)
+        if pipeline is not None:
+            for model_name, code in pipeline.codes.items():
+                entry = registry.add(model_name, "model")
+                if entry is not None and entry.code is None:
+                    entry.model_name, entry.code = model_name, code
+        for path in case_paths:
+            try:
+                names = case_file_names(path)
+            except (OSError, UnicodeDecodeError, csv.Error) as e:
+                print(f"⚠️  Skipping {Path(path).name} for the barangay registry: {e}")
+                continue
+            for name in names:
+                registry.add(name, "cases")
+        return registry
@@ -0,0 +1,155 @@
+"""
+All-barangay scoring at growing numbers of areas.
+
+For each size in --sizes (default 30, 300 and 3000 barangays) builds a
+synthetic deployment with load_test.build_dataset (model trained on that
+many barangays), starts the app in-process in a fresh interpreter (app
+reads its configuration at import time), preloads it as the gunicorn
+config does (model loaded, startup heap frozen out of the garbage
+collector) and times:
+
+    grid     GET /predict/all-barangays with the default climate, answered
+             from the precomputed risk grid (the encoded body is not reused)
+    cached   the same call again: the encoded body of the first one is served
+    scored   the same with a custom climate, so every barangay is scored
+             (one feature matrix, one predict_proba call)
+    lookup   registry.resolve() of every name in upper case, i.e. the
+             normalized alias lookup each forecast request does
+    registry rebuilding the registry (model encoder + barangays.csv)
+
+Each call runs --repeat times; the median and max are reported and a size
+fails when the median of grid, cached or scored is over --budget-ms. Exit code 1
+if any size failed.
+
+Needs httpx (pip install httpx); the repo data and model files are not touched.
+
+Usage (from the backend directory):
+    python benchmarks/bench_barangay_scaling.py
+    python benchmarks/bench_barangay_scaling.py --sizes 30 300 3000 10000 --budget-ms 500 --repeat 10
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from load_test import barangay_names, build_dataset  # noqa: E402
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": round(statistics.median(times), 2), "max_ms": round(max(times), 2)}
+
+
+async def measure(size, repeat):
+    import httpx
+    import app as api
+
+    today = date.today().isoformat()
+    grid_params = {"start_date": today}
+    scored_params = {"start_date": today, "rainfall": 210.5, "temperature": 29.3, "humidity": 83.0}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        api.preload()
+        async with api.app.router.lifespan_context(api.app):
+            if api.risk_grid is None:
+                # The lifespan builds it in the background; build it now so the first call hits it
+                await asyncio.to_thread(api.refresh_risk_grid)
+            transport = httpx.ASGITransport(app=api.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+                async def call(params):
+                    response = await client.get("/predict/all-barangays", params=params)
+                    response.raise_for_status()
+                    return response
+
+                async def timed_call(params, clear_cache):
+                    times, body = [], None
+                    for _ in range(repeat):
+                        if clear_cache:
+                            # Otherwise every repeat after the first is answered from memory
+                            api.forecast_cache.clear()
+                            api.all_barangays_responses.clear()
+                        start = time.perf_counter()
+                        body = await call(params)
+                        times.append((time.perf_counter() - start) * 1000)
+                    # Decoded outside the timing: the client's JSON parse is not the server's latency
+                    return {"median_ms": round(statistics.median(times), 2), "max_ms": round(max(times), 2),
+                            "barangays": len(body.json()), "kb": len(body.content) // 1024}
+
+                grid = await timed_call(grid_params, clear_cache=True)
+                cached = await timed_call(grid_params, clear_cache=False)
+                scored = await timed_call(scored_params, clear_cache=True)
+
+            registry = api.get_barangay_registry()
+            names = [name.upper() for name in registry.names]
+            lookup = timed(lambda: [registry.resolve(name) for name in names], repeat)
+            lookup["per_name_us"] = round(lookup["median_ms"] * 1000 / len(names), 3)
+            rebuild = timed(lambda: api.refresh_barangay_registry(), max(1, repeat // 2))
+    return {"size": size, "registry": registry.stats(), "grid": grid, "cached": cached, "scored": scored,
+            "lookup": lookup, "registry_rebuild": rebuild}
+
+
+def run_one(size, args):
+    """Child process: build the deployment for one size and measure it"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        with contextlib.redirect_stdout(sys.stderr):
+            env = build_dataset(tmp, barangay_names(size), args.climate_days, 0, args.train_rows, args.seed)
+        env.update(RISK_GRID_DAYS="7", MODEL_WATCH_SECONDS="0", DENGUE_DATA_PATH=str(tmp / "dengue_cases.csv"))
+        # app reads its configuration at import time
+        os.environ.update(env)
+        print(json.dumps(asyncio.run(measure(size, args.repeat))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[30, 300, 3000])
+    parser.add_argument("--budget-ms", type=float, default=250.0, help="median latency budget per call")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--climate-days", type=int, default=1460)
+    parser.add_argument("--train-rows", type=int, default=50000, help="cap on synthetic training rows")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--one", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one is not None:
+        run_one(args.one, args)
+        return
+
+    results, failed = [], False
+    for size in args.sizes:
+        command = [sys.executable, __file__, "--one", str(size), "--repeat", str(args.repeat),
+                   "--climate-days", str(args.climate_days), "--train-rows", str(args.train_rows),
+                   "--seed", str(args.seed)]
+        child = subprocess.run(command, cwd=BACKEND_DIR, stdout=subprocess.PIPE, text=True, check=True)
+        result = json.loads(child.stdout.strip().splitlines()[-1])
+        result["within_budget"] = all(result[call]["median_ms"] <= args.budget_ms
+                                        for call in ("grid", "cached", "scored"))
+        failed = failed or not result["within_budget"]
+        results.append(result)
+        print(f"{size:>6} barangays  grid {result['grid']['median_ms']:>8} ms  "
+              f"cached {result['cached']['median_ms']:>7} ms  "
+              f"scored {result['scored']['median_ms']:>8} ms  lookup {result['lookup']['per_name_us']} µs/name  "
+              f"rebuild {result['registry_rebuild']['median_ms']} ms  "
+              f"{'✅' if result['within_budget'] else '❌ over budget'}", file=sys.stderr)
+
+    print(json.dumps({"budget_ms": args.budget_ms, "results": results}, indent=2))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
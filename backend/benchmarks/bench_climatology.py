@@ -0,0 +1,120 @@
+"""
+Climatology benchmark: full groupby reload vs incremental fold-in.
+
+On a synthetic daily climate history (--rows), times what it costs to take
+an upload of --upload-rows into account:
+
+- reload:       groupby over history + upload (the old load_historical_climate)
+- incremental:  Climatology.add_frame(upload) on an already loaded history
+
+and the per-date lookup cost of the dict-of-dicts vs the dense slot arrays.
+Also checks that both give the same weekly and monthly means.
+
+Usage (from the backend directory):
+    python benchmarks/bench_climatology.py
+    python benchmarks/bench_climatology.py --rows 2000000 --upload-rows 365
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd  # noqa: E402
+
+from climatology import CLIMATE_COLUMNS, Climatology  # noqa: E402
+
+
+def synthetic(rows, start, seed):
+    rng = random.Random(seed)
+    df = pd.DataFrame({
+        "date": [start + timedelta(days=i) for i in range(rows)],
+        "rainfall": [rng.uniform(0, 400) for _ in range(rows)],
+        "temperature": [rng.uniform(22, 34) for _ in range(rows)],
+        "humidity": [float(rng.randint(55, 98)) for _ in range(rows)],
+    })
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def groupby_means(df):
+    """The old load_historical_climate aggregation"""
+    df = df.dropna()
+    df = df[
+        (df['rainfall'] >= 0) & (df['rainfall'] <= 500) &
+        (df['temperature'] >= 20) & (df['temperature'] <= 35) &
+        (df['humidity'] >= 40) & (df['humidity'] <= 100)
+    ].copy()
+    df['week_of_year'] = df['date'].dt.isocalendar().week
+    df['month'] = df['date'].dt.month
+    columns = {column: 'mean' for column in CLIMATE_COLUMNS}
+    return {
+        'weekly': df.groupby('week_of_year').agg(columns).round(2).to_dict('index'),
+        'monthly': df.groupby('month').agg(columns).round(2).to_dict('index'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="days of synthetic history")
+    parser.add_argument("--upload-rows", type=int, default=1000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+
+    history = synthetic(args.rows, datetime(1900, 1, 1), seed=0)
+    upload = synthetic(args.upload_rows, datetime(1900, 1, 1) + timedelta(days=args.rows), seed=1)
+
+    start = time.perf_counter()
+    old = groupby_means(pd.concat([history, upload], ignore_index=True))
+    reload_ms = (time.perf_counter() - start) * 1000
+
+    climatology = Climatology()
+    start = time.perf_counter()
+    climatology.add_frame(history)
+    initial_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    climatology.add_frame(upload)
+    incremental_ms = (time.perf_counter() - start) * 1000
+
+    dates = [datetime(2025, 1, 1) + timedelta(days=i % 365) for i in range(args.lookups)]
+    start = time.perf_counter()
+    for day in dates:
+        week = day.isocalendar().week
+        entry = old['weekly'].get(week) or old['monthly'].get(day.month)
+        (float(entry['rainfall']), float(entry['temperature']), float(entry['humidity']))
+    dict_us = (time.perf_counter() - start) / args.lookups * 1e6
+    start = time.perf_counter()
+    for day in dates:
+        climatology.lookup(day)
+    array_us = (time.perf_counter() - start) / args.lookups * 1e6
+
+    identical = all(
+        climatology.lookup(day) == ('weekly', tuple(old['weekly'][day.isocalendar().week].values()))
+        for day in dates[:365]
+    ) and all(
+        climatology._city.month_means[month - 1] == tuple(values.values())
+        for month, values in old['monthly'].items()
+    )
+    print(json.dumps({
+        "history_rows": args.rows,
+        "upload_rows": args.upload_rows,
+        "reload_ms": round(reload_ms, 2),
+        "initial_load_ms": round(initial_ms, 2),
+        "incremental_ms": round(incremental_ms, 2),
+        "speedup": round(reload_ms / incremental_ms, 1),
+        "lookup_dict_us": round(dict_us, 3),
+        "lookup_array_us": round(array_us, 3),
+        "identical": identical,
+    }, indent=2))
+    if not identical:
+        print("❌ Climatology means differ from the groupby")
+        sys.exit(1)
+    print("✅ Climatology means match the groupby")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Parity check and throughput benchmark: sklearn predict_proba vs CompiledForest.
+
+Parity is checked on random inputs across the serving ranges, on values
+sitting exactly on (and one float32 step around) every split threshold, and
+on the training CSVs. Throughput is reported as rows/sec at several batch
+sizes for the pure compiled traversal (no large-batch fallback), which is
+what COMPILED_FOREST_MAX_ROWS should be tuned from.
+
+Usage (from the backend directory):
+    python benchmarks/bench_compiled_forest.py
+    python benchmarks/bench_compiled_forest.py --batch-sizes 1 4 20 1000 --seconds 1.0
+"""
+import argparse
+import json
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from compiled_forest import CompiledForest, check_parity, parity_probe  # noqa: E402
+
+MODEL_PATH = BACKEND_DIR.parent / "rf_dengue_model.pkl"
+CLIMATE_PATH = BACKEND_DIR.parent / "climate.csv"
+
+warnings.filterwarnings('ignore', category=UserWarning)
+
+
+def threshold_probe(compiled, rows_per_feature=2000, seed=1):
+    """Rows whose values sit on, just below and just above the split thresholds"""
+    rng = np.random.default_rng(seed)
+    base = parity_probe(compiled.n_features_in_, rows_per_feature * compiled.n_features_in_ * 3, seed)
+    internal = compiled.left != np.arange(compiled.n_nodes)
+    row = 0
+    for feature in range(compiled.n_features_in_):
+        thresholds = compiled.threshold[internal & (compiled.feature == feature)].astype(np.float32)
+        if len(thresholds) == 0:
+            continue
+        picks = rng.choice(thresholds, size=rows_per_feature)
+        for values in (picks, np.nextafter(picks, np.float32(-np.inf)), np.nextafter(picks, np.float32(np.inf))):
+            base[row:row + rows_per_feature, feature] = values
+            row += rows_per_feature
+    return base
+
+
+def training_rows(n_features):
+    if not CLIMATE_PATH.exists():
+        return np.empty((0, n_features))
+    import pandas as pd
+    climate = pd.read_csv(CLIMATE_PATH).dropna()
+    rows = climate[['rainfall', 'temperature', 'humidity']].to_numpy(dtype=np.float64)
+    if n_features == 4:
+        codes = np.repeat(np.arange(5.0), len(rows))
+        rows = np.column_stack([np.tile(rows, (5, 1)), codes])
+    return rows
+
+
+def run_parity(model, compiled):
+    suites = {
+        "random": parity_probe(compiled.n_features_in_, 20000, seed=7),
+        "thresholds": threshold_probe(compiled),
+        "training_data": training_rows(compiled.n_features_in_),
+        "single_row": parity_probe(compiled.n_features_in_, 1, seed=3),
+    }
+    report = {}
+    for name, X in suites.items():
+        max_diff = check_parity(model, compiled, X, atol=0.0)
+        same_class = bool(np.array_equal(model.predict(X), compiled.predict(X))) if len(X) else True
+        report[name] = {"rows": int(len(X)), "max_abs_diff": max_diff, "same_predictions": same_class}
+        if not same_class:
+            raise SystemExit(f"❌ Parity failed on {name}: predictions differ")
+    return report
+
+
+def rows_per_second(predict_proba, X, seconds):
+    predict_proba(X)  # warm up
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        predict_proba(X)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            break
+    return {
+        "rows_per_sec": round(calls * len(X) / elapsed, 1),
+        "us_per_call": round(elapsed / calls * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 20, 1000])
+    parser.add_argument("--seconds", type=float, default=1.0, help="time budget per measurement")
+    parser.add_argument("--model-jobs", type=int, default=1, help="n_jobs for the sklearn forest")
+    args = parser.parse_args()
+
+    model = joblib.load(MODEL_PATH)
+    model.n_jobs = args.model_jobs
+
+    start = time.perf_counter()
+    compiled = CompiledForest.from_sklearn(model)
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    results = {
+        "model": {"trees": compiled.n_estimators, "nodes": compiled.n_nodes, "max_depth": compiled.max_depth,
+                  "compile_ms": round(compile_ms, 2)},
+        "parity": run_parity(model, compiled),
+        "throughput": {},
+    }
+    for batch in args.batch_sizes:
+        X = parity_probe(compiled.n_features_in_, batch, seed=batch)
+        sk = rows_per_second(model.predict_proba, X, args.seconds)
+        cf = rows_per_second(compiled.predict_proba, X, args.seconds)
+        results["throughput"][str(batch)] = {
+            "sklearn": sk,
+            "compiled": cf,
+            "speedup": round(cf["rows_per_sec"] / sk["rows_per_sec"], 2),
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Micro-benchmark for the 4-week forecast path.
+
+Compares the old per-week loop (one feature DataFrame + predict_proba per
+week) against the vectorized engine (one float32 matrix from the feature
+pipeline, one predict_proba call),
+then measures end-to-end /predict latency under a real uvicorn server.
+
+Usage (from the backend directory):
+    python benchmarks/bench_forecast.py
+    python benchmarks/bench_forecast.py --requests 500 --no-uvicorn
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import app as api  # noqa: E402
+from forecasting import (  # noqa: E402
+    FEATURE_NAMES,
+    build_horizon_climate,
+    score_outbreak_probability,
+    build_weekly_forecast,
+)
+
+PAYLOAD = {
+    "barangay": "Tinago",
+    "climate": {"temperature": 28.0, "humidity": 75.0, "rainfall": 100.0},
+    "date": "2025-06-02",
+}
+
+
+def legacy_forecast(bundle, start_date, base_climate, barangay):
+    """The pre-vectorization loop: one DataFrame (encoder.transform per row) and one predict_proba per week"""
+    import pandas as pd
+    climates = build_horizon_climate(start_date, base_climate, api.get_historical_climate_for_date)
+    probabilities = []
+    for climate_data in climates:
+        features_df = pd.DataFrame({
+            'rainfall': [climate_data['rainfall']],
+            'temperature': [climate_data['temperature']],
+            'humidity': [climate_data['humidity']],
+            'barangay_encoded': [int(bundle.encoder.transform([barangay])[0])],
+        })[FEATURE_NAMES]
+        probabilities.append(bundle.model.predict_proba(features_df)[0][1])
+    return build_weekly_forecast(start_date, climates, probabilities)
+
+
+def vectorized_forecast(bundle, start_date, base_climate, barangay):
+    climates = build_horizon_climate(start_date, base_climate, api.get_historical_climate_for_date)
+    features = bundle.pipeline.horizon_matrix(climates, barangay)
+    return build_weekly_forecast(start_date, climates, score_outbreak_probability(bundle.model, features))
+
+
+def summarize(samples_ms):
+    samples_ms = sorted(samples_ms)
+    return {
+        "mean_ms": round(statistics.mean(samples_ms), 3),
+        "p50_ms": round(samples_ms[len(samples_ms) // 2], 3),
+        "p95_ms": round(samples_ms[int(len(samples_ms) * 0.95) - 1], 3),
+    }
+
+
+def time_calls(fn, n):
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return summarize(samples)
+
+
+def bench_in_process(n):
+    bundle = api.load_model()
+    if bundle is None or bundle.encoder is None:
+        sys.exit("❌ Model not loaded - rf_dengue_model.pkl and barangay_encoder.pkl are required")
+    start_date = datetime.strptime(PAYLOAD["date"], "%Y-%m-%d")
+    base_climate = {k: PAYLOAD["climate"][k] for k in ("rainfall", "temperature", "humidity")}
+    args = (bundle, start_date, base_climate, PAYLOAD["barangay"])
+
+    if legacy_forecast(*args) != vectorized_forecast(*args):
+        sys.exit("❌ Vectorized forecast differs from the per-week loop")
+
+    # Warm up both paths before timing
+    for _ in range(5):
+        legacy_forecast(*args)
+        vectorized_forecast(*args)
+
+    return {
+        "per_week_loop": time_calls(lambda: legacy_forecast(*args), n),
+        "vectorized": time_calls(lambda: vectorized_forecast(*args), n),
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def bench_uvicorn(n):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=str(BACKEND_DIR),
+        stdout=subprocess.DEVNULL,
+        env=dict(os.environ),
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + 60
+        while True:
+            try:
+                urllib.request.urlopen(f"{url}/health", timeout=1).read()
+                break
+            except OSError:
+                if time.time() > deadline or server.poll() is not None:
+                    sys.exit("❌ uvicorn did not come up")
+                time.sleep(0.2)
+
+        body = json.dumps(PAYLOAD).encode()
+
+        def call():
+            req = urllib.request.Request(f"{url}/predict", data=body,
+                                         headers={"Content-Type": "application/json"})
+            urllib.request.urlopen(req).read()
+
+        for _ in range(10):
+            call()
+        return time_calls(call, n)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="timed calls per scenario")
+    parser.add_argument("--no-uvicorn", action="store_true", help="skip the end-to-end uvicorn run")
+    args = parser.parse_args()
+
+    results = {"in_process": bench_in_process(args.requests)}
+    loop, vec = results["in_process"]["per_week_loop"], results["in_process"]["vectorized"]
+    results["in_process"]["speedup"] = round(loop["mean_ms"] / vec["mean_ms"], 2)
+
+    if not args.no_uvicorn:
+        results["uvicorn_predict"] = bench_uvicorn(args.requests)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
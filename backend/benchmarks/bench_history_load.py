@@ -0,0 +1,108 @@
+"""
+History load benchmark: CSV parsing vs the columnar store.
+
+For the real climate.csv / dengue_cases.csv and for a synthetic multi-year
+history (--rows), times:
+
+- csv:       pd.read_csv + pd.to_datetime(errors='coerce') (the old loaders)
+- columnar:  columnar_store.read_table, all columns
+- pushdown:  read_table for one year and one barangay, two columns only
+
+and checks that the columnar read equals the CSV parse. The one-off
+import cost is reported separately.
+
+Usage (from the backend directory):
+    python benchmarks/bench_history_load.py
+    python benchmarks/bench_history_load.py --rows 2000000 --repeat 3
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(BACKEND_DIR / "benchmarks"))
+
+import columnar_store  # noqa: E402
+from bench_upload_ingest import generate  # noqa: E402
+
+
+def best_of(repeat, fn):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None or seconds < best else best
+    return round(best * 1000, 2), result
+
+
+def bench(csv_path, dataset_dir, repeat, pushdown=None):
+    start = time.perf_counter()
+    meta = columnar_store.import_csv(csv_path, dataset_dir)
+    import_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    csv_ms, parsed = best_of(repeat, lambda: columnar_store._parse_csv(csv_path))
+    columnar_ms, table = best_of(repeat, lambda: columnar_store.read_table(dataset_dir))
+    expected = parsed[parsed["date"].notna()].reset_index(drop=True)
+    result = {
+        "rows": meta["rows"],
+        "partitions": len(meta["partitions"]),
+        "csv_mb": round(Path(csv_path).stat().st_size / 2**20, 2),
+        "import_ms": import_ms,
+        "csv_ms": csv_ms,
+        "columnar_ms": columnar_ms,
+        "speedup": round(csv_ms / columnar_ms, 1) if columnar_ms else None,
+        "identical": expected.equals(table),
+    }
+    if pushdown:
+        year, barangay = pushdown
+        pushdown_ms, subset = best_of(repeat, lambda: columnar_store.read_table(
+            dataset_dir, columns=["date", "cases"], date_from=f"{year}-01-01", date_to=f"{year}-12-31",
+            where={"barangay": barangay},
+        ))
+        # The same question answered from the CSV
+        csv_filter_ms, from_csv = best_of(repeat, lambda: (lambda df: df[
+            (df["date"].dt.year == year) & (df["barangay"] == barangay)
+        ][["date", "cases"]].reset_index(drop=True))(columnar_store._parse_csv(csv_path)))
+        result["pushdown"] = {
+            "filter": {"year": year, "barangay": barangay},
+            "rows": len(subset),
+            "csv_ms": csv_filter_ms,
+            "columnar_ms": pushdown_ms,
+            "speedup": round(csv_filter_ms / pushdown_ms, 1) if pushdown_ms else None,
+            "identical": from_csv.equals(subset),
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000, help="rows of the synthetic dengue history")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per method (best is reported)")
+    args = parser.parse_args()
+
+    base_dir = BACKEND_DIR.parent
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for name, csv_name in (("climate", "climate.csv"), ("dengue", "dengue_cases.csv")):
+            if (base_dir / csv_name).exists():
+                results[name] = bench(base_dir / csv_name, tmp / name, args.repeat)
+
+        synthetic = tmp / "synthetic_dengue.csv"
+        generate(synthetic, "dengue", args.rows)
+        results["synthetic_dengue"] = bench(synthetic, tmp / "synthetic", args.repeat, pushdown=(2005, "Tinago"))
+
+    print(json.dumps(results, indent=2))
+    if not all(r["identical"] and r.get("pushdown", {}).get("identical", True) for r in results.values()):
+        print("❌ Columnar reads differ from the CSV parse")
+        sys.exit(1)
+    print("✅ Columnar reads match the CSV parse")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Import-time budget for the API module.
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter and fails
+(exit 1) if importing the app pulls in the scientific stack (numpy, pandas,
+joblib, sklearn, scipy) or takes longer than --max-ms. Those modules are
+imported lazily by the warm-up task / first request instead.
+
+With --uvicorn it also starts the server with WARMUP_MODE=background and
+reports the time until /health answers (process can take traffic) and
+until /ready answers 200 (model loaded).
+
+Usage (from the backend directory):
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --max-ms 1500 --uvicorn
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("numpy", "pandas", "joblib", "sklearn", "scipy")
+
+
+def measure_import(module: str = "app") -> dict:
+    """Cumulative import time per top-level module, in milliseconds"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": str(BACKEND_DIR)},
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"❌ import {module} failed:\n{proc.stderr[-2000:]}")
+
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, _self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|", 1).split("|")]
+        cumulative[name] = int(cumulative_us) / 1000
+    return cumulative
+
+
+def heavy_imports(cumulative: dict) -> list:
+    return sorted({name.split(".")[0] for name in cumulative if name.split(".")[0] in HEAVY_MODULES})
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url: str, deadline: float, expect_status: int = 200):
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == expect_status:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.02)
+    return False
+
+
+def measure_uvicorn(timeout: float = 120.0) -> dict:
+    """Seconds from process start to first /health and to /ready == 200"""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env={**os.environ, "WARMUP_MODE": "background"},
+    )
+    try:
+        deadline = start + timeout
+        if not wait_for(f"{base_url}/health", deadline):
+            raise SystemExit("❌ /health never answered")
+        health_s = time.perf_counter() - start
+        if not wait_for(f"{base_url}/ready", deadline):
+            raise SystemExit("❌ /ready never reported ready")
+        ready_s = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return {"first_health_s": round(health_s, 3), "ready_s": round(ready_s, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-ms", type=float, default=2000.0, help="budget for `import app`")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to report")
+    parser.add_argument("--uvicorn", action="store_true", help="also measure time to /health and /ready")
+    args = parser.parse_args()
+
+    cumulative = measure_import("app")
+    total_ms = cumulative.get("app", 0.0)
+    heavy = heavy_imports(cumulative)
+    slowest = sorted(
+        ((name, ms) for name, ms in cumulative.items() if "." not in name and name != "app"),
+        key=lambda item: item[1], reverse=True,
+    )[:args.top]
+
+    results = {
+        "import_app_ms": round(total_ms, 1),
+        "budget_ms": args.max_ms,
+        "heavy_modules_imported": heavy,
+        "slowest_top_level": {name: round(ms, 1) for name, ms in slowest},
+    }
+    if args.uvicorn:
+        results["uvicorn_background_warmup"] = measure_uvicorn()
+    print(json.dumps(results, indent=2))
+
+    if heavy:
+        print(f"❌ import app pulled in: {', '.join(heavy)}")
+        sys.exit(1)
+    if total_ms > args.max_ms:
+        print(f"❌ import app took {total_ms:.0f} ms (budget {args.max_ms:.0f} ms)")
+        sys.exit(1)
+    print("✅ Import budget OK")
+
+
+if __name__ == "__main__":
+    main()
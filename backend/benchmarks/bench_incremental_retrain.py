@@ -0,0 +1,94 @@
+"""
+Incremental (warm-start) vs full retraining.
+
+On a synthetic daily history with a slow seasonal drift, for each history
+size (--sizes, in days) trains the forest from scratch the way
+retrain_model.py does, then simulates an upload of --new-days days and
+compares:
+
+- full:         a new 100-tree forest on the whole history + upload
+- incremental:  incremental_training.update_forest on the existing forest
+
+Reports training seconds for both, and accuracy/recall of both on the
+--holdout-days days that follow the upload (never trained on).
+
+Usage (from the backend directory):
+    python benchmarks/bench_incremental_retrain.py
+    python benchmarks/bench_incremental_retrain.py --sizes 3650 36500 --new-days 28
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from incremental_training import score, stamp_full_training, update_forest  # noqa: E402
+
+SCHEMA = "synthetic"  # Stands in for the feature pipeline fingerprint
+FULL_PARAMS = dict(n_estimators=100, max_depth=10, min_samples_split=5, min_samples_leaf=2,
+                   class_weight="balanced", random_state=42, n_jobs=-1)
+
+
+def synthetic(days, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("1950-01-01", periods=days)
+    season = np.sin(2 * np.pi * dates.dayofyear.to_numpy() / 365.25)
+    rainfall = np.clip(200 + 150 * season + rng.normal(0, 60, days), 0, 500)
+    temperature = 28 + 3 * season + rng.normal(0, 1, days)
+    humidity = np.clip(75 + 15 * season + rng.normal(0, 6, days), 40, 100)
+    X = np.column_stack([rainfall, temperature, humidity]).astype(np.float32)
+    drift = np.linspace(0, 0.3, days)  # Outbreak threshold slowly moves over the years
+    y = ((rainfall / 400 + humidity / 100 + rng.normal(0, 0.25, days)) > 1.15 + drift).astype(int)
+    return X, y, dates
+
+
+def run(days, new_days, holdout_days):
+    from sklearn.ensemble import RandomForestClassifier
+    X, y, dates = synthetic(days + new_days + holdout_days)
+    seen, upload = days, days + new_days
+    holdout = (X[upload:], y[upload:])
+
+    model = RandomForestClassifier(**FULL_PARAMS).fit(X[:seen], y[:seen])
+    model.feature_schema_ = SCHEMA
+    stamp_full_training(model, dates[:seen], score(model, X[seen - holdout_days:seen], y[seen - holdout_days:seen]))
+
+    start = time.perf_counter()
+    full = RandomForestClassifier(**FULL_PARAMS).fit(X[:upload], y[:upload])
+    full_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    outcome = update_forest(model, X[:upload], y[:upload], dates[:upload], SCHEMA, tolerance=1.0)
+    incremental_seconds = time.perf_counter() - start
+    incremental, summary = outcome
+
+    return {
+        "history_days": days,
+        "new_days": new_days,
+        "full_seconds": round(full_seconds, 3),
+        "incremental_seconds": round(incremental_seconds, 3),
+        "speedup": round(full_seconds / incremental_seconds, 1),
+        "trees": summary["trees"],
+        "drift": summary["drift"],
+        "holdout_full": score(full, *holdout),
+        "holdout_incremental": score(incremental, *holdout),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1825, 7300, 29200], help="history sizes in days")
+    parser.add_argument("--new-days", type=int, default=28)
+    parser.add_argument("--holdout-days", type=int, default=90)
+    args = parser.parse_args()
+
+    results = [run(days, args.new_days, args.holdout_days) for days in args.sizes]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Zero-downtime model reload check.
+
+Starts uvicorn (several workers) on copies of the model pickles, keeps
+/predict busy from concurrent clients, then replaces the pickles with a
+different model (half of the trees) the way the training scripts do
+(model_bundle.save_model_files). Reports:
+
+- errors: requests that did not answer 200 during the whole run (must be 0)
+- propagation: seconds until every worker served the new model version
+- latency p50/p99/max before and after the swap
+
+Usage (from the backend directory):
+    python benchmarks/bench_model_reload.py
+    python benchmarks/bench_model_reload.py --workers 4 --concurrency 16 --format mmap
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from model_bundle import save_model_files  # noqa: E402
+
+REQUEST = {"barangay": "Tinago", "climate": {"temperature": 29, "humidity": 80, "rainfall": 150}}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(port, workers):
+    deadline = time.time() + 120
+    streak = 0
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=1)
+            streak += 1
+            if streak >= workers * 4:
+                return
+        except OSError:
+            streak = 0
+            time.sleep(0.1)
+    raise SystemExit("❌ uvicorn did not start")
+
+
+def client(port, stop, results, client_id):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    samples, errors = [], []
+    n = 0
+    while not stop.is_set():
+        # Distinct dates so the forecast cache does not hide the model
+        body = json.dumps({**REQUEST, "date": f"2025-{1 + n % 12:02d}-{1 + (client_id + n) % 28:02d}"})
+        n += 1
+        start = time.perf_counter()
+        try:
+            conn.request("POST", "/predict", body, {"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        samples.append((time.time(), (time.perf_counter() - start) * 1000))
+    conn.close()
+    results[client_id] = (samples, errors)
+
+
+def versions_seen(port, probes):
+    """Model versions reported by /model/info over several connections (spread across workers)"""
+    seen = set()
+    for _ in range(probes):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        try:
+            conn.request("GET", "/model/info")
+            seen.add(json.loads(conn.getresponse().read())["model_version"])
+        finally:
+            conn.close()
+    return seen
+
+
+def latency(samples):
+    if len(samples) < 2:
+        return None
+    quantiles = statistics.quantiles(samples, n=100)
+    return {"requests": len(samples), "p50_ms": round(quantiles[49], 2), "p99_ms": round(quantiles[98], 2),
+            "max_ms": round(max(samples), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--format", choices=["pickle", "mmap"], default="pickle", help="MODEL_FORMAT")
+    parser.add_argument("--watch-seconds", type=float, default=1.0, help="MODEL_WATCH_SECONDS")
+    parser.add_argument("--settle-seconds", type=float, default=3.0, help="load before and after the swap")
+    args = parser.parse_args()
+
+    import joblib
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        model_path, encoder_path = tmp / "rf_dengue_model.pkl", tmp / "barangay_encoder.pkl"
+        shutil.copy(BACKEND_DIR.parent / "rf_dengue_model.pkl", model_path)
+        shutil.copy(BACKEND_DIR.parent / "barangay_encoder.pkl", encoder_path)
+        model, encoder = joblib.load(model_path), joblib.load(encoder_path)
+
+        port = free_port()
+        env = {
+            **os.environ,
+            "MODEL_PATH": str(model_path),
+            "ENCODER_PATH": str(encoder_path),
+            "MODEL_FORMAT": args.format,
+            "MODEL_ARTIFACT_DIR": str(tmp / "model_artifact"),
+            "MODEL_WATCH_SECONDS": str(args.watch_seconds),
+            "RISK_GRID_DAYS": "0",
+            "WARMUP_MODE": "background",
+            "CASE_REPORTS_PATH": str(tmp / "case_reports.jsonl"),
+            "RETRAIN_JOBS_DIR": str(tmp / "retrain_jobs"),
+        }
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_ready(port, args.workers)
+            old_versions = versions_seen(port, args.workers * 8)
+
+            stop = threading.Event()
+            results = {}
+            threads = [threading.Thread(target=client, args=(port, stop, results, i)) for i in range(args.concurrency)]
+            for thread in threads:
+                thread.start()
+            time.sleep(args.settle_seconds)
+
+            # "Retrain": same features, half the trees -> a different model version
+            model.estimators_ = model.estimators_[: len(model.estimators_) // 2]
+            model.n_estimators = len(model.estimators_)
+            swapped_at = time.time()
+            save_model_files(model, model_path, encoder, encoder_path)
+
+            new_versions, propagation = set(), None
+            while time.time() - swapped_at < 60:
+                new_versions = versions_seen(port, args.workers * 8)
+                if not new_versions & old_versions:
+                    propagation = time.time() - swapped_at
+                    break
+                time.sleep(0.2)
+            time.sleep(args.settle_seconds)
+            stop.set()
+            for thread in threads:
+                thread.join()
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    samples = [s for client_samples, _ in results.values() for s in client_samples]
+    errors = [e for _, client_errors in results.values() for e in client_errors]
+    report = {
+        "workers": args.workers,
+        "concurrency": args.concurrency,
+        "format": args.format,
+        "watch_seconds": args.watch_seconds,
+        "old_versions": sorted(old_versions),
+        "new_versions": sorted(new_versions),
+        "propagation_seconds": round(propagation, 2) if propagation is not None else None,
+        "requests": len(samples),
+        "errors": len(errors),
+        "error_kinds": sorted({str(e) for e in errors}),
+        "before_swap": latency([ms for t, ms in samples if t < swapped_at]),
+        "after_swap": latency([ms for t, ms in samples if t >= swapped_at]),
+    }
+    print(json.dumps(report, indent=2))
+    if errors or propagation is None:
+        print("❌ Reload dropped requests or did not reach every worker")
+        sys.exit(1)
+    print("✅ Every worker switched to the new model without a failed request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Load test for POST /report-case.
+
+Starts uvicorn (optionally with several workers) writing to a temporary
+case_reports.jsonl, hammers /report-case from concurrent keep-alive clients
+for a fixed time and reports sustained reports/sec and latency. Afterwards
+the file is checked line by line: every acknowledged report must be there
+exactly once and no line may be torn or interleaved.
+
+By default it compares one fsync per report (CASE_WRITE_BATCH_SIZE=1)
+with group commits (the configured defaults). --storage sqlite runs the
+same test against the SQLite backend.
+
+Usage (from the backend directory):
+    python benchmarks/bench_report_case.py
+    python benchmarks/bench_report_case.py --workers 4 --concurrency 64 --seconds 10
+    python benchmarks/bench_report_case.py --storage sqlite --workers 2
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+REPORT = {
+    "barangay": "Tinago",
+    "name": "Load Test",
+    "age": "30",
+    "sex": "F",
+    "address": "Naga City",
+    "dateReported": "2025-06-02",
+    "timeReported": "09:00",
+    "reportedBy": "bench",
+    "fever": True,
+    "headache": True,
+    "riskYellow": True,
+    "advisedMonitoring": True,
+}
+
+CONFIGS = {
+    "per_report_fsync": {"CASE_WRITE_BATCH_SIZE": "1"},
+    "group_commit": {},
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, reports_path, workers, extra_env, storage):
+    env = {
+        **os.environ,
+        "STORAGE_BACKEND": storage,
+        "CASE_REPORTS_PATH": str(reports_path),
+        "SQLITE_PATH": str(reports_path.with_suffix(".db")),
+        "RISK_GRID_DAYS": "0",
+        "WARMUP_MODE": "background",
+        **extra_env,
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    # Wait until warm-up (model load) is over in every worker so it does not skew the numbers:
+    # /ready has to answer 200 several times in a row across the worker pool
+    deadline = time.time() + 120
+    ready_streak = 0
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=1)
+            ready_streak += 1
+            if ready_streak >= workers * 4:
+                return server
+        except OSError:
+            ready_streak = 0
+            time.sleep(0.1)
+    server.terminate()
+    raise SystemExit("❌ uvicorn did not start")
+
+
+def client(port, stop_at, results, client_id):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    latencies, ids, errors = [], [], 0
+    n = 0
+    while time.perf_counter() < stop_at:
+        report_id = f"{client_id}-{n}"
+        n += 1
+        body = json.dumps({**REPORT, "remarks": report_id})
+        start = time.perf_counter()
+        try:
+            conn.request("POST", "/report-case", body, {"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        if ok:
+            latencies.append((time.perf_counter() - start) * 1000)
+            ids.append(report_id)
+        else:
+            errors += 1
+    conn.close()
+    results[client_id] = (latencies, ids, errors)
+
+
+def stored_lines(path, storage):
+    if storage == "sqlite":
+        conn = sqlite3.connect(path.with_suffix(".db"))
+        try:
+            return [text.encode() for (text,) in conn.execute("SELECT report FROM case_reports")]
+        finally:
+            conn.close()
+    with open(path, "rb") as f:
+        return f.readlines()
+
+
+def verify_file(path, acknowledged, storage):
+    seen = {}
+    torn = 0
+    for line in stored_lines(path, storage):
+        try:
+            report = json.loads(line)
+        except json.JSONDecodeError:
+            torn += 1
+            continue
+        seen[report.get("remarks")] = seen.get(report.get("remarks"), 0) + 1
+    missing = sum(1 for report_id in acknowledged if report_id not in seen)
+    duplicated = sum(1 for count in seen.values() if count > 1)
+    return {"lines_ok": sum(seen.values()), "torn_lines": torn, "missing": missing, "duplicated": duplicated}
+
+
+def run(config_name, extra_env, workers, concurrency, seconds, storage):
+    with tempfile.TemporaryDirectory() as tmp:
+        reports_path = Path(tmp) / "case_reports.jsonl"
+        port = free_port()
+        server = start_server(port, reports_path, workers, extra_env, storage)
+        try:
+            results = {}
+            stop_at = time.perf_counter() + seconds
+            threads = [threading.Thread(target=client, args=(port, stop_at, results, i)) for i in range(concurrency)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+        latencies = [ms for lat, _, _ in results.values() for ms in lat]
+        acknowledged = [i for _, ids, _ in results.values() for i in ids]
+        errors = sum(e for _, _, e in results.values())
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+        return {
+            "config": config_name,
+            "storage": storage,
+            "env": extra_env,
+            "workers": workers,
+            "concurrency": concurrency,
+            "reports": len(acknowledged),
+            "errors": errors,
+            "reports_per_sec": round(len(acknowledged) / elapsed, 1),
+            "p50_ms": round(quantiles[49], 2),
+            "p99_ms": round(quantiles[98], 2),
+            "file": verify_file(reports_path, acknowledged, storage),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--config", choices=sorted(CONFIGS), nargs="+", default=list(CONFIGS))
+    parser.add_argument("--storage", choices=["files", "sqlite"], default="files", help="STORAGE_BACKEND to test")
+    args = parser.parse_args()
+
+    runs = [run(name, CONFIGS[name], args.workers, args.concurrency, args.seconds, args.storage) for name in args.config]
+    print(json.dumps(runs, indent=2))
+    bad = [r["config"] for r in runs if r["file"]["torn_lines"] or r["file"]["missing"] or r["file"]["duplicated"]]
+    if bad:
+        print(f"❌ File integrity check failed for: {', '.join(bad)}")
+        sys.exit(1)
+    print("✅ Every acknowledged report was written exactly once")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Upload ingestion benchmark: legacy in-memory pandas path vs streaming ingest_csv.
+
+Generates a synthetic climate CSV (1M rows by default, multi-year and
+multi-barangay) and ingests it with each method in a fresh subprocess, so
+peak RSS is measured per method:
+
+- legacy:    read all bytes, pd.read_csv, df.to_csv (what the handlers did)
+- streaming: ingest.ingest_csv (chunked read, row validation, incremental write)
+
+Usage (from the backend directory):
+    python benchmarks/bench_upload_ingest.py
+    python benchmarks/bench_upload_ingest.py --rows 200000 --kind dengue
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BARANGAYS = ["Bagumbayan Norte", "Balatas", "Concepcion Grande", "San Felipe", "Tinago",
+             "Abella", "Cararayan", "Dayangdang", "Pacol", "Triangulo"]
+
+CHILD = r"""
+import io, json, resource, sys, time
+sys.path.insert(0, {backend!r})
+method, kind, src, dst = sys.argv[1:5]
+if method == "legacy":
+    import pandas as pd
+else:
+    from ingest import ingest_csv
+baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+if method == "legacy":
+    with open(src, "rb") as f:
+        contents = f.read()
+    df = pd.read_csv(io.BytesIO(contents))
+    rows = len(df)
+    df.to_csv(dst, index=False)
+else:
+    with open(src, "rb") as f:
+        rows = ingest_csv(f, kind, dst)["rows"]
+seconds = time.perf_counter() - start
+peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"rows": rows, "seconds": seconds, "baseline_kb": baseline_kb, "peak_kb": peak_kb}}))
+"""
+
+
+def generate(path, kind, rows, seed=0):
+    rng = random.Random(seed)
+    start = date(2000, 1, 1)
+    with open(path, "w") as f:
+        if kind == "climate":
+            f.write("date,rainfall,temperature,humidity,barangay\n")
+        else:
+            f.write("date,barangay,cases\n")
+        per_day = len(BARANGAYS)
+        for i in range(rows):
+            day = (start + timedelta(days=i // per_day)).isoformat()
+            barangay = BARANGAYS[i % per_day]
+            if kind == "climate":
+                f.write(f"{day},{rng.uniform(0, 400):.1f},{rng.uniform(22, 34):.2f},{rng.randint(55, 98)},{barangay}\n")
+            else:
+                f.write(f"{day},{barangay},{rng.randint(0, 30)}\n")
+
+
+def run(method, kind, src, dst):
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD.format(backend=str(BACKEND_DIR)), method, kind, str(src), str(dst)],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"❌ {method} failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return {
+        "rows": result["rows"],
+        "seconds": round(result["seconds"], 3),
+        "rows_per_sec": round(result["rows"] / result["seconds"], 1),
+        "peak_rss_mb": round(result["peak_kb"] / 1024, 1),
+        "rss_growth_mb": round((result["peak_kb"] - result["baseline_kb"]) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--kind", choices=["climate", "dengue"], default="climate")
+    parser.add_argument("--methods", nargs="+", choices=["legacy", "streaming"], default=["legacy", "streaming"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / f"synthetic_{args.kind}.csv"
+        start = time.perf_counter()
+        generate(src, args.kind, args.rows)
+        results = {
+            "input": {"kind": args.kind, "rows": args.rows, "size_mb": round(src.stat().st_size / 2**20, 1),
+                      "generate_seconds": round(time.perf_counter() - start, 2)},
+        }
+        for method in args.methods:
+            results[method] = run(method, args.kind, src, Path(tmp) / f"out_{method}.csv")
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
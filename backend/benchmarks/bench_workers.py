@@ -0,0 +1,320 @@
+"""
+Multi-worker scaling and memory benchmark.
+
+For each worker count (--workers, default 1, 2, 4 ... up to the CPU count)
+and each server (--servers) starts the API, then measures:
+
+- throughput: POST /predict from --client-procs processes of --threads
+  keep-alive clients each for --seconds. The forecast cache and the risk
+  grid are off, so every request runs the forest.
+- memory per process from /proc/<pid>/smaps_rollup: RSS, PSS (shared pages
+  split between the processes that map them) and private (what a process
+  costs on its own). With preload the workers' private memory should stay
+  well below the parent's RSS.
+
+Servers:
+    gunicorn-preload   gunicorn.conf.py (model loaded in the parent, shared copy-on-write)
+    gunicorn           the same without preload (every worker loads its own model)
+    uvicorn            uvicorn --workers N (spawned workers, no sharing)
+
+Scaling efficiency is req/s divided by (workers x the 1-worker req/s of
+the same server); it can only approach 1.0 up to the number of free cores.
+
+With --storage sqlite the servers use a fresh SQLite database (the repo's
+case reports are imported into it) and every run also posts case reports
+over new connections, so they land on different workers, then checks that
+every worker reads the new total. This catches workers that share (or
+break on) a connection inherited from the preloading parent. A failed
+check makes the script exit 1.
+
+Usage (from the backend directory):
+    python benchmarks/bench_workers.py
+    python benchmarks/bench_workers.py --workers 1 2 4 8 --servers gunicorn-preload gunicorn --format mmap
+    python benchmarks/bench_workers.py --workers 2 4 --storage sqlite --seconds 3
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+SERVERS = ("gunicorn-preload", "gunicorn", "uvicorn")
+REQUEST = {"barangay": "Tinago", "climate": {"temperature": 29, "humidity": 80, "rainfall": 150}}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind, workers, port, model_format, storage_env=None):
+    env = {
+        **os.environ,
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(workers),
+        "GUNICORN_PRELOAD": "1" if kind == "gunicorn-preload" else "0",
+        "MODEL_FORMAT": model_format,
+        "FORECAST_CACHE_SIZE": "0",
+        "RISK_GRID_DAYS": "0",
+        "MODEL_WATCH_SECONDS": "0",
+        # One inference thread per worker: the scaling comes from the processes
+        "INFERENCE_WORKERS": "1",
+        **(storage_env or {}),
+    }
+    if kind == "uvicorn":
+        command = [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+                   "--workers", str(workers), "--log-level", "warning"]
+    else:
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}",
+                   "--log-level", "warning", "app:app"]
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline, streak = time.time() + 180, 0
+    while streak < workers * 4:
+        if time.time() > deadline or server.poll() is not None:
+            server.kill()
+            raise SystemExit(f"❌ {kind} with {workers} workers did not become ready")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=2)
+            streak += 1
+        except OSError:
+            streak = 0
+            time.sleep(0.2)
+    return server
+
+
+def children(pid):
+    """Child processes, without multiprocessing's resource tracker (uvicorn --workers starts one)"""
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids = [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+    workers = []
+    for child in pids:
+        try:
+            with open(f"/proc/{child}/cmdline", "rb") as f:
+                if b"resource_tracker" in f.read():
+                    continue
+        except OSError:
+            continue
+        workers.append(child)
+    return workers
+
+
+def memory_mb(pid):
+    """RSS, PSS and private memory of one process in MB (Linux smaps_rollup)"""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    values[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        return None
+    private = values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)
+    return {"rss": round(values.get("Rss", 0) / 1024, 1), "pss": round(values.get("Pss", 0) / 1024, 1),
+            "private": round(private / 1024, 1)}
+
+
+def server_memory(server_pid):
+    """Parent (gunicorn arbiter / uvicorn supervisor) and worker memory"""
+    # uvicorn --workers 1 serves from the parent itself
+    worker_pids = [pid for pid in children(server_pid) if memory_mb(pid)] or [server_pid]
+    workers = [memory_mb(pid) for pid in worker_pids]
+    parent = memory_mb(server_pid) if worker_pids != [server_pid] else None
+    processes = workers + ([parent] if parent else [])
+    return {
+        "parent": parent,
+        "worker_avg": {key: round(statistics.mean(w[key] for w in workers), 1) for key in ("rss", "pss", "private")},
+        "total_pss": round(sum(p["pss"] for p in processes), 1),
+        "total_rss": round(sum(p["rss"] for p in processes), 1),
+    }
+
+
+def client_process(port, threads, seconds, client_id, results):
+    """One load-generating process: `threads` keep-alive clients for `seconds`"""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    deadline = time.time() + seconds
+
+    def client(thread_id):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local, n = [], 0
+        while time.time() < deadline:
+            body = json.dumps({**REQUEST, "date": f"2025-{1 + n % 12:02d}-{1 + (thread_id + n) % 28:02d}"})
+            n += 1
+            start = time.perf_counter()
+            try:
+                conn.request("POST", "/predict", body, {"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+                    continue
+            except (OSError, http.client.HTTPException) as e:
+                errors.append(type(e).__name__)
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                continue
+            local.append((time.perf_counter() - start) * 1000)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=client, args=(client_id * 1000 + i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put((latencies, errors))
+
+
+def request_json(port, method, path, body=None):
+    """One request on a new connection (so consecutive calls can reach different workers)"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    try:
+        conn.request(method, path, json.dumps(body) if body is not None else None,
+                     {"Content-Type": "application/json", "Connection": "close"})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b"null")
+    finally:
+        conn.close()
+
+
+def check_case_reports(port, workers, per_worker=10):
+    """Post reports from several clients at once, then read the total back on new connections"""
+    status, analytics = request_json(port, "GET", "/case-reports/analytics?recent=0")
+    if status != 200:
+        return {"ok": False, "error": f"analytics answered {status}"}
+    before = analytics["total_reports"]
+    count = per_worker * workers
+    report = {"barangay": "Tinago", "name": "Worker check", "age": "30", "sex": "F", "address": "Naga City",
+              "dateReported": time.strftime("%Y-%m-%d"), "timeReported": "08:00", "reportedBy": "bench_workers",
+              "fever": True, "riskYellow": True, "advisedMonitoring": True}
+    statuses = []
+    lock = threading.Lock()
+
+    def post(n):
+        for _ in range(n):
+            try:
+                status, _ = request_json(port, "POST", "/report-case", report)
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                status = type(e).__name__
+            with lock:
+                statuses.append(status)
+
+    pool = [threading.Thread(target=post, args=(per_worker,)) for _ in range(workers)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    failed = [s for s in statuses if s != 200]
+    # Several reads on new connections, so every worker is asked at least once in practice
+    totals = sorted({request_json(port, "GET", "/case-reports/analytics?recent=0")[1]["total_reports"]
+                     for _ in range(workers * 4)})
+    return {"ok": not failed and totals == [before + count], "posted": count, "post_errors": len(failed),
+            "totals_seen": totals, "expected_total": before + count}
+
+
+def run_load(port, client_procs, threads, seconds):
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=client_process, args=(port, threads, seconds, i, results))
+             for i in range(client_procs)]
+    for proc in procs:
+        proc.start()
+    outcomes = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    latencies = [ms for lat, _ in outcomes for ms in lat]
+    errors = [e for _, errs in outcomes for e in errs]
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) >= 2 else None
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / seconds, 1),
+        "errors": len(errors),
+        "p50_ms": round(quantiles[49], 2) if quantiles else None,
+        "p99_ms": round(quantiles[98], 2) if quantiles else None,
+    }
+
+
+def main():
+    cores = os.cpu_count() or 1
+    default_workers = sorted({1, *[n for n in (2, 4, 8, 16) if n <= cores], cores})
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    parser.add_argument("--servers", nargs="+", choices=SERVERS, default=["gunicorn-preload", "uvicorn"])
+    parser.add_argument("--format", choices=["pickle", "mmap"], default="pickle", help="MODEL_FORMAT")
+    parser.add_argument("--client-procs", type=int, default=max(1, cores // 2))
+    parser.add_argument("--threads", type=int, default=8, help="keep-alive clients per client process")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--storage", choices=["files", "sqlite"], default="files", help="STORAGE_BACKEND")
+    args = parser.parse_args()
+
+    if args.format == "mmap":
+        # Export the artifact once up front, as the Render build step does
+        subprocess.run([sys.executable, "model_artifact.py"], cwd=BACKEND_DIR, check=True, stdout=subprocess.DEVNULL)
+
+    results, checks_failed = [], False
+    for kind in args.servers:
+        baseline_rps = None
+        for workers in args.workers:
+            port = free_port()
+            tmp = tempfile.TemporaryDirectory()
+            storage_env = None
+            if args.storage == "sqlite":
+                storage_env = {"STORAGE_BACKEND": "sqlite", "SQLITE_PATH": str(Path(tmp.name) / "moskita.db")}
+            server = start_server(kind, workers, port, args.format, storage_env)
+            case_check = None
+            try:
+                memory = server_memory(server.pid)
+                load = run_load(port, args.client_procs, args.threads, args.seconds)
+                if args.storage == "sqlite":
+                    case_check = check_case_reports(port, workers)
+                    checks_failed = checks_failed or not case_check["ok"]
+                # Memory again under load: copy-on-write pages get un-shared as workers touch them
+                memory_after = server_memory(server.pid)
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+                tmp.cleanup()
+            if workers == args.workers[0]:
+                baseline_rps = load["rps"] / workers
+            result = {
+                "server": kind,
+                "workers": workers,
+                **load,
+                "scaling_efficiency": round(load["rps"] / (workers * baseline_rps), 2) if baseline_rps else None,
+                "memory_mb_idle": memory,
+                "memory_mb_loaded": memory_after,
+            }
+            if case_check is not None:
+                result["case_report_check"] = case_check
+            results.append(result)
+            print(f"{kind:17} workers={workers:<3} {load['rps']:>8} req/s  p99 {load['p99_ms']} ms  "
+                  f"worker private {memory_after['worker_avg']['private']} MB  total PSS {memory_after['total_pss']} MB",
+                  file=sys.stderr)
+            if case_check is not None:
+                print(f"{'':17} case reports across workers: {'✅' if case_check['ok'] else '❌'} {case_check}",
+                      file=sys.stderr)
+
+    print(json.dumps({"cores": cores, "format": args.format, "storage": args.storage, "results": results},
+                     indent=2))
+    if checks_failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+"""
+Load test for the API with the frontend's mix of calls.
+
+Builds a synthetic deployment in a temporary directory:
+
+- climate.csv with --climate-days days of seasonal climate
+- a forest trained on --barangays barangays (the five served ones plus
+  "Barangay NNN" extras) through feature_pipeline, with retrain_model.py's
+  parameters, saved like the training scripts save it
+- case_reports.jsonl with --case-reports reports
+
+then drives the calls of frontend/src/services/api.js from --concurrency
+closed-loop clients for --seconds (after --warmup-seconds that are not
+recorded). By default the app runs in-process behind httpx's ASGI
+transport. With --uvicorn it runs as a real server (--workers processes).
+
+Mixes (--mix), as weights per call:
+    dashboard   all-barangays map, insights, case reports list, uploads
+    barangay    barangay pages: weekly forecast, /predict, batch
+    reporting   case reporting: /report-case and the reports list
+    mixed       all of the above (default)
+
+Reports p50/p95/p99 latency, requests/sec and errors per endpoint and
+overall, plus the server's RSS. The result is saved as JSON (--output,
+default benchmarks/results/). With --baseline it is compared with an
+earlier result, and the script exits 1 if an endpoint's p95 or throughput
+got worse by more than --max-regression.
+
+Needs httpx (pip install httpx); the repo data and model files are not touched.
+
+Usage (from the backend directory):
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --mix dashboard --concurrency 32 --seconds 20
+    python benchmarks/load_test.py --uvicorn --workers 4 --barangays 200 --case-reports 100000
+    python benchmarks/load_test.py --baseline benchmarks/results/load_mixed_inprocess_20260101-120000.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = BACKEND_DIR / "benchmarks" / "results"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from feature_pipeline import DEFAULT_BARANGAYS  # noqa: E402
+
+MIXES = {
+    "dashboard": {"all_barangays": 4, "insights": 2, "case_reports": 2, "barangays": 1, "uploads": 1},
+    "barangay": {"weekly": 4, "predict": 4, "batch": 1, "barangays": 1},
+    "reporting": {"report_case": 3, "case_reports": 3, "insights": 1},
+    "mixed": {"all_barangays": 3, "insights": 2, "case_reports": 2, "barangays": 1, "uploads": 1,
+              "weekly": 3, "predict": 3, "batch": 1, "report_case": 1},
+}
+# The dashboard sends the current weather, which only changes a few times a day
+WEATHER = [
+    {"temperature": 28.0, "humidity": 75.0, "rainfall": 100.0},
+    {"temperature": 29.4, "humidity": 81.0, "rainfall": 12.3},
+    {"temperature": 27.1, "humidity": 88.0, "rainfall": 4.8},
+    {"temperature": 31.2, "humidity": 64.0, "rainfall": 0.0},
+]
+FOREST_PARAMS = dict(n_estimators=100, max_depth=10, min_samples_split=5, min_samples_leaf=2,
+                     class_weight="balanced", random_state=42, n_jobs=-1)
+
+
+def barangay_names(n):
+    extra = [f"Barangay {i:03d}" for i in range(1, max(0, n - len(DEFAULT_BARANGAYS)) + 1)]
+    return list(DEFAULT_BARANGAYS) + extra
+
+
+def seasonal_climate(day: date, rng):
+    season = math.sin(2 * math.pi * day.timetuple().tm_yday / 365.25)
+    return {
+        "rainfall": round(max(0.0, 180 + 140 * season + rng.gauss(0, 50)), 1),
+        "temperature": round(28 + 2.5 * season + rng.gauss(0, 0.8), 2),
+        "humidity": round(min(100.0, max(40.0, 76 + 12 * season + rng.gauss(0, 5))), 1),
+    }
+
+
+def build_dataset(tmp: Path, barangays, climate_days, case_reports, train_rows, seed=0):
+    """Write the synthetic climate, model, encoder and case reports; returns the app environment"""
+    import numpy as np
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+    from feature_pipeline import training_arrays
+    from model_bundle import save_model_files
+
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=climate_days)
+    days = [start + timedelta(days=i) for i in range(climate_days)]
+    climate = pd.DataFrame([{"date": d.isoformat(), **seasonal_climate(d, rng)} for d in days])
+    climate.to_csv(tmp / "climate.csv", index=False)
+
+    # One row per (date, barangay); outbreaks follow rain and humidity plus a per-barangay offset
+    n_rows = min(train_rows, climate_days * len(barangays))
+    np_rng = np.random.default_rng(seed)
+    day_index = np_rng.integers(0, climate_days, n_rows)
+    barangay_index = np_rng.integers(0, len(barangays), n_rows)
+    offsets = np_rng.normal(0, 0.3, len(barangays))
+    frame = climate.iloc[day_index].reset_index(drop=True)
+    frame["barangay"] = [barangays[i] for i in barangay_index]
+    risk = frame["rainfall"] / 300 + frame["humidity"] / 100 + offsets[barangay_index]
+    frame["cases"] = np_rng.poisson(np.clip(risk - 1.2, 0, None) * 4)
+    pipeline, X, y = training_arrays(frame)
+    start_time = time.perf_counter()
+    model = RandomForestClassifier(**FOREST_PARAMS).fit(X, y)
+    pipeline.stamp(model)
+    save_model_files(model, tmp / "rf_dengue_model.pkl", pipeline.to_encoder(), tmp / "barangay_encoder.pkl")
+    print(f"🌳 Synthetic model: {len(barangays)} barangays, {n_rows} rows, "
+          f"trained in {time.perf_counter() - start_time:.1f}s")
+
+    data_dir = tmp / "data"
+    data_dir.mkdir()
+    with open(data_dir / "case_reports.jsonl", "w") as f:
+        for i in range(case_reports):
+            reported_at = datetime.now() - timedelta(minutes=i)
+            f.write(json.dumps(stored_report(case_report(rng, barangays), reported_at)) + "\n")
+
+    return {
+        "MODEL_PATH": str(tmp / "rf_dengue_model.pkl"),
+        "ENCODER_PATH": str(tmp / "barangay_encoder.pkl"),
+        "MODEL_ARTIFACT_DIR": str(tmp / "model_artifact"),
+        "CLIMATE_DATA_PATH": str(tmp / "climate.csv"),
+        "DATA_DIR": str(data_dir),
+        "CASE_REPORTS_PATH": str(data_dir / "case_reports.jsonl"),
+        "SQLITE_PATH": str(data_dir / "moskita.db"),
+        "RETRAIN_JOBS_DIR": str(data_dir / "retrain_jobs"),
+        "HISTORY_DIR": str(tmp / "history"),
+    }
+
+
+def case_report(rng, barangays):
+    """Body of a /report-case request from the reporting form"""
+    risk = rng.choice(["riskRed", "riskYellow", "riskGreen"])
+    report = {
+        "barangay": rng.choice(barangays),
+        "name": f"Patient {rng.randint(1, 10**6)}",
+        "age": str(rng.randint(1, 90)),
+        "sex": rng.choice(["M", "F"]),
+        "address": "Naga City",
+        "dateReported": (date.today() - timedelta(days=rng.randint(0, 60))).isoformat(),
+        "timeReported": f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}",
+        "reportedBy": "load test",
+        "fever": rng.random() < 0.8,
+        "headache": rng.random() < 0.5,
+        risk: True,
+        "advisedMonitoring": True,
+    }
+    return report
+
+
+def stored_report(report, reported_at):
+    """The line /report-case would have appended to case_reports.jsonl for report"""
+    return {
+        **{key: report.get(key) for key in ("barangay", "name", "age", "sex", "address",
+                                            "dateReported", "timeReported", "reportedBy")},
+        "symptoms": {key: report.get(key, False) for key in ("fever", "headache", "musclePain", "rash",
+                                                             "nausea", "abdominalPain", "bleeding")},
+        "symptomOnsetDate": None,
+        "riskClassification": {color: report.get("risk" + color.title(), False)
+                               for color in ("red", "yellow", "green")},
+        "actionTaken": {key: report.get(key, False)
+                        for key in ("referredToFacility", "advisedMonitoring", "notifiedFamily")},
+        "remarks": None,
+        "reported_at": reported_at.isoformat(),
+    }
+
+
+def next_call(op, rng, barangays):
+    """(endpoint label, method, url, request kwargs) for one frontend call"""
+    today = date.today().isoformat()
+    if op == "barangays":
+        return "GET /barangays", "GET", "/barangays", {}
+    if op == "insights":
+        return "GET /insights", "GET", "/insights", {}
+    if op == "case_reports":
+        return "GET /case-reports", "GET", "/case-reports", {}
+    if op == "uploads":
+        return "GET /uploads", "GET", "/uploads", {}
+    if op == "all_barangays":
+        return ("GET /predict/all-barangays", "GET", "/predict/all-barangays",
+                {"params": {"start_date": today, **rng.choice(WEATHER)}})
+    if op == "weekly":
+        barangay = rng.choice(barangays)
+        return ("GET /predict/weekly/{barangay}", "GET", f"/predict/weekly/{barangay}",
+                {"params": {"start_date": today}})
+    if op == "predict":
+        return ("POST /predict", "POST", "/predict",
+                {"json": {"barangay": rng.choice(barangays), "date": today, "climate": rng.choice(WEATHER)}})
+    if op == "batch":
+        climate = rng.choice(WEATHER)
+        return ("POST /predict/batch", "POST", "/predict/batch",
+                {"json": [{"barangay": b, "date": today, "climate": climate} for b in rng.sample(barangays, min(5, len(barangays)))]})
+    if op == "report_case":
+        return "POST /report-case", "POST", "/report-case", {"json": case_report(rng, barangays)}
+    raise ValueError(op)
+
+
+async def drive(client, mix, barangays, concurrency, seconds, warmup_seconds, seed):
+    """Closed-loop clients; returns [(endpoint, ms, status)] recorded after the warm-up"""
+    ops, weights = list(MIXES[mix]), list(MIXES[mix].values())
+    samples = []
+    loop = asyncio.get_running_loop()
+    record_from = loop.time() + warmup_seconds
+    deadline = record_from + seconds
+
+    async def worker(worker_id):
+        rng = random.Random(seed * 1000 + worker_id)
+        while loop.time() < deadline:
+            endpoint, method, url, kwargs = next_call(rng.choices(ops, weights)[0], rng, barangays)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                status = response.status_code
+            except Exception as e:
+                status = type(e).__name__
+            if loop.time() >= record_from:
+                samples.append((endpoint, (time.perf_counter() - start) * 1000, status))
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return samples
+
+
+def summarize(samples, seconds):
+    latencies = [ms for _, ms, _ in samples]
+    errors = {}
+    for _, _, status in samples:
+        if status != 200:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+    summary = {"requests": len(samples), "rps": round(len(samples) / seconds, 1), "errors": errors}
+    if len(latencies) >= 2:
+        # Inclusive: interpolates between observed samples, so no percentile exceeds max_ms
+        # (the default extrapolates past the data when there are few samples)
+        quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+        summary.update(p50_ms=round(quantiles[49], 2), p95_ms=round(quantiles[94], 2),
+                       p99_ms=round(quantiles[98], 2), max_ms=round(max(latencies), 2))
+    return summary
+
+
+def rss_mb(pids):
+    """Current resident set size of the given processes (Linux /proc), in MB"""
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+        except OSError:
+            pass
+    return round(total / 1024, 1) if total else None
+
+
+def process_tree(pid):
+    pids, queue = [], [pid]
+    while queue:
+        current = queue.pop()
+        pids.append(current)
+        try:
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                queue.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_inprocess(args, barangays):
+    import contextlib
+    import httpx
+    import app as api
+
+    with open(os.devnull, "w") as devnull, contextlib.ExitStack() as stack:
+        if not args.verbose:
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+        async with api.app.router.lifespan_context(api.app):
+            transport = httpx.ASGITransport(app=api.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+                samples = await drive(client, args.mix, barangays, args.concurrency, args.seconds,
+                                      args.warmup_seconds, args.seed)
+    # The load generator shares the process, so this is an upper bound for the app
+    return samples, {"current": rss_mb([os.getpid()]),
+                     "peak": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+
+
+async def run_uvicorn(args, barangays, env):
+    import httpx
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env={**os.environ, **env},
+        stdout=None if args.verbose else subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60, limits=limits) as client:
+            # Every worker has to be warmed up: /ready must answer 200 several times in a row
+            deadline, streak = time.time() + 180, 0
+            while streak < args.workers * 4:
+                if time.time() > deadline or server.poll() is not None:
+                    raise SystemExit("❌ uvicorn did not become ready")
+                try:
+                    streak = streak + 1 if (await client.get("/ready")).status_code == 200 else 0
+                except httpx.HTTPError:
+                    streak = 0
+                    await asyncio.sleep(0.2)
+            samples = await drive(client, args.mix, barangays, args.concurrency, args.seconds,
+                                  args.warmup_seconds, args.seed)
+        return samples, {"current": rss_mb(process_tree(server.pid)), "peak": None}
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def compare(result, baseline, max_regression):
+    """Print p95/throughput changes per endpoint; returns the endpoints that regressed"""
+    regressed = []
+    rows = [("overall", result["overall"], baseline.get("overall", {}))]
+    rows += [(name, stats, baseline.get("endpoints", {}).get(name, {})) for name, stats in result["endpoints"].items()]
+    print(f"\n{'endpoint':36} {'p95 ms (base -> now)':>26} {'req/s (base -> now)':>24}")
+    for name, now, base in rows:
+        if not base.get("p95_ms") or not now.get("p95_ms"):
+            continue
+        p95_change = now["p95_ms"] / base["p95_ms"] - 1
+        rps_change = now["rps"] / base["rps"] - 1 if base["rps"] else 0.0
+        worse = p95_change > max_regression or rps_change < -max_regression
+        if worse:
+            regressed.append(name)
+        print(f"{name:36} {base['p95_ms']:>9} -> {now['p95_ms']:<8} ({p95_change:+.0%}) "
+              f"{base['rps']:>8} -> {now['rps']:<7} ({rps_change:+.0%}){'  ❌' if worse else ''}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0, help="recorded load duration")
+    parser.add_argument("--warmup-seconds", type=float, default=2.0)
+    parser.add_argument("--barangays", type=int, default=len(DEFAULT_BARANGAYS))
+    parser.add_argument("--climate-days", type=int, default=3650)
+    parser.add_argument("--case-reports", type=int, default=5000)
+    parser.add_argument("--train-rows", type=int, default=50000, help="cap on synthetic training rows")
+    parser.add_argument("--uvicorn", action="store_true", help="run a real uvicorn server instead of in-process")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (with --uvicorn)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="result JSON (default benchmarks/results/load_<mix>_<mode>_<time>.json)")
+    parser.add_argument("--baseline", type=Path, help="earlier result JSON to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed p95/throughput change (0.2 = 20%%)")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's log output")
+    args = parser.parse_args()
+
+    barangays = barangay_names(args.barangays)
+    mode = f"uvicorn{args.workers}" if args.uvicorn else "inprocess"
+    with tempfile.TemporaryDirectory() as tmp:
+        env = build_dataset(Path(tmp), barangays, args.climate_days, args.case_reports, args.train_rows, args.seed)
+        env.update(RISK_GRID_DAYS=os.getenv("RISK_GRID_DAYS", "30"), MODEL_WATCH_SECONDS="0")
+        if args.uvicorn:
+            env["WARMUP_MODE"] = "background"
+            samples, rss = asyncio.run(run_uvicorn(args, barangays, env))
+        else:
+            # app reads its configuration at import time
+            os.environ.update(env)
+            samples, rss = asyncio.run(run_inprocess(args, barangays))
+
+    by_endpoint = {}
+    for sample in samples:
+        by_endpoint.setdefault(sample[0], []).append(sample)
+    result = {
+        "config": {
+            "mix": args.mix, "mode": mode, "concurrency": args.concurrency, "seconds": args.seconds,
+            "barangays": args.barangays, "climate_days": args.climate_days, "case_reports": args.case_reports,
+            "seed": args.seed,
+        },
+        "commit": subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                 capture_output=True, text=True).stdout.strip() or None,
+        "finished_at": datetime.now().isoformat(timespec="seconds"),
+        "overall": summarize(samples, args.seconds),
+        "endpoints": {name: summarize(items, args.seconds) for name, items in sorted(by_endpoint.items())},
+        "rss_mb": rss,
+    }
+    print(json.dumps(result, indent=2))
+
+    output = args.output or RESULTS_DIR / f"load_{args.mix}_{mode}_{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    print(f"💾 Saved {output}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("config") != result["config"]:
+            print(f"⚠️  Baseline was run with a different configuration: {baseline.get('config')}")
+        regressed = compare(result, baseline, args.max_regression)
+        if regressed:
+            print(f"❌ Regressed beyond {args.max_regression:.0%}: {', '.join(regressed)}")
+            sys.exit(1)
+        print(f"✅ No endpoint regressed beyond {args.max_regression:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+"""
+Case-report store - incrementally maintained index over case_reports.jsonl.
+
+/case-reports used to re-read and re-parse the whole JSONL file, sort it and
+recount every analytics bucket on each request. CaseReportStore reads the
+file once, then only the bytes appended since the last read (by this
+process or by another worker), and keeps:
+
+- a recency index (newest first), so recent_reports and paging cost
+  O(page size)
+- running analytics counters (by_barangay, by_risk, by_symptoms, by_date,
+  by_action) updated per report
+
+If the file shrinks or is replaced, the store rebuilds itself from scratch.
+
+Writes go through CaseReportWriter, an asyncio write-behind queue that
+group-commits reports: whatever arrives within CASE_WRITE_BATCH_MS (or up
+to CASE_WRITE_BATCH_SIZE reports) is appended with a single write under an
+exclusive file lock, so lines from several uvicorn workers never
+interleave, and fsynced once per batch. Each request is answered only
+after its batch is on disk.
+
+Configuration (environment variables):
+    CASE_WRITE_BATCH_SIZE   max reports per group commit (default 64, 1 = write each report alone)
+    CASE_WRITE_BATCH_MS     how long to wait for more reports after the first (default 5)
+    CASE_WRITE_FSYNC        "batch" (default): fsync every commit; "off": leave flushing to the OS
+
+Paging uses an opaque cursor "<reported_at>|<seq>" (seq = position in the
+file) so reports sharing a timestamp are neither skipped nor repeated; a
+bare reported_at value is accepted as well.
+"""
+import asyncio
+import bisect
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-worker dev setups only, no cross-process lock
+    fcntl = None
+
+CASE_WRITE_BATCH_SIZE = int(os.getenv("CASE_WRITE_BATCH_SIZE", 64))
+CASE_WRITE_BATCH_MS = float(os.getenv("CASE_WRITE_BATCH_MS", 5))
+CASE_WRITE_FSYNC = os.getenv("CASE_WRITE_FSYNC", "batch").lower()
+
+SYMPTOM_KEYS = ("fever", "headache", "musclePain", "rash", "nausea", "abdominalPain", "bleeding")
+ACTION_KEYS = ("referredToFacility", "advisedMonitoring", "notifiedFamily")
+RISK_KEYS = ("red", "yellow", "green")
+
+
+def risk_class(report: dict):
+    """Risk bucket a report is counted under in by_risk (red > yellow > green), or None"""
+    risk = report.get("riskClassification") or {}
+    if isinstance(risk, dict):
+        for key in RISK_KEYS:
+            if risk.get(key):
+                return key
+    return None
+
+
+def report_date(report: dict) -> str:
+    """YYYY-MM-DD used for date filters: dateReported, else the day it was submitted"""
+    return report.get("dateReported") or str(report.get("reported_at", ""))[:10]
+
+
+def report_filter(barangay: str = None, date_from: str = None, date_to: str = None, risk: str = None):
+    """Predicate for the optional filters, or None when no filter is set"""
+    if not (barangay or date_from or date_to or risk):
+        return None
+    wanted_barangay = barangay.lower() if barangay else None
+
+    def matches(report: dict) -> bool:
+        if wanted_barangay and str(report.get("barangay", "")).lower() != wanted_barangay:
+            return False
+        if date_from or date_to:
+            day = report_date(report)
+            if (date_from and day < date_from) or (date_to and day > date_to):
+                return False
+        if risk and risk_class(report) != risk:
+            return False
+        return True
+    return matches
+
+
+def append_lines(path, reports, fsync: bool = True) -> int:
+    """
+    Append reports as JSONL in one write while holding an exclusive lock on
+    the file, so concurrent writers (other workers) cannot interleave lines.
+    Returns the number of bytes written.
+    """
+    data = "".join(json.dumps(report) + "\n" for report in reports).encode()
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+        if fsync:
+            os.fsync(fd)
+    finally:
+        # Closing the descriptor also releases the lock
+        os.close(fd)
+    return len(data)
+
+
+def iter_report_lines(path, matches=None):
+    """
+    Stream report lines (bytes, newline-terminated) from the JSONL file in
+    file order without loading it, skipping malformed lines.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            if not line.strip() or not line.endswith(b"\n"):
+                continue  # Blank, or still being written
+            try:
+                report = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(report, dict) and (matches is None or matches(report)):
+                yield line
+
+
+class _Counts:
+    """
+    Counter that also remembers each key's newest report, so keys come out in
+    the order a newest-first scan would first meet them (what the dashboard
+    charts were built against).
+    """
+
+    def __init__(self, fixed_keys=()):
+        self.fixed_keys = tuple(fixed_keys)
+        self.counts = {key: 0 for key in self.fixed_keys}
+        self.newest = {}
+
+    def add(self, key, rank):
+        self.counts[key] = self.counts.get(key, 0) + 1
+        if key not in self.newest or rank > self.newest[key]:
+            self.newest[key] = rank
+
+    def as_dict(self) -> dict:
+        extra = sorted((key for key in self.counts if key not in self.fixed_keys),
+                       key=lambda key: self.newest[key], reverse=True)
+        return {key: self.counts[key] for key in (*self.fixed_keys, *extra)}
+
+
+class CaseReportStore:
+    """In-memory index over an append-only JSONL file of case reports"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._offset = 0        # Bytes of the file already indexed
+        self._file_id = None    # (st_dev, st_ino) of the indexed file
+        self._seq = 0           # File order of the next report
+        # Ascending by (reported_at, -seq): reversed, it is newest first with
+        # ties kept in file order, like a stable descending sort
+        self._keys = []
+        self._reports = []
+        self.skipped_lines = 0
+        self.by_barangay = _Counts()
+        self.by_risk = {key: 0 for key in RISK_KEYS}
+        self.by_symptoms = _Counts(SYMPTOM_KEYS)
+        self.by_date = _Counts()
+        self.by_action = _Counts(ACTION_KEYS)
+
+    # ----- ingestion -----
+
+    def _index(self, report: dict):
+        rank = (str(report.get("reported_at", "")), -self._seq)
+        self._seq += 1
+        position = bisect.bisect_left(self._keys, rank)
+        self._keys.insert(position, rank)
+        self._reports.insert(position, report)
+
+        self.by_barangay.add(report.get("barangay", "Unknown"), rank)
+
+        risk = risk_class(report)
+        if risk:
+            self.by_risk[risk] += 1
+
+        # Very old reports stored symptoms as free text; only the checkbox dicts are counted
+        symptoms = report.get("symptoms")
+        if isinstance(symptoms, dict):
+            for symptom, present in symptoms.items():
+                if present:
+                    self.by_symptoms.add(symptom, rank)
+
+        date_reported = report.get("dateReported", "")
+        if date_reported:
+            self.by_date.add(date_reported, rank)
+
+        actions = report.get("actionTaken")
+        if isinstance(actions, dict):
+            for action, taken in actions.items():
+                if taken:
+                    self.by_action.add(action, rank)
+
+    def refresh(self) -> int:
+        """Index whatever was appended to the file since the last call; returns the number of new reports"""
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                if self._offset:
+                    self._reset()
+                return 0
+            file_id = (stat.st_dev, stat.st_ino)
+            if file_id != self._file_id or stat.st_size < self._offset:
+                self._reset()
+                self._file_id = file_id
+            if stat.st_size == self._offset:
+                return 0
+
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                chunk = f.read(stat.st_size - self._offset)
+            # A line still being written by another process is picked up next time
+            complete = chunk.rfind(b"\n") + 1
+            added = 0
+            for line in chunk[:complete].splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    report = json.loads(line)
+                except json.JSONDecodeError:
+                    self.skipped_lines += 1
+                    continue
+                if not isinstance(report, dict):
+                    self.skipped_lines += 1
+                    continue
+                self._index(report)
+                added += 1
+            self._offset += complete
+            return added
+
+    def append(self, report: dict) -> dict:
+        """Persist one report and index it"""
+        self.append_many([report])
+        return report
+
+    def append_many(self, reports: list, fsync: bool = True):
+        """Persist a batch of reports with one locked write, then index them"""
+        # The store lock is not held during the write so readers are not stalled by fsync
+        append_lines(self.path, reports, fsync=fsync)
+        self.refresh()
+
+    # ----- queries -----
+
+    def __len__(self) -> int:
+        return len(self._reports)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def newest(self, limit: int = None, offset: int = 0) -> list:
+        """Reports newest first; O(limit)"""
+        with self._lock:
+            end = len(self._reports) - offset
+            start = 0 if limit is None else max(0, end - limit)
+            return self._reports[start:max(0, end)][::-1]
+
+    def _cursor_position(self, cursor: str) -> int:
+        """Index in _keys of the first report older than the cursor"""
+        reported_at, sep, seq = cursor.rpartition("|")
+        if sep and seq.lstrip("-").isdigit():
+            return bisect.bisect_left(self._keys, (reported_at, -int(seq)))
+        return bisect.bisect_left(self._keys, (cursor, float("-inf")))
+
+    def page(self, limit: int, cursor: str = None, **filters):
+        """
+        Up to `limit` reports (newest first) older than `cursor` that pass the
+        filters (barangay, date_from, date_to, risk). Returns (reports,
+        next_cursor); next_cursor is None on the last page. O(limit) without
+        filters, O(reports scanned) with them.
+        """
+        matches = report_filter(**filters)
+        with self._lock:
+            position = len(self._keys) if cursor is None else self._cursor_position(cursor)
+            reports = []
+            while position > 0 and len(reports) < limit:
+                position -= 1
+                report = self._reports[position]
+                if matches is None or matches(report):
+                    reports.append(report)
+            # A full page always gets a cursor; the page after it may be empty
+            if len(reports) < limit or position == 0:
+                return reports, None
+            reported_at, neg_seq = self._keys[position]
+            return reports, f"{reported_at}|{-neg_seq}"
+
+    def export_lines(self, **filters):
+        """Report lines (bytes) in file order, streamed from disk"""
+        return iter_report_lines(self.path, report_filter(**filters))
+
+    def analytics(self, recent: int = 10) -> dict:
+        with self._lock:
+            return {
+                "total_reports": len(self._reports),
+                "by_barangay": self.by_barangay.as_dict(),
+                "by_risk": dict(self.by_risk),
+                "by_symptoms": self.by_symptoms.as_dict(),
+                "by_date": self.by_date.as_dict(),
+                "by_action": self.by_action.as_dict(),
+                "recent_reports": self.newest(recent),
+            }
+
+    def stats(self) -> dict:
+        return {
+            "reports": len(self._reports),
+            "indexed_bytes": self._offset,
+            "skipped_lines": self.skipped_lines,
+        }
+
+
+class CaseReportWriter:
+    """Write-behind queue that group-commits case reports to a CaseReportStore"""
+
+    def __init__(self, store: CaseReportStore, batch_size: int = CASE_WRITE_BATCH_SIZE,
+                 batch_ms: float = CASE_WRITE_BATCH_MS, fsync: str = CASE_WRITE_FSYNC):
+        if fsync not in ("batch", "off"):
+            raise ValueError(f"Unknown CASE_WRITE_FSYNC '{fsync}' (use 'batch' or 'off')")
+        self.store = store
+        self.batch_size = max(1, batch_size)
+        self.batch_ms = max(0.0, batch_ms)
+        self.fsync = fsync
+        self._queue = None
+        self._task = None
+        self.commits = 0
+        self.written = 0
+        self.failed = 0
+        self.largest_batch = 0
+        self.commit_seconds = 0.0
+
+    def start(self):
+        """Start the flusher task on the running event loop"""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        """Flush whatever is queued and stop the flusher"""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def submit(self, report: dict) -> dict:
+        """Queue a report and wait until the batch containing it is committed"""
+        if self._task is None:
+            # Not started (e.g. used outside the app lifespan): write directly
+            await asyncio.to_thread(self.store.append_many, [report], self.fsync == "batch")
+            return report
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((report, future))
+        return await future
+
+    async def _next_batch(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.batch_ms / 1000
+        while len(batch) < self.batch_size:
+            # Take everything already queued, then wait out the rest of the window
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _flush_loop(self):
+        while True:
+            batch = await self._next_batch()
+            reports = [report for report, _ in batch]
+            start = time.perf_counter()
+            try:
+                await asyncio.to_thread(self.store.append_many, reports, self.fsync == "batch")
+                error = None
+            except Exception as e:
+                error = e
+            self.commit_seconds += time.perf_counter() - start
+            if error is None:
+                self.commits += 1
+                self.written += len(batch)
+                self.largest_batch = max(self.largest_batch, len(batch))
+            else:
+                self.failed += len(batch)
+            for report, future in batch:
+                if not future.done():
+                    if error is None:
+                        future.set_result(report)
+                    else:
+                        future.set_exception(error)
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        return {
+            "batch_size": self.batch_size,
+            "batch_ms": self.batch_ms,
+            "fsync": self.fsync,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "commits": self.commits,
+            "written": self.written,
+            "failed": self.failed,
+            "largest_batch": self.largest_batch,
+            "avg_batch": round(self.written / self.commits, 2) if self.commits else 0.0,
+            "avg_commit_ms": round(self.commit_seconds / self.commits * 1000, 3) if self.commits else 0.0,
+        }
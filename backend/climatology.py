@@ -0,0 +1,193 @@
+"""
+Incremental historical climatology.
+
+load_historical_climate used to group the whole climate file by ISO week
+and by month once, keep the dict-of-dicts forever and never see uploaded
+climate data. Climatology keeps running sums and counts instead:
+
+    weekly   (53, 3) sums + (53,) counts, slot = ISO week - 1
+    monthly  (12, 3) sums + (12,) counts, slot = month - 1
+
+per city and per barangay (when the data has a barangay column). Folding
+in an upload costs O(new rows); the means used for lookups are recomputed
+from the 65 slots and published together with a new version number, so
+readers never see a half-applied update and caches keyed on the version
+(forecast cache, risk grid) know when to drop their entries.
+
+Rows go through the same cleaning as before (complete rows only, rainfall
+0-500, temperature 20-35, humidity 40-100) and means are rounded to 2
+decimals, so lookups match the old groupby.
+"""
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+CLIMATE_COLUMNS = ('rainfall', 'temperature', 'humidity')
+WEEK_SLOTS = 53
+MONTH_SLOTS = 12
+# Valid reading ranges; rows outside are sensor errors / outliers
+VALID_RANGES = {'rainfall': (0, 500), 'temperature': (20, 35), 'humidity': (40, 100)}
+
+
+class _Aggregate:
+    """Running sums/counts for one area and the rounded means derived from them"""
+
+    def __init__(self):
+        import numpy as np
+        self.week_sums = np.zeros((WEEK_SLOTS, len(CLIMATE_COLUMNS)))
+        self.week_counts = np.zeros(WEEK_SLOTS, dtype=np.int64)
+        self.month_sums = np.zeros((MONTH_SLOTS, len(CLIMATE_COLUMNS)))
+        self.month_counts = np.zeros(MONTH_SLOTS, dtype=np.int64)
+        self.week_means = None
+        self.month_means = None
+
+    def copy(self) -> "_Aggregate":
+        clone = _Aggregate.__new__(_Aggregate)
+        clone.week_sums = self.week_sums.copy()
+        clone.week_counts = self.week_counts.copy()
+        clone.month_sums = self.month_sums.copy()
+        clone.month_counts = self.month_counts.copy()
+        clone.week_means = self.week_means
+        clone.month_means = self.month_means
+        return clone
+
+    def add(self, weeks: "np.ndarray", months: "np.ndarray", values: "np.ndarray"):
+        import numpy as np
+        np.add.at(self.week_sums, weeks - 1, values)
+        self.week_counts += np.bincount(weeks - 1, minlength=WEEK_SLOTS)
+        np.add.at(self.month_sums, months - 1, values)
+        self.month_counts += np.bincount(months - 1, minlength=MONTH_SLOTS)
+        self.week_means = _means(self.week_sums, self.week_counts)
+        self.month_means = _means(self.month_sums, self.month_counts)
+
+
+def _means(sums: "np.ndarray", counts: "np.ndarray") -> list:
+    """Rounded means per slot as Python floats, None for empty slots"""
+    import numpy as np
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.round(sums / counts[:, None], 2)
+    return [tuple(row) if count else None for row, count in zip(means.tolist(), counts.tolist())]
+
+
+class Climatology:
+    """
+    Thread-safe climatology. Lookups read an immutable snapshot; add_frame
+    builds the next snapshot off to the side and swaps it in.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._city = None  # _Aggregate, None until some valid row was added
+        self._barangays = {}  # barangay -> _Aggregate
+        self.sources = set()  # Files already folded in
+        self.rows = 0
+        self.version = 0
+
+    def add_frame(self, df: "pd.DataFrame", source: str = None) -> int:
+        """Fold a parsed climate frame (datetime 'date' column) in; returns the rows used"""
+        if source is not None and source in self.sources:
+            return 0
+        weeks, months, values, barangays = _clean(df)
+        with self._lock:
+            if source is not None and source in self.sources:
+                return 0
+            city = self._city.copy() if self._city is not None else _Aggregate()
+            areas = dict(self._barangays)
+            if len(values):
+                city.add(weeks, months, values)
+                if barangays is not None:
+                    for name in sorted(set(barangays.tolist()) - {''}):
+                        mask = barangays == name
+                        area = areas[name].copy() if name in areas else _Aggregate()
+                        area.add(weeks[mask], months[mask], values[mask])
+                        areas[name] = area
+            if source is not None:
+                self.sources.add(source)
+            if not len(values):
+                return 0
+            self._city, self._barangays = city, areas
+            self.rows += len(values)
+            self.version += 1
+        return len(values)
+
+    def add_csv(self, path) -> int:
+        """Fold a climate CSV in (once per file)"""
+        import pandas as pd
+        path = Path(path)
+        if str(path) in self.sources:
+            return 0
+        df = pd.read_csv(path)
+        df['date'] = pd.to_datetime(df['date'], errors='coerce')
+        return self.add_frame(df, source=str(path))
+
+    def lookup(self, target_date, barangay: str = None) -> Optional[tuple]:
+        """
+        ('weekly' | 'monthly', (rainfall, temperature, humidity)) for a date,
+        from the barangay's own history when it has some for that slot, else
+        the city-wide one; None if there is no history for that week or month.
+        """
+        city = self._city
+        if city is None:
+            return None
+        week_slot = target_date.isocalendar()[1] - 1
+        area = self._barangays.get(barangay) if barangay is not None else None
+        if area is None:
+            # City-wide only (the forecasting path): two slot reads
+            means = city.week_means[week_slot]
+            if means is not None:
+                return 'weekly', means
+            means = city.month_means[target_date.month - 1]
+            return ('monthly', means) if means is not None else None
+        areas = (area, city)
+        month_slot = target_date.month - 1
+        for area in areas:
+            means = area.week_means[week_slot]
+            if means is not None:
+                return 'weekly', means
+        for area in areas:
+            means = area.month_means[month_slot]
+            if means is not None:
+                return 'monthly', means
+        return None
+
+    @property
+    def barangays(self) -> list:
+        """Barangays with climate history of their own"""
+        return list(self._barangays)
+
+    def stats(self) -> dict:
+        city = self._city
+        return {
+            "version": self.version,
+            "rows": self.rows,
+            "sources": len(self.sources),
+            "weeks": int((city.week_counts > 0).sum()) if city is not None else 0,
+            "months": int((city.month_counts > 0).sum()) if city is not None else 0,
+            "barangays": sorted(self._barangays),
+        }
+
+
+def _clean(df: "pd.DataFrame"):
+    """ISO weeks, months, (n, 3) readings and barangays (or None) of the valid rows"""
+    import numpy as np
+    columns = ['date', *CLIMATE_COLUMNS] + (['barangay'] if 'barangay' in df.columns else [])
+    # A reading without a barangay still counts city-wide
+    df = df[columns].dropna(subset=['date', *CLIMATE_COLUMNS])
+    valid = np.ones(len(df), dtype=bool)
+    for column, (low, high) in VALID_RANGES.items():
+        valid &= ((df[column] >= low) & (df[column] <= high)).to_numpy()
+    df = df[valid]
+    dates = df['date']
+    weeks = dates.dt.isocalendar().week.to_numpy(dtype=np.int64)
+    months = dates.dt.month.to_numpy(dtype=np.int64)
+    values = df[list(CLIMATE_COLUMNS)].to_numpy(dtype=np.float64)
+    barangays = None
+    if 'barangay' in df.columns:
+        barangays = df['barangay'].where(df['barangay'].notna(), '').astype(str).str.strip().to_numpy()
+    return weeks, months, values, barangays
@@ -0,0 +1,368 @@
+"""
+Columnar history store for climate and dengue data.
+
+Every load of climate.csv / dengue_cases.csv used to re-parse the text and
+coerce the dates. With HISTORY_FORMAT=columnar the CSVs are imported once
+into a typed dataset, partitioned by year:
+
+    history/<dataset>/meta.json              schema, dictionaries, partition stats
+    history/<dataset>/year=2020/<column>.npy one uncompressed array per column
+
+Columns are loaded with mmap_mode='r' (like the model artifact), so a read
+only touches the columns it asks for (column pushdown), partitions outside
+the requested date range are never opened and equality filters on string
+columns are evaluated on their integer codes (predicate pushdown).
+
+Dates are stored as datetime64 (in the unit pandas parsed them with); rows whose date does not parse are
+dropped at import (they never survived the loaders' dropna/merge either).
+Text columns are dictionary-encoded. The dataset records the fingerprint of
+the CSV it came from and is rebuilt when the CSV changes, so the CSVs stay
+the import/export format.
+
+Parquet/Arrow would need pyarrow, which is not a dependency; the on-disk
+layout is the same shape (columns per partition + metadata) and reads the
+same way through read_table.
+
+Configuration (environment variables):
+    HISTORY_FORMAT   "csv" (default): parse the CSVs; "columnar": read the datasets
+    HISTORY_DIR      dataset root (default <repo>/history)
+
+Usage (from the backend directory):
+    python columnar_store.py                          # import ../climate.csv and ../dengue_cases.csv
+    python columnar_store.py export climate out.csv   # write a dataset back to CSV
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-worker dev setups only, no cross-process lock
+    fcntl = None
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+HISTORY_FORMAT = os.getenv("HISTORY_FORMAT", "csv").lower()
+HISTORY_DIR = Path(os.getenv("HISTORY_DIR", Path(__file__).parent.parent / "history"))
+HISTORY_FORMAT_VERSION = 1
+ROW_COLUMN = "_row"  # Original CSV position, keeps reads in source order
+
+_write_lock = threading.Lock()
+
+
+def dataset_meta(dataset_dir):
+    """meta.json of a dataset, or None if it does not exist / is from another format version"""
+    meta_path = Path(dataset_dir) / "meta.json"
+    if not meta_path.exists():
+        return None
+    meta = json.loads(meta_path.read_text())
+    if meta.get("format_version") != HISTORY_FORMAT_VERSION:
+        return None
+    return meta
+
+
+def _encode_frame(df: "pd.DataFrame", dictionaries: dict = None):
+    """Typed arrays + column schema for a parsed frame (text columns dictionary-encoded)"""
+    import numpy as np
+    import pandas as pd
+
+    dictionaries = {name: list(values) for name, values in (dictionaries or {}).items()}
+    arrays, schema = {}, {}
+    for name in df.columns:
+        column = df[name]
+        if name == "date" or pd.api.types.is_datetime64_any_dtype(column):
+            # Keep the unit pandas parsed with (ns or us), so reads match read_csv exactly
+            arrays[name] = column.to_numpy()
+            schema[name] = {"dtype": str(arrays[name].dtype), "encoding": "plain"}
+        elif pd.api.types.is_numeric_dtype(column) or pd.api.types.is_bool_dtype(column):
+            arrays[name] = column.to_numpy()
+            schema[name] = {"dtype": str(arrays[name].dtype), "encoding": "plain"}
+        else:
+            dictionary = dictionaries.setdefault(name, [])
+            lookup = {value: code for code, value in enumerate(dictionary)}
+            codes = np.empty(len(column), dtype=np.int32)
+            for i, value in enumerate(column.tolist()):
+                if value is None or (isinstance(value, float) and value != value):
+                    codes[i] = -1
+                    continue
+                value = str(value)
+                code = lookup.get(value)
+                if code is None:
+                    code = lookup[value] = len(dictionary)
+                    dictionary.append(value)
+                codes[i] = code
+            arrays[name] = codes
+            schema[name] = {"dtype": "int32", "encoding": "dictionary"}
+    for name, dictionary in dictionaries.items():
+        if name in schema:
+            schema[name]["dictionary"] = dictionary
+    return arrays, schema
+
+
+def _write_dataset(dataset_dir: Path, arrays: dict, schema: dict, meta_extra: dict):
+    """Write partitions + meta.json into a temp dir and swap it in (readers never see half a dataset)"""
+    import numpy as np
+
+    dataset_dir = Path(dataset_dir)
+    tmp_dir = dataset_dir.with_name(f"{dataset_dir.name}.tmp-{os.getpid()}")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    dates = arrays["date"]
+    years = dates.astype("datetime64[Y]").astype(np.int64) + 1970
+    partitions = []
+    for year in np.unique(years):
+        mask = years == year
+        part_dir = tmp_dir / f"year={int(year)}"
+        part_dir.mkdir()
+        for name, values in arrays.items():
+            np.save(part_dir / f"{name}.npy", np.ascontiguousarray(values[mask]))
+        part_dates = dates[mask]
+        partitions.append({
+            "year": int(year),
+            "rows": int(mask.sum()),
+            "min_date": str(part_dates.min().astype("datetime64[D]")),
+            "max_date": str(part_dates.max().astype("datetime64[D]")),
+        })
+
+    meta = {
+        "format_version": HISTORY_FORMAT_VERSION,
+        "columns": [name for name in schema],
+        "schema": schema,
+        "rows": int(len(dates)),
+        "partitions": partitions,
+        **meta_extra,
+    }
+    (tmp_dir / "meta.json").write_text(json.dumps(meta, indent=2))
+
+    old_dir = dataset_dir.with_name(f"{dataset_dir.name}.old-{os.getpid()}")
+    if dataset_dir.exists():
+        os.replace(dataset_dir, old_dir)
+    os.replace(tmp_dir, dataset_dir)
+    if old_dir.exists():
+        shutil.rmtree(old_dir, ignore_errors=True)
+    return meta
+
+
+def _parse_csv(csv_path) -> "pd.DataFrame":
+    """The one place the CSV text is parsed; unparseable dates are dropped"""
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    return df
+
+
+@contextmanager
+def _dataset_lock(dataset_dir):
+    """Serialize writers of a dataset across threads and worker processes"""
+    dataset_dir = Path(dataset_dir)
+    dataset_dir.parent.mkdir(parents=True, exist_ok=True)
+    with _write_lock, open(dataset_dir.with_name(f".{dataset_dir.name}.lock"), "w") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def import_csv(csv_path, dataset_dir) -> dict:
+    """(Re)build a dataset from a CSV; returns its meta"""
+    import numpy as np
+    from forecast_cache import fingerprint_files
+
+    df = _parse_csv(csv_path)
+    valid = df["date"].notna().to_numpy()
+    arrays, schema = _encode_frame(df[valid])
+    arrays[ROW_COLUMN] = np.flatnonzero(valid).astype(np.int64)
+    return _write_dataset(dataset_dir, arrays, schema, {
+        "source": Path(csv_path).name,
+        "source_version": fingerprint_files(csv_path),
+        "dropped_rows": int((~valid).sum()),
+    })
+
+
+def append_csv(csv_path, dataset_dir) -> dict:
+    """
+    Add the rows of an (already validated) CSV to a dataset, creating it if
+    needed. Used for uploads, which are small next to the history.
+    """
+    with _dataset_lock(dataset_dir):
+        return _append_csv(csv_path, dataset_dir)
+
+
+def _append_csv(csv_path, dataset_dir) -> dict:
+    import numpy as np
+
+    meta = dataset_meta(dataset_dir)
+    new = _parse_csv(csv_path)
+    new = new[new["date"].notna()]
+    if meta is None:
+        existing = None
+        dictionaries = {}
+    else:
+        existing = read_table(dataset_dir, decode=False)
+        dictionaries = {name: spec.get("dictionary", []) for name, spec in meta["schema"].items()
+                        if spec["encoding"] == "dictionary"}
+        missing = [name for name in meta["columns"] if name not in new.columns]
+        if missing:
+            raise ValueError(f"{csv_path} is missing columns {missing} of {dataset_dir}")
+        new = new[meta["columns"]]
+    arrays, schema = _encode_frame(new, dictionaries)
+    offset = 0
+    if existing is not None:
+        offset = int(existing[ROW_COLUMN].max()) + 1 if len(existing) else 0
+        for name, spec in schema.items():
+            # Let NumPy promote (e.g. int cases + a NaN in the upload -> float64)
+            arrays[name] = np.concatenate([existing[name].to_numpy(), arrays[name]])
+            if spec["encoding"] == "plain":
+                spec["dtype"] = str(arrays[name].dtype)
+    arrays[ROW_COLUMN] = np.concatenate([
+        existing[ROW_COLUMN].to_numpy() if existing is not None else np.empty(0, dtype=np.int64),
+        np.arange(offset, offset + len(new), dtype=np.int64),
+    ])
+    sources = (meta or {}).get("sources", []) + [Path(csv_path).name]
+    return _write_dataset(dataset_dir, arrays, schema, {"sources": sources, "dropped_rows": 0})
+
+
+def read_table(dataset_dir, columns=None, date_from=None, date_to=None, where: dict = None,
+               decode: bool = True) -> "pd.DataFrame":
+    """
+    Read a dataset as a DataFrame in source order.
+
+    columns     only these columns are mapped (default: all)
+    date_from / date_to
+                inclusive bounds (str or datetime); partitions outside are skipped
+    where       {column: value or list of values} equality filters; on text
+                columns they are matched against dictionary codes
+    decode      False keeps text columns as their int32 codes
+    """
+    import numpy as np
+    import pandas as pd
+
+    dataset_dir = Path(dataset_dir)
+    meta = dataset_meta(dataset_dir)
+    if meta is None:
+        raise FileNotFoundError(f"No columnar dataset at {dataset_dir}")
+    schema = meta["schema"]
+    columns = list(columns) if columns is not None else list(meta["columns"])
+    if not decode:
+        columns.append(ROW_COLUMN)
+    where = dict(where or {})
+
+    lower = pd.Timestamp(date_from).to_datetime64() if date_from is not None else None
+    upper = pd.Timestamp(date_to).to_datetime64() if date_to is not None else None
+
+    # Filter values -> codes for dictionary columns (a value the dataset never saw matches nothing)
+    filters = {}
+    for name, values in where.items():
+        values = values if isinstance(values, (list, tuple, set)) else [values]
+        spec = schema[name]
+        if spec["encoding"] == "dictionary":
+            lookup = {value: code for code, value in enumerate(spec["dictionary"])}
+            values = [lookup[str(v)] for v in values if str(v) in lookup]
+        filters[name] = np.asarray(values)
+
+    needed = list(dict.fromkeys(columns + [ROW_COLUMN] + list(filters) + (["date"] if lower is not None or upper is not None else [])))
+    pieces = {name: [] for name in needed}
+    for partition in meta["partitions"]:
+        if lower is not None and np.datetime64(partition["max_date"]) + np.timedelta64(1, "D") <= lower:
+            continue
+        if upper is not None and np.datetime64(partition["min_date"]) > upper:
+            continue
+        part_dir = dataset_dir / f"year={partition['year']}"
+        loaded = {name: np.load(part_dir / f"{name}.npy", mmap_mode="r") for name in needed}
+        mask = None
+        if lower is not None:
+            mask = loaded["date"] >= lower
+        if upper is not None:
+            upper_mask = loaded["date"] <= upper
+            mask = upper_mask if mask is None else mask & upper_mask
+        for name, codes in filters.items():
+            match = np.isin(loaded[name], codes)
+            mask = match if mask is None else mask & match
+        for name in needed:
+            values = loaded[name]
+            pieces[name].append(np.asarray(values[mask] if mask is not None else values))
+
+    data = {}
+    for name in needed:
+        if pieces[name]:
+            data[name] = np.concatenate(pieces[name])
+        else:
+            data[name] = np.empty(0, dtype=schema[name]["dtype"] if name in schema else np.int64)
+    order = np.argsort(data[ROW_COLUMN], kind="stable")
+    if np.any(order != np.arange(len(order))):
+        data = {name: values[order] for name, values in data.items()}
+
+    frame = {}
+    for name in columns:
+        values = data[name]
+        spec = schema.get(name)
+        if decode and spec and spec["encoding"] == "dictionary":
+            dictionary = np.asarray(spec["dictionary"] + [np.nan], dtype=object)
+            values = dictionary[values]  # code -1 picks the trailing NaN
+        frame[name] = values
+    return pd.DataFrame(frame, columns=columns)
+
+
+def ensure_dataset(csv_path, dataset_dir) -> dict:
+    """Meta of an up-to-date dataset, importing the CSV if it is missing or has changed"""
+    from forecast_cache import fingerprint_files
+
+    meta = dataset_meta(dataset_dir)
+    if meta is not None and meta.get("source_version") == fingerprint_files(csv_path):
+        return meta
+    with _dataset_lock(dataset_dir):
+        # Another worker may have imported it while we waited
+        meta = dataset_meta(dataset_dir)
+        if meta is not None and meta.get("source_version") == fingerprint_files(csv_path):
+            return meta
+        meta = import_csv(csv_path, dataset_dir)
+        print(f"✅ Imported {Path(csv_path).name} into {dataset_dir} ({meta['rows']} rows, "
+              f"{len(meta['partitions'])} partitions)")
+    return meta
+
+
+def load_history_frame(csv_path, dataset: str, columns=None, history_format: str = None,
+                       history_dir=None) -> "pd.DataFrame":
+    """
+    A history CSV as a DataFrame with a parsed 'date' column, from the
+    columnar dataset when HISTORY_FORMAT=columnar or straight from the CSV.
+    """
+    history_format = history_format or HISTORY_FORMAT
+    if history_format == "columnar":
+        dataset_dir = Path(history_dir or HISTORY_DIR) / dataset
+        ensure_dataset(csv_path, dataset_dir)
+        return read_table(dataset_dir, columns=columns)
+    df = _parse_csv(csv_path)
+    return df[list(columns)] if columns is not None else df
+
+
+def export_csv(dataset_dir, csv_path):
+    """Write a dataset back out as CSV (dates as YYYY-MM-DD)"""
+    df = read_table(dataset_dir)
+    df["date"] = df["date"].dt.strftime("%Y-%m-%d")
+    df.to_csv(csv_path, index=False)
+
+
+if __name__ == "__main__":
+    import sys
+
+    base_dir = Path(__file__).parent.parent
+    if sys.argv[1:2] == ["export"] and len(sys.argv) == 4:
+        export_csv(HISTORY_DIR / sys.argv[2], sys.argv[3])
+        print(f"✅ Exported {sys.argv[2]} to {sys.argv[3]}")
+    elif len(sys.argv) == 1:
+        for name, csv_name in (("climate", "climate.csv"), ("dengue", "dengue_cases.csv")):
+            if (base_dir / csv_name).exists():
+                ensure_dataset(base_dir / csv_name, HISTORY_DIR / name)
+        print(f"✅ History datasets ready in: {HISTORY_DIR}")
+    else:
+        raise SystemExit("Usage: python columnar_store.py [export <dataset> <csv>]")
@@ -0,0 +1,175 @@
+"""
+Compiled RandomForest for fast scoring.
+
+sklearn's predict_proba pays tens to hundreds of microseconds of Python /
+joblib / validation overhead per call, which dominates a 4-row forecast.
+CompiledForest copies the fitted trees once into flat, contiguous NumPy
+arrays (feature, threshold, children, leaf probabilities) and walks every
+tree for every row at the same time with vectorized indexing, one step per
+tree level.
+
+Results match RandomForestClassifier.predict_proba exactly: inputs are cast
+to float32 like sklearn does and trees are summed in the same order.
+
+The per-level NumPy passes win for small batches (the /predict path) but
+sklearn's Cython traversal is faster for large ones, so batches above
+COMPILED_FOREST_MAX_ROWS are handed back to the original forest.
+"""
+import os
+
+import numpy as np
+
+COMPILED_FOREST_MAX_ROWS = int(os.getenv("COMPILED_FOREST_MAX_ROWS", 512))
+
+# Fixed probe set for the load-time parity check (covers the serving ranges)
+PARITY_PROBE_ROWS = 512
+
+
+class CompiledForest:
+    """Array-based drop-in for RandomForestClassifier.predict_proba"""
+
+    def __init__(self, feature, threshold, children, missing_left, leaf_value, roots,
+                 max_depth, n_features, classes, feature_names=None, source_type="RandomForestClassifier"):
+        self.feature = feature            # int64 (n_nodes,), 0 for leaves
+        self.threshold = threshold        # float64 (n_nodes,)
+        self.children = children          # int64 (2 * n_nodes,), [left, right] per node; leaves point at themselves
+        self.missing_left = missing_left  # bool (n_nodes,), where NaN goes
+        self.leaf_value = leaf_value      # float64 (n_nodes, n_classes), class fractions
+        self.roots = roots                # int64 (n_trees,), root node of each tree
+        self.max_depth = max_depth
+        self.n_features_in_ = n_features
+        self.classes_ = classes
+        if feature_names is not None:
+            self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.source_type = source_type    # Class name of the forest this was compiled from
+        # Original forest used for batches larger than max_rows (None = always compiled)
+        self.fallback = None
+        self.max_rows = COMPILED_FOREST_MAX_ROWS
+
+    @property
+    def left(self) -> np.ndarray:
+        return self.children[0::2]
+
+    @property
+    def right(self) -> np.ndarray:
+        return self.children[1::2]
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @classmethod
+    def from_sklearn(cls, model) -> "CompiledForest":
+        """Flatten a fitted single-output RandomForestClassifier"""
+        if getattr(model, 'n_outputs_', 1) != 1:
+            raise ValueError("Only single-output forests can be compiled")
+
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            node_ids = np.arange(n, dtype=np.int64)
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int64))
+            thresholds.append(tree.threshold.astype(np.float64))
+            # Leaves loop back to themselves so extra traversal steps are no-ops
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+            missing.append(np.asarray(getattr(tree, 'missing_go_to_left', np.zeros(n)), dtype=bool))
+
+            # sklearn >= 1.4 stores class fractions in tree_.value and
+            # DecisionTreeClassifier.predict_proba returns them as-is
+            values.append(tree.value[:, 0, :len(model.classes_)].astype(np.float64))
+
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features)),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds)),
+            children=np.ascontiguousarray(np.stack([np.concatenate(lefts), np.concatenate(rights)], axis=1).ravel()),
+            missing_left=np.ascontiguousarray(np.concatenate(missing)),
+            leaf_value=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.asarray(roots, dtype=np.int64),
+            max_depth=int(max_depth),
+            n_features=int(model.n_features_in_),
+            classes=np.asarray(model.classes_),
+            feature_names=getattr(model, 'feature_names_in_', None),
+            source_type=type(model).__name__,
+        )
+
+    def apply(self, X) -> np.ndarray:
+        """Leaf node reached by every row in every tree, shape (n_trees, n_rows)"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected X with shape (n, {self.n_features_in_}), got {X.shape}")
+        n_rows = X.shape[0]
+        flat_X = X.ravel()
+        # Offset of each row's first feature in flat_X, broadcast against (n_trees, n_rows)
+        row_offsets = np.arange(n_rows, dtype=np.int64) * self.n_features_in_
+        nodes = np.repeat(self.roots[:, None], n_rows, axis=1)
+        has_missing = bool(self.missing_left.any())
+        for _ in range(self.max_depth):
+            values = flat_X.take(row_offsets + self.feature.take(nodes))
+            go_right = ~(values <= self.threshold.take(nodes))
+            if has_missing:
+                go_right &= ~(np.isnan(values) & self.missing_left.take(nodes))
+            # children is laid out as [left, right] pairs per node
+            nodes = self.children.take(nodes * 2 + go_right)
+        return nodes
+
+    def predict_proba(self, X) -> np.ndarray:
+        if self.fallback is not None and len(X) > self.max_rows:
+            return self.fallback.predict_proba(X)
+        # cumsum adds the trees strictly one after another, like sklearn does
+        # (a plain sum may use pairwise summation and differ in the last bit)
+        proba = np.cumsum(self.leaf_value[self.apply(X)], axis=0)[-1]
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+def parity_probe(n_features: int, rows: int = PARITY_PROBE_ROWS, seed: int = 0) -> np.ndarray:
+    """Random inputs spanning the serving ranges (rainfall, temperature, humidity, barangay)"""
+    rng = np.random.default_rng(seed)
+    lows = np.array([0.0, 15.0, 30.0, 0.0][:n_features] + [0.0] * max(0, n_features - 4))
+    highs = np.array([500.0, 40.0, 100.0, 10.0][:n_features] + [10.0] * max(0, n_features - 4))
+    probe = rng.uniform(lows, highs, size=(rows, n_features))
+    if n_features >= 4:
+        probe[:, 3] = np.floor(probe[:, 3])
+    return probe
+
+
+def check_parity(model, compiled: CompiledForest, X=None, atol: float = 1e-12) -> float:
+    """Largest absolute difference against model.predict_proba; raises if above atol"""
+    if X is None:
+        X = parity_probe(compiled.n_features_in_)
+    expected = model.predict_proba(np.asarray(X, dtype=np.float64))
+    actual = compiled.predict_proba(X)
+    max_diff = float(np.max(np.abs(expected - actual))) if len(X) else 0.0
+    if max_diff > atol:
+        raise ValueError(f"Compiled forest differs from predict_proba by {max_diff:g}")
+    return max_diff
+
+
+def compile_forest(model, verify: bool = True, max_rows: int = COMPILED_FOREST_MAX_ROWS) -> CompiledForest:
+    """
+    Compile a fitted forest, optionally checking parity on a probe set.
+    Batches above max_rows are scored by the original forest.
+    """
+    compiled = CompiledForest.from_sklearn(model)
+    if verify:
+        check_parity(model, compiled)
+    compiled.fallback = model
+    compiled.max_rows = max_rows
+    return compiled
@@ -0,0 +1,162 @@
+"""
+Feature pipeline shared by the training scripts and the API.
+
+The model features used to be built three ways: train_model.py and
+retrain_model.py took whatever numeric columns the merge produced (no
+barangay), train_model_improved.py used [rainfall, temperature, humidity,
+barangay_encoded], and the API went through LabelEncoder.transform for
+every request, with a hard-coded fallback map whose codes did not match
+the encoder's (alphabetical) ones.
+
+FeaturePipeline is now the only place that turns climate + barangay into
+model input:
+
+- barangay codes come from a dict built once from the encoder's classes
+  (the same codes LabelEncoder.transform gives); without an encoder the
+  known barangays are coded the way the training scripts would code them
+- matrices are float32 NumPy arrays in FEATURE_NAMES order, built without
+  a DataFrame (the forest casts its input to float32 anyway, so
+  predictions are unchanged)
+- the schema (feature names, dtype and barangay codes) has a fingerprint.
+  Training stamps it on the model as feature_schema_, and loading a model
+  whose fingerprint differs from the pipeline of its encoder fails,
+  instead of serving predictions for the wrong barangay codes or columns
+
+NumPy is imported inside the functions so importing this module (and
+app.py) stays cheap; see WARMUP_MODE in app.py.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import TYPE_CHECKING, Iterable, List
+
+if TYPE_CHECKING:
+    import numpy as np
+
+FEATURE_NAMES = ['rainfall', 'temperature', 'humidity', 'barangay_encoded']
+CLIMATE_FEATURES = FEATURE_NAMES[:3]
+FEATURE_DTYPE = "float32"
+SCHEMA_VERSION = 1
+
+# Barangays served by the API; coded alphabetically when there is no encoder
+DEFAULT_BARANGAYS = ["Bagumbayan Norte", "Concepcion Grande", "Tinago", "Balatas", "San Felipe"]
+
+
+class FeatureSchemaMismatch(ValueError):
+    """The model was trained on features the pipeline does not produce"""
+
+
+def schema_fingerprint(barangays: List[str]) -> str:
+    """Short hash of everything that decides what a feature row means"""
+    schema = {
+        "version": SCHEMA_VERSION,
+        "features": FEATURE_NAMES,
+        "dtype": FEATURE_DTYPE,
+        "barangays": list(barangays),
+    }
+    return hashlib.sha1(json.dumps(schema, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class FeaturePipeline:
+    """Barangay codes + feature matrix builder for one encoder; read-only once built"""
+
+    __slots__ = ("barangays", "codes", "fingerprint")
+
+    def __init__(self, barangays: Iterable[str]):
+        self.barangays = [str(b) for b in barangays]  # Code i = barangays[i]
+        self.codes = {name: code for code, name in enumerate(self.barangays)}
+        self.fingerprint = schema_fingerprint(self.barangays)
+
+    @classmethod
+    def fit(cls, barangays: Iterable[str]) -> "FeaturePipeline":
+        """Pipeline for the barangays in the training data (sorted, like LabelEncoder)"""
+        return cls(sorted({str(b) for b in barangays}))
+
+    @classmethod
+    def from_encoder(cls, encoder) -> "FeaturePipeline":
+        """Pipeline matching a saved barangay encoder (or the default barangays without one)"""
+        if encoder is None or not hasattr(encoder, 'classes_'):
+            return cls.fit(DEFAULT_BARANGAYS)
+        return cls(encoder.classes_)
+
+    def to_encoder(self):
+        """Fitted LabelEncoder with the same codes, saved next to the model as barangay_encoder.pkl"""
+        import numpy as np
+        from sklearn.preprocessing import LabelEncoder
+        encoder = LabelEncoder()
+        encoder.classes_ = np.asarray(self.barangays, dtype=object)
+        return encoder
+
+    def code(self, barangay: str) -> int:
+        """Model code of a barangay; unknown names get 0 (as the encoder fallback always did)"""
+        code = self.codes.get(barangay)
+        if code is None:
+            print(f"⚠️  Barangay '{barangay}' not in encoder, using default")
+            return 0
+        return code
+
+    def horizon_matrix(self, climates: List[dict], barangay: str) -> "np.ndarray":
+        """One (weeks, n_features) row block for a barangay's forecast horizon"""
+        import numpy as np
+        code = self.code(barangay)
+        return np.array(
+            [[c['rainfall'], c['temperature'], c['humidity'], code] for c in climates],
+            dtype=FEATURE_DTYPE
+        )
+
+    def transform(self, rainfall, temperature, humidity, barangays) -> "np.ndarray":
+        """Feature matrix for column-wise inputs (training rows, batches)"""
+        import numpy as np
+        codes = [self.code(b) for b in barangays]
+        features = np.empty((len(codes), len(FEATURE_NAMES)), dtype=FEATURE_DTYPE)
+        features[:, 0] = rainfall
+        features[:, 1] = temperature
+        features[:, 2] = humidity
+        features[:, 3] = codes
+        return features
+
+    def transform_frame(self, df) -> "np.ndarray":
+        """Feature matrix for a merged climate + cases frame (one row per date and barangay)"""
+        return self.transform(df['rainfall'].to_numpy(), df['temperature'].to_numpy(),
+                              df['humidity'].to_numpy(), df['barangay'])
+
+    def stamp(self, model):
+        """Record the schema the model is trained on (call before saving it)"""
+        model.feature_schema_ = self.fingerprint
+
+    def check_model(self, model):
+        """
+        Raise FeatureSchemaMismatch if the model was not trained on this
+        pipeline's features. Models from before the fingerprint are checked on
+        their feature count and names.
+        """
+        schema = getattr(model, 'feature_schema_', None)
+        if schema is not None:
+            if schema != self.fingerprint:
+                raise FeatureSchemaMismatch(
+                    f"model feature schema {schema} does not match the encoder's {self.fingerprint} "
+                    f"(barangays {self.barangays}) - retrain or restore the matching barangay_encoder.pkl"
+                )
+            return
+        n_features = getattr(model, 'n_features_in_', None)
+        if n_features is not None and n_features != len(FEATURE_NAMES):
+            raise FeatureSchemaMismatch(
+                f"model expects {n_features} features, the pipeline produces {len(FEATURE_NAMES)} ({FEATURE_NAMES})"
+            )
+        names = getattr(model, 'feature_names_in_', None)
+        if names is not None and [str(n) for n in names] != FEATURE_NAMES:
+            raise FeatureSchemaMismatch(f"model features {list(names)} do not match {FEATURE_NAMES}")
+
+
+def training_arrays(df, pipeline: FeaturePipeline = None):
+    """
+    (pipeline, X, y) for a merged climate + cases frame with one row per date
+    and barangay: X from the pipeline (fitted on the frame's barangays unless
+    one is given), y = outbreak (cases > 0) as the API predicts it.
+    """
+    if pipeline is None:
+        pipeline = FeaturePipeline.fit(df['barangay'])
+    X = pipeline.transform_frame(df)
+    y = (df['cases'].to_numpy() > 0).astype(int)
+    return pipeline, X, y
@@ -0,0 +1,120 @@
+"""
+In-process LRU + TTL cache for weekly forecasts.
+
+The dashboards keep asking for the same barangay / start date / default
+climate, so identical forest evaluations are served from memory. Keys are
+(barangay, start_date, climate rounded to FORECAST_CACHE_CLIMATE_DECIMALS,
+model fingerprint, climatology version), so a retrained model or new
+climate history can never serve stale entries.
+
+Configuration (environment variables):
+    FORECAST_CACHE_SIZE               max entries, 0 disables the cache (default 2048)
+    FORECAST_CACHE_TTL                seconds an entry stays valid (default 900)
+    FORECAST_CACHE_CLIMATE_DECIMALS   rounding applied to climate inputs in the key (default 1)
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+FORECAST_CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", 2048))
+FORECAST_CACHE_TTL = float(os.getenv("FORECAST_CACHE_TTL", 900))
+FORECAST_CACHE_CLIMATE_DECIMALS = int(os.getenv("FORECAST_CACHE_CLIMATE_DECIMALS", 1))
+
+
+def fingerprint_files(*paths) -> str:
+    """Short content hash of the model artifacts, used as the model version"""
+    digest = hashlib.sha256()
+    for path in paths:
+        path = Path(path)
+        if path.exists():
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+class ForecastCache:
+    """Thread-safe LRU cache whose entries also expire after a TTL"""
+
+    def __init__(self, maxsize: int = FORECAST_CACHE_SIZE, ttl: float = FORECAST_CACHE_TTL,
+                 climate_decimals: int = FORECAST_CACHE_CLIMATE_DECIMALS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.climate_decimals = climate_decimals
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def make_key(self, barangay: str, start_date: str, climate: dict, model_version: str,
+                 climate_version: int = None):
+        d = self.climate_decimals
+        return (
+            barangay,
+            start_date,
+            round(climate['rainfall'], d),
+            round(climate['temperature'], d),
+            round(climate['humidity'], d),
+            model_version,
+            climate_version,
+        )
+
+    def get(self, key):
+        """Cached value or None. Values are shared, callers must not mutate them."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (called when the model is reloaded)"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "climate_decimals": self.climate_decimals,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,120 @@
+"""
+Vectorized forecasting engine.
+
+Builds the feature matrix for the whole forecast horizon up front and scores
+it with a single predict_proba call, instead of one DataFrame + one
+predict_proba call per week.
+
+NumPy is imported inside the functions that need it so importing this module
+(and app.py) stays cheap; see WARMUP_MODE in app.py.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Callable, List
+
+if TYPE_CHECKING:
+    import numpy as np
+
+from feature_pipeline import FEATURE_NAMES  # noqa: F401 (re-exported for older imports)
+
+FORECAST_WEEKS = 4
+
+
+def get_risk_level(probability: float) -> str:
+    """
+    Convert prediction probability to risk level.
+    Based on the model's probability of outbreak (cases > 0).
+
+    Thresholds optimized for dengue prediction:
+    - Low: < 30% chance of outbreak
+    - Moderate: 30-60% chance of outbreak
+    - High: > 60% chance of outbreak
+    """
+    if probability < 0.30:
+        return "Low"
+    elif probability < 0.60:
+        return "Moderate"
+    else:
+        return "High"
+
+
+def format_week_range(start_date: datetime) -> str:
+    """Format date range for week display"""
+    end_date = start_date + timedelta(days=6)
+    start_str = start_date.strftime("%B %d")
+    end_str = end_date.strftime("%d")
+    if start_date.month == end_date.month:
+        return f"{start_str}–{end_str}"
+    else:
+        return f"{start_str} – {end_date.strftime('%B %d')}"
+
+
+def build_horizon_climate(start_date: datetime, base_climate: dict, climate_for_date: Callable,
+                          weeks: int = FORECAST_WEEKS) -> List[dict]:
+    """
+    Climate inputs for every week of the horizon.
+    Week 1 uses the input climate, later weeks use historical averages for
+    that time of year (with the progressive week offset variation).
+    """
+    climates = [base_climate]
+    for week_num in range(1, weeks):
+        week_start = start_date + timedelta(weeks=week_num)
+        climates.append(climate_for_date(week_start, base_climate, week_offset=week_num))
+    return climates
+
+
+def score_outbreak_probability(model, features: np.ndarray) -> np.ndarray:
+    """
+    Score every row with one predict_proba call.
+    Returns P(class_1) = probability of outbreak (cases > 0) for each row.
+    """
+    return model.predict_proba(features)[:, 1]
+
+
+def forecast_weeks(start_date: datetime, climates: List[dict]) -> List[tuple]:
+    """
+    (week label, climate_used) of every forecast week. They only depend on the
+    horizon, so a batch of barangays with the same start date and climate
+    builds them once and passes them to build_weekly_forecast.
+    """
+    weeks = []
+    for week_num, climate_data in enumerate(climates):
+        weeks.append((format_week_range(start_date + timedelta(weeks=week_num)), {
+            "rainfall": round(climate_data['rainfall'], 1),
+            "temperature": round(climate_data['temperature'], 1),
+            "humidity": round(climate_data['humidity'], 1),
+            "source": "current" if week_num == 0 else "historical_average"
+        }))
+    return weeks
+
+
+def build_weekly_forecast(start_date: datetime, climates: List[dict], probabilities,
+                          weeks: List[tuple] = None) -> List[dict]:
+    """Turn scored rows back into the weekly_forecast entries of PredictionResponse"""
+    if weeks is None:
+        weeks = forecast_weeks(start_date, climates)
+    weekly_forecast = []
+    for (week, climate_used), outbreak_prob in zip(weeks, probabilities):
+        probability = round(float(outbreak_prob), 4)
+        weekly_forecast.append({
+            "week": week,
+            "risk": get_risk_level(float(outbreak_prob)),
+            "probability": probability,
+            "outbreak_probability": probability,
+            "climate_used": dict(climate_used)
+        })
+    return weekly_forecast
+
+
+def score_batch(model, matrices: List[np.ndarray]) -> List[np.ndarray]:
+    """
+    Score several horizons (e.g. barangays x weeks) with one predict_proba call
+    and split the probabilities back per item.
+    """
+    if not matrices:
+        return []
+    import numpy as np
+    probabilities = score_outbreak_probability(model, np.vstack(matrices))
+    offsets = np.cumsum([len(m) for m in matrices])[:-1]
+    return np.split(probabilities, offsets)
@@ -0,0 +1,36 @@
+"""
+Gunicorn settings for serving with several worker processes.
+
+    cd backend && gunicorn -c gunicorn.conf.py app:app
+
+Each worker is a uvicorn worker with its own event loop and GIL. With
+preload_app the parent imports app.py and runs app.preload() before it
+forks, so the model, climatology and case report index are loaded once
+and shared copy-on-write. Each extra worker costs its private pages, not
+a second copy of the forest. With MODEL_FORMAT=mmap the tree arrays are
+file-backed and shared through the page cache, even after a hot reload.
+
+Configuration (environment variables):
+    WEB_CONCURRENCY     worker processes (default 1)
+    PORT                listen port (default 10000)
+    GUNICORN_PRELOAD    "0" to load the model in every worker instead (default 1)
+    GUNICORN_TIMEOUT    seconds before a silent worker is restarted (default 120)
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '10000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") != "0"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive = 5
+# No max_requests: a recycled worker is forked from the parent's model,
+# which may be older than the one the running workers hot-reloaded
+
+
+def when_ready(server):
+    """Runs in the parent after the app is imported and before the workers are forked"""
+    if preload_app:
+        import app
+        app.preload()
@@ -0,0 +1,147 @@
+"""
+Warm-start incremental retraining.
+
+A full retrain rebuilds the forest on the whole merged history, even when a
+dengue upload only adds a few weeks. In incremental mode retrain_model.py
+keeps the current forest and, with warm_start, fits INCREMENTAL_TREES new
+trees on the recent window (the rows after the date the model was trained
+through, plus INCREMENTAL_WINDOW_DAYS of context before them). Old trees
+decay out: when the forest grows past INCREMENTAL_MAX_TREES the oldest
+trees are dropped, so it stays bounded and leans towards recent seasons.
+
+The training state travels inside the pickle as fitted attributes:
+
+    trained_through_        last data date the forest has learned from
+    tree_trained_through_   the same per tree, oldest first (used for decay)
+    baseline_metrics_       holdout accuracy/recall of the last full retrain
+
+Drift check: before updating, the current forest is scored on the new rows
+it has never seen. If its accuracy or recall is more than
+RETRAIN_DRIFT_TOLERANCE below the full-retrain baseline, the data has moved
+and adding a few trees is not enough, so a full retrain runs instead. The
+same happens if the updated forest scores worse on the whole history than
+the forest it replaces (old patterns lost to decay).
+
+Configuration (environment variables):
+    INCREMENTAL_TREES          trees added per update (default 25)
+    INCREMENTAL_MAX_TREES      forest size before the oldest trees are dropped (default 150)
+    INCREMENTAL_WINDOW_DAYS    context before the new rows (default 365)
+    RETRAIN_DRIFT_TOLERANCE    allowed drop below the baseline (default 0.05)
+"""
+import os
+
+import numpy as np
+
+INCREMENTAL_TREES = int(os.getenv("INCREMENTAL_TREES", 25))
+INCREMENTAL_MAX_TREES = int(os.getenv("INCREMENTAL_MAX_TREES", 150))
+INCREMENTAL_WINDOW_DAYS = int(os.getenv("INCREMENTAL_WINDOW_DAYS", 365))
+RETRAIN_DRIFT_TOLERANCE = float(os.getenv("RETRAIN_DRIFT_TOLERANCE", 0.05))
+
+
+class FullRetrainNeeded(Exception):
+    """The forest cannot be updated incrementally; the message says why"""
+
+
+def score(model, X, y) -> dict:
+    """Accuracy and recall of model on (X, y)"""
+    from sklearn.metrics import accuracy_score, recall_score
+    y_pred = model.predict(X)
+    return {
+        "accuracy": round(float(accuracy_score(y, y_pred)), 4),
+        "recall": round(float(recall_score(y, y_pred, zero_division=0)), 4),
+        "rows": int(len(y)),
+    }
+
+
+def stamp_full_training(model, dates, metrics: dict):
+    """Record the training state of a forest fitted from scratch on rows up to max(dates)"""
+    trained_through = str(np.max(np.asarray(dates, dtype="datetime64[D]")))
+    model.trained_through_ = trained_through
+    model.tree_trained_through_ = [trained_through] * len(model.estimators_)
+    model.baseline_metrics_ = {**metrics, "trained_through": trained_through}
+
+
+def _drift(baseline: dict, current: dict) -> float:
+    """How far current is below baseline on its worse metric (<= 0 means no drop)"""
+    return max(baseline[m] - current[m] for m in ("accuracy", "recall"))
+
+
+def update_forest(model, X, y, dates, schema: str, n_trees: int = INCREMENTAL_TREES,
+                  max_trees: int = INCREMENTAL_MAX_TREES, window_days: int = INCREMENTAL_WINDOW_DAYS,
+                  tolerance: float = RETRAIN_DRIFT_TOLERANCE):
+    """
+    Add n_trees trees fitted on the rows after model.trained_through_ (plus
+    window_days of context) and drop the oldest trees past max_trees.
+    X is the feature matrix from feature_pipeline (schema: its fingerprint),
+    dates aligned with it.
+    Returns (updated_model, summary), or None when there are no new rows.
+    Raises FullRetrainNeeded when the drift check fails or the model has no
+    incremental state. The model passed in is never modified.
+    """
+    import copy
+    trained_through = getattr(model, "trained_through_", None)
+    baseline = getattr(model, "baseline_metrics_", None)
+    if trained_through is None or baseline is None:
+        raise FullRetrainNeeded("model has no incremental training state (trained before incremental mode)")
+    if getattr(model, "feature_schema_", None) != schema:
+        raise FullRetrainNeeded(f"feature schema changed: {getattr(model, 'feature_schema_', None)} -> {schema}")
+
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    y = np.asarray(y)
+    new_rows = dates > np.datetime64(trained_through)
+    if not new_rows.any():
+        return None
+    window = dates > (dates[new_rows].min() - np.timedelta64(window_days, "D"))
+    if set(np.unique(y[window])) != set(model.classes_):
+        raise FullRetrainNeeded(f"window has classes {sorted(np.unique(y[window]).tolist())}, "
+                                f"model has {model.classes_.tolist()}")
+
+    # Drift: how the current forest does on data it has not seen yet
+    unseen = score(model, X[new_rows], y[new_rows])
+    drift = _drift(baseline, unseen)
+    print(f"🔍 Drift check: baseline acc {baseline['accuracy']:.3f} / recall {baseline['recall']:.3f}, "
+          f"on {unseen['rows']} new rows acc {unseen['accuracy']:.3f} / recall {unseen['recall']:.3f}")
+    if drift > tolerance:
+        raise FullRetrainNeeded(f"drift {drift:.3f} above tolerance {tolerance}")
+
+    before = score(model, X, y)
+    updated = copy.deepcopy(model)  # The served forest stays untouched if the update is rejected
+    n_before = len(updated.estimators_)
+    class_weight = updated.class_weight
+    if class_weight == "balanced":
+        # Weights from the whole history, not the window (sklearn's advice for warm_start)
+        from sklearn.utils.class_weight import compute_class_weight
+        weights = compute_class_weight("balanced", classes=updated.classes_, y=y)
+        updated.set_params(class_weight=dict(zip(updated.classes_.tolist(), weights)))
+    updated.set_params(warm_start=True, n_estimators=n_before + n_trees)
+    updated.fit(X[window], y[window])
+    updated.set_params(class_weight=class_weight)
+    new_through = str(dates.max())
+    ages = list(getattr(updated, "tree_trained_through_", [trained_through] * n_before))
+    ages += [new_through] * (len(updated.estimators_) - n_before)
+    dropped = max(0, len(updated.estimators_) - max_trees)
+    if dropped:
+        updated.estimators_ = updated.estimators_[dropped:]
+        ages = ages[dropped:]
+    updated.set_params(warm_start=False, n_estimators=len(updated.estimators_))
+    updated.tree_trained_through_ = ages
+    updated.trained_through_ = new_through
+
+    after = score(updated, X, y)
+    forgetting = _drift(before, after)
+    if forgetting > tolerance:
+        raise FullRetrainNeeded(f"updated forest lost {forgetting:.3f} on the full history")
+
+    summary = {
+        "new_rows": int(new_rows.sum()),
+        "window_rows": int(window.sum()),
+        "trees_added": n_trees,
+        "trees_dropped": dropped,
+        "trees": len(updated.estimators_),
+        "trained_through": new_through,
+        "drift": round(float(drift), 4),
+        "unseen": unseen,
+        "history_before": before,
+        "history_after": after,
+    }
+    return updated, summary
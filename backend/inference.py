@@ -0,0 +1,128 @@
+"""
+Inference executor - keeps CPU-bound model calls off the asyncio event loop.
+
+Every forecast is submitted to a worker pool (threads by default, optionally
+processes) through a bounded queue. When the queue is full the request is
+rejected with 503 + Retry-After instead of piling up behind the forest.
+
+Configuration (environment variables):
+    INFERENCE_EXECUTOR      "thread" (default) or "process"
+    INFERENCE_WORKERS       pool size, defaults to the number of CPU cores
+    INFERENCE_MAX_PENDING   max queued + running jobs before rejecting (default workers * 8)
+    INFERENCE_RETRY_AFTER   seconds suggested in the Retry-After header (default 1)
+    INFERENCE_MODEL_JOBS    n_jobs used by the forest itself while serving (default 1)
+    INFERENCE_BACKEND       "sklearn" (default) or "compiled" (flat-array forest, see compiled_forest.py)
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+
+from fastapi import HTTPException
+
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread").lower()
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", os.cpu_count() or 1))
+INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", INFERENCE_WORKERS * 8))
+INFERENCE_RETRY_AFTER = int(os.getenv("INFERENCE_RETRY_AFTER", 1))
+# The pool already provides the parallelism, so each forest call stays single-threaded
+INFERENCE_MODEL_JOBS = int(os.getenv("INFERENCE_MODEL_JOBS", 1))
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "sklearn").lower()
+
+
+def build_inference_model(model, backend: str = INFERENCE_BACKEND):
+    """
+    Object whose predict_proba is used for serving: the fitted forest itself,
+    or its compiled flat-array form (parity-checked, falls back to sklearn).
+    """
+    if backend == "compiled":
+        from compiled_forest import compile_forest
+        try:
+            compiled = compile_forest(model)
+            print(f"✅ Compiled forest ready: {compiled.n_estimators} trees, {compiled.n_nodes} nodes")
+            return compiled
+        except Exception as e:
+            print(f"⚠️  Could not compile forest ({e}) - using sklearn predict_proba")
+    return model
+
+
+class InferenceSaturated(HTTPException):
+    """Raised when the inference queue is full (503 with Retry-After)"""
+
+    def __init__(self, retry_after: int = INFERENCE_RETRY_AFTER):
+        super().__init__(
+            status_code=503,
+            detail="Prediction service is busy. Please retry shortly.",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class InferenceExecutor:
+    """Bounded worker pool for model calls"""
+
+    def __init__(self, kind: str = INFERENCE_EXECUTOR, workers: int = INFERENCE_WORKERS,
+                 max_pending: int = INFERENCE_MAX_PENDING, retry_after: int = INFERENCE_RETRY_AFTER):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown INFERENCE_EXECUTOR '{kind}' (use 'thread' or 'process')")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.retry_after = retry_after
+        self._pool = None
+        # Only touched from the event loop thread, so no lock is needed
+        self._pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.kind == "process":
+                # Workers are forked lazily on first submit, after the model is loaded,
+                # so they inherit it instead of unpickling it again
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        return self._pool
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the pool, or raise InferenceSaturated if the queue is full"""
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise InferenceSaturated(self.retry_after)
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_pool(), partial(fn, *args))
+        except BaseException:
+            # Raised by fn, a broken pool, or the request being cancelled while waiting
+            self.failed += 1
+            raise
+        finally:
+            self._pending -= 1
+        self.completed += 1
+        return result
+
+    def reload(self):
+        """
+        Fork new process workers for the next jobs so they inherit the freshly
+        loaded model; jobs already queued on the old workers still complete.
+        """
+        if self.kind == "process" and self._pool is not None:
+            old_pool, self._pool = self._pool, None
+            old_pool.shutdown(wait=False, cancel_futures=False)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,207 @@
+"""
+Streaming CSV ingestion for /upload/climate and /upload/dengue.
+
+The upload handlers used to read the whole body into memory and parse it
+with pandas before checking the columns, so a large upload was held twice
+(raw bytes + DataFrame). ingest_csv reads the upload UPLOAD_CHUNK_BYTES at a
+time instead, checks the header before reading any row, validates and
+normalizes each row as it goes (dates to YYYY-MM-DD, numbers must parse)
+and writes rows straight to a temporary file that is renamed into place
+only when the whole file is valid. Peak memory is one chunk, regardless
+of file size.
+
+The first bad row rejects the upload with its line number; the rest of the
+file is not read.
+
+Configuration (environment variables):
+    UPLOAD_CHUNK_BYTES   read buffer size (default 1 MiB)
+"""
+import codecs
+import csv
+import os
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", 1024 * 1024))
+
+# Column -> type for the required columns of each upload kind; other columns are kept as-is
+UPLOAD_SCHEMAS = {
+    "climate": {"date": "date", "rainfall": "float", "temperature": "float", "humidity": "float"},
+    "dengue": {"date": "date", "barangay": "text", "cases": "int"},
+}
+
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y", "%d-%m-%Y", "%Y-%m", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S")
+
+
+class CSVValidationError(ValueError):
+    """Upload rejected; `line` is the 1-based line number in the file (None for header problems)"""
+
+    def __init__(self, message: str, line: int = None):
+        super().__init__(f"Line {line}: {message}" if line else message)
+        self.line = line
+
+
+def normalize_date(value: str) -> str:
+    value = value.strip()
+    # Fast path: already ISO (C parser, much cheaper than strptime)
+    if len(value) == 10 and value[4] == "-" and value[7] == "-":
+        return date.fromisoformat(value).isoformat()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognized date '{value}'")
+
+
+def _check_float(value: str) -> str:
+    value = value.strip()
+    if value:  # Empty cells are allowed (missing readings)
+        float(value)
+    return value
+
+
+def _check_int(value: str) -> str:
+    value = value.strip()
+    if value:
+        number = float(value)
+        if not number.is_integer():
+            raise ValueError(f"expected a whole number, got '{value}'")
+        value = str(int(number))
+    return value
+
+
+def _check_text(value: str) -> str:
+    value = value.strip()
+    if not value:
+        raise ValueError("value is required")
+    return value
+
+
+CHECKS = {"date": normalize_date, "float": _check_float, "int": _check_int, "text": _check_text}
+
+
+class _MemoizedCheck:
+    """Caches a check's results: uploads repeat the same date once per barangay"""
+
+    def __init__(self, check, max_size: int = 4096):
+        self.check = check
+        self.max_size = max_size
+        self.cache = {}
+
+    def __call__(self, value: str) -> str:
+        result = self.cache.get(value)
+        if result is None:
+            result = self.check(value)
+            if len(self.cache) >= self.max_size:
+                self.cache.clear()
+            self.cache[value] = result
+        return result
+
+
+class _ChunkedLines:
+    """Text lines from a binary stream read chunk_bytes at a time (what csv.reader consumes)"""
+
+    def __init__(self, stream, chunk_bytes: int):
+        self.stream = stream
+        self.chunk_bytes = chunk_bytes
+        self.bytes_read = 0
+
+    def __iter__(self):
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        pending = ""
+        while True:
+            chunk = self.stream.read(self.chunk_bytes)
+            self.bytes_read += len(chunk)
+            # Only split on \n: csv.reader handles \r and quoted line breaks itself
+            lines = (pending + decoder.decode(chunk, final=not chunk)).split("\n")
+            pending = lines.pop()
+            for line in lines:
+                yield line + "\n"
+            if not chunk:
+                break
+        if pending:
+            yield pending
+
+
+def ingest_csv(stream, kind: str, dest_path, chunk_bytes: int = UPLOAD_CHUNK_BYTES) -> dict:
+    """
+    Validate and copy a CSV upload (binary file object) to dest_path.
+    Raises CSVValidationError on the first problem; dest_path is then left untouched.
+    Returns a summary: rows, columns, date range, bytes read and timing.
+    """
+    schema = UPLOAD_SCHEMAS[kind]
+    dest_path = Path(dest_path)
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dest_path.with_name(f".{dest_path.name}.part")
+    start = time.perf_counter()
+
+    lines = _ChunkedLines(stream, chunk_bytes)
+    try:
+        reader = csv.reader(lines)
+        header = next(reader, None)
+        if not header:
+            raise CSVValidationError("File is empty")
+        header = [column.strip() for column in header]
+        missing = [column for column in schema if column not in header]
+        if missing:
+            raise CSVValidationError(f"CSV must contain columns: {', '.join(schema)} (missing: {', '.join(missing)})")
+        checks = [
+            (header.index(column), column, _MemoizedCheck(CHECKS[kind_]) if kind_ == "date" else CHECKS[kind_])
+            for column, kind_ in schema.items()
+        ]
+        date_index = header.index("date")
+        width = len(header)
+        min_width = max(index for index, _, _ in checks) + 1
+
+        rows = 0
+        first_date = last_date = None
+        with open(tmp_path, "w", newline="", buffering=chunk_bytes) as out:
+            writer = csv.writer(out)
+            writer.writerow(header)
+            for row in reader:
+                if not row or (len(row) == 1 and not row[0].strip()):
+                    continue
+                line = reader.line_num
+                if len(row) > width or len(row) < min_width:
+                    raise CSVValidationError(f"expected {width} columns, found {len(row)}", line)
+                if len(row) < width:
+                    # Trailing optional columns left out (pandas read these as empty)
+                    row.extend([""] * (width - len(row)))
+                for index, column, check in checks:
+                    try:
+                        row[index] = check(row[index])
+                    except ValueError as e:
+                        raise CSVValidationError(f"invalid {column}: {e}", line)
+                writer.writerow(row)
+                rows += 1
+                day = row[date_index]
+                if first_date is None or day < first_date:
+                    first_date = day
+                if last_date is None or day > last_date:
+                    last_date = day
+        if rows == 0:
+            raise CSVValidationError("CSV has a header but no data rows")
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    seconds = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "columns": header,
+        "date_range": [first_date, last_date],
+        "bytes": lines.bytes_read,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(rows / seconds, 1) if seconds else None,
+    }
+
+
+def iter_upload_rows(path, kind: str):
+    """Required-column tuples of an ingested file, streamed (for the SQLite index)"""
+    columns = list(UPLOAD_SCHEMAS[kind])
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            yield tuple(row[column] for column in columns)
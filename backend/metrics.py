@@ -0,0 +1,223 @@
+"""
+Request latency instrumentation in the Prometheus text format.
+
+With METRICS_ENABLED set, MetricsMiddleware times every request (labelled
+by route template, method and status), the forecasting path reports how
+long each stage took, and GET /metrics renders everything below in the
+Prometheus exposition format (text/plain; version=0.0.4). It is a small
+in-process registry instead of prometheus_client, which is not a dependency.
+
+    moskita_http_request_duration_seconds       histogram, per route/method/status
+    moskita_forecast_stage_duration_seconds     histogram, per stage:
+        executor_wait    queued on the inference executor
+        feature_build    climate horizon + feature matrix
+        model_score      the single predict_proba call
+        response_build   weekly forecast dicts from the probabilities
+    moskita_inference_batch_rows                histogram, requests scored per executor job
+    moskita_event_loop_lag_seconds              histogram, how late the loop wakes a sleeping task
+    moskita_forecast_cache_* / moskita_risk_grid_lookups_total / moskita_inference_*
+                                                cache hit rates and executor counters
+
+Metrics live in each worker process: with several uvicorn workers every
+scrape reaches one of them, so scrape the workers separately (or run one
+worker per port) when exact totals matter.
+
+When METRICS_ENABLED is off (the default) the middleware is not installed,
+no stage is timed and /metrics answers 404.
+
+Configuration (environment variables):
+    METRICS_ENABLED             "1" to collect and expose metrics (default off)
+    METRICS_LOOP_LAG_SECONDS    how often the event-loop lag probe runs (default 0.5)
+"""
+import asyncio
+import bisect
+import os
+import threading
+import time
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0").lower() in ("1", "true", "yes", "on")
+METRICS_LOOP_LAG_SECONDS = float(os.getenv("METRICS_LOOP_LAG_SECONDS", 0.5))
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+BATCH_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+
+def _format_labels(names, values) -> str:
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name + "_total", self.labelnames, labels, value) for labels, value in items]
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        names = self.labelnames + ("le",)
+        samples = []
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                samples.append((self.name + "_bucket", names, labels + (_format_value(bound),), cumulative))
+            samples.append((self.name + "_sum", self.labelnames, labels, series[-1]))
+            samples.append((self.name + "_count", self.labelnames, labels, cumulative))
+        return samples
+
+
+class Callback:
+    """
+    Gauge or counter read at scrape time from existing state (cache stats,
+    executor counters). fn returns a number, or {label values tuple: number}.
+    """
+
+    def __init__(self, kind: str, name: str, help: str, fn, labelnames=()):
+        self.kind, self.name, self.help, self.fn, self.labelnames = kind, name, help, fn, tuple(labelnames)
+
+    def samples(self):
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        if value is None:
+            return []
+        name = self.name + "_total" if self.kind == "counter" else self.name
+        if isinstance(value, dict):
+            return [(name, self.labelnames, labels, v) for labels, v in value.items()]
+        return [(name, (), (), value)]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name, help, fn, labelnames=()):
+        return self.register(Callback("gauge", name, help, fn, labelnames))
+
+    def counter(self, name, help, fn, labelnames=()):
+        return self.register(Callback("counter", name, help, fn, labelnames))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            samples = metric.samples()
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labelnames, labels, value in samples:
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    "moskita_http_request_duration_seconds", "HTTP request latency by route template",
+    ("route", "method", "status"), LATENCY_BUCKETS))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "moskita_forecast_stage_duration_seconds", "Time spent in each stage of the forecasting path",
+    ("stage",), STAGE_BUCKETS))
+BATCH_ROWS = REGISTRY.register(Histogram(
+    "moskita_inference_batch_rows", "Forecast requests scored together in one executor job",
+    (), BATCH_BUCKETS))
+LOOP_LAG = REGISTRY.register(Histogram(
+    "moskita_event_loop_lag_seconds", "Delay between when the lag probe should wake up and when it did",
+    (), LAG_BUCKETS))
+RISK_GRID_LOOKUPS = REGISTRY.register(Counter(
+    "moskita_risk_grid_lookups", "Default-climate forecasts answered from the risk grid (hit) or scored (miss)",
+    ("result",)))
+
+
+def record_stages(timings: dict):
+    """Observe the {stage: seconds} breakdown returned by a forecast job"""
+    for stage, seconds in timings.items():
+        STAGE_DURATION.observe(seconds, stage)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing each HTTP request; labels use the matched route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            # Templates like /predict/weekly/{barangay} keep the label set bounded
+            template = getattr(route, "path", None) or "unmatched"
+            REQUEST_DURATION.observe(time.perf_counter() - start, template, scope["method"], str(status[0]))
+
+
+async def loop_lag_probe(interval: float = METRICS_LOOP_LAG_SECONDS):
+    """Background task: sleep for interval and record how late the loop woke it up"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, loop.time() - expected))
@@ -0,0 +1,184 @@
+"""
+Memory-mapped model artifact.
+
+Unpickling rf_dengue_model.pkl (and importing sklearn to do it) dominates
+cold starts. The forest is exported once as a directory of uncompressed
+.npy arrays plus a small meta.json, and loaded with mmap_mode='r': startup
+only maps the files, and every uvicorn worker on the host shares the same
+page-cache pages instead of holding its own copy.
+
+Each model version gets its own directory, model_artifact/<version>/,
+where the version is the fingerprint of the pickle + encoder it was
+exported from. A new version is written to a temp directory and renamed
+into place, then the CURRENT file is atomically pointed at it, so workers
+still mapping the previous version are never disturbed and a retrained
+pickle never matches an old artifact. The newest ARTIFACT_KEEP_VERSIONS
+are kept.
+
+Usage (from the backend directory):
+    python model_artifact.py            # export ../model_artifact from ../rf_dengue_model.pkl
+"""
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from compiled_forest import CompiledForest, compile_forest
+
+ARTIFACT_FORMAT_VERSION = 1
+ARTIFACT_KEEP_VERSIONS = 2
+CURRENT_FILE = "CURRENT"
+ARRAY_NAMES = ('feature', 'threshold', 'children', 'missing_left', 'leaf_value', 'roots', 'classes')
+
+
+class BarangayCodes:
+    """
+    Stand-in for the fitted LabelEncoder (only classes_ and transform), so
+    serving from the artifact never has to import sklearn.
+    """
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes, dtype=object)
+        self._codes = {name: i for i, name in enumerate(self.classes_)}
+
+    def transform(self, values):
+        try:
+            return np.array([self._codes[v] for v in values], dtype=np.int64)
+        except KeyError as e:
+            raise ValueError(f"y contains previously unseen labels: {e}")
+
+
+def _write_current(artifact_root: Path, model_version: str):
+    tmp_path = artifact_root / f".{CURRENT_FILE}.tmp-{os.getpid()}"
+    tmp_path.write_text(model_version)
+    os.replace(tmp_path, artifact_root / CURRENT_FILE)
+
+
+def current_artifact_version(artifact_root):
+    """Version CURRENT points at, or None"""
+    try:
+        return (Path(artifact_root) / CURRENT_FILE).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _prune_versions(artifact_root: Path, keep: int, current: str):
+    versions = sorted(
+        (d for d in artifact_root.iterdir() if d.is_dir() and not d.name.startswith(".") and d.name != current),
+        key=lambda d: d.stat().st_mtime, reverse=True,
+    )
+    # Older versions may still be mapped by a worker that has not swapped yet; mapped pages stay valid
+    for old_dir in versions[max(0, keep - 1):]:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def export_model_artifact(model, encoder, artifact_dir, model_version: str) -> Path:
+    """
+    Write the compiled forest as .npy files + meta.json into
+    artifact_dir/<model_version>/ and point CURRENT at it.
+    The version directory is built next to its target and renamed into place
+    so a reader never sees a half-written artifact; if another worker exported
+    the same version first, its copy is kept.
+    """
+    artifact_root = Path(artifact_dir)
+    artifact_root.mkdir(parents=True, exist_ok=True)
+    version_dir = artifact_root / model_version
+    if not (version_dir / "meta.json").exists():
+        compiled = model if isinstance(model, CompiledForest) else compile_forest(model)
+        tmp_dir = artifact_root / f".{model_version}.tmp-{os.getpid()}"
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+
+        arrays = {
+            'feature': compiled.feature,
+            'threshold': compiled.threshold,
+            'children': compiled.children,
+            'missing_left': compiled.missing_left,
+            'leaf_value': compiled.leaf_value,
+            'roots': compiled.roots,
+            'classes': compiled.classes_,
+        }
+        for name in ARRAY_NAMES:
+            np.save(tmp_dir / f"{name}.npy", np.ascontiguousarray(arrays[name]))
+
+        meta = {
+            "format_version": ARTIFACT_FORMAT_VERSION,
+            "model_version": model_version,
+            "model_type": compiled.source_type,
+            "max_depth": compiled.max_depth,
+            "n_features": compiled.n_features_in_,
+            "feature_names": [str(f) for f in getattr(compiled, 'feature_names_in_', [])] or None,
+            "barangay_classes": [str(c) for c in encoder.classes_] if encoder is not None else None,
+            "feature_schema": getattr(model, 'feature_schema_', None),
+        }
+        (tmp_dir / "meta.json").write_text(json.dumps(meta, indent=2))
+
+        try:
+            os.rename(tmp_dir, version_dir)
+        except OSError:
+            # Another worker renamed the same version into place first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    _write_current(artifact_root, model_version)
+    _prune_versions(artifact_root, ARTIFACT_KEEP_VERSIONS, model_version)
+    return version_dir
+
+
+def load_model_artifact(artifact_dir, expected_version: str = None):
+    """
+    Map version expected_version (default: the one CURRENT points at) into memory.
+    Returns (compiled_forest, encoder_or_None, meta), or None if that version
+    has not been exported or is from another format version.
+    """
+    version = expected_version or current_artifact_version(artifact_dir)
+    if version is None:
+        return None
+    artifact_dir = Path(artifact_dir) / version
+    meta_path = artifact_dir / "meta.json"
+    if not meta_path.exists():
+        return None
+    meta = json.loads(meta_path.read_text())
+    if meta.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        return None
+    if expected_version is not None and meta.get("model_version") != expected_version:
+        return None
+
+    # view(np.ndarray) keeps the shared file-backed pages but drops the memmap subclass overhead
+    arrays = {
+        name: np.load(artifact_dir / f"{name}.npy", mmap_mode='r').view(np.ndarray)
+        for name in ARRAY_NAMES
+    }
+    compiled = CompiledForest(
+        feature=arrays['feature'],
+        threshold=arrays['threshold'],
+        children=arrays['children'],
+        missing_left=arrays['missing_left'],
+        leaf_value=arrays['leaf_value'],
+        roots=arrays['roots'],
+        max_depth=meta['max_depth'],
+        n_features=meta['n_features'],
+        classes=arrays['classes'],
+        feature_names=meta.get('feature_names'),
+        source_type=meta.get('model_type', "RandomForestClassifier"),
+    )
+    if meta.get('feature_schema'):
+        compiled.feature_schema_ = meta['feature_schema']
+    encoder = BarangayCodes(meta['barangay_classes']) if meta.get('barangay_classes') else None
+    return compiled, encoder, meta
+
+
+if __name__ == "__main__":
+    import joblib
+    from forecast_cache import fingerprint_files
+
+    base_dir = Path(__file__).parent.parent
+    model_path = base_dir / "rf_dengue_model.pkl"
+    encoder_path = base_dir / "barangay_encoder.pkl"
+    artifact_dir = base_dir / "model_artifact"
+
+    model = joblib.load(model_path)
+    encoder = joblib.load(encoder_path) if encoder_path.exists() else None
+    version_dir = export_model_artifact(model, encoder, artifact_dir, fingerprint_files(model_path, encoder_path))
+    print(f"✅ Model artifact exported to: {version_dir}")
@@ -0,0 +1,189 @@
+"""
+Immutable model bundle and atomic model files.
+
+The API used to keep the forest, its inference form, the barangay encoder
+and the model version in four globals that were set one after the other,
+so a reload (model = None, then load_model()) exposed requests to a
+missing model or to a new forest paired with the old encoder.
+
+A ModelBundle holds everything a forecast needs from one model version
+(including the FeaturePipeline built from its encoder) and is never mutated: the API swaps the whole bundle with a single reference
+assignment, and a request that picked up the old bundle finishes with it.
+
+Training scripts write the pickles with save_model_files: each file goes to
+a temp file in the same directory and is renamed over the old one, so a
+worker never reads a half-written pickle. Workers notice new files through
+model_files_signature (inode, size and mtime of each file; cheap enough to
+poll) and load the new bundle next to the one they are serving.
+"""
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+from feature_pipeline import FEATURE_NAMES, FeaturePipeline
+from forecast_cache import fingerprint_files
+from inference import INFERENCE_MODEL_JOBS, build_inference_model
+
+
+class ModelBundle:
+    """One loaded model version; treat as read-only"""
+
+    __slots__ = ("model", "inference_model", "encoder", "pipeline", "feature_names", "version", "signature",
+                 "source", "generation", "loaded_at")
+
+    def __init__(self, model, inference_model, encoder, version: str, signature, source: str,
+                 generation: int):
+        self.model = model
+        self.inference_model = inference_model  # What predict_proba is called on: the forest or its compiled form
+        self.encoder = encoder
+        self.pipeline = FeaturePipeline.from_encoder(encoder)  # Builds this model's feature rows
+        self.pipeline.check_model(model)  # Raises FeatureSchemaMismatch: never serve a mismatched pair
+        self.feature_names = list(FEATURE_NAMES)
+        self.version = version  # Content fingerprint of the model + encoder files
+        self.signature = signature  # model_files_signature of the files it was loaded from
+        self.source = source  # "pickle" or "mmap"
+        self.generation = generation  # Bundles this worker has served, 1 = the first
+        self.loaded_at = datetime.now().isoformat()
+
+    @property
+    def model_type(self) -> str:
+        """Class name of the trained model (also for a forest served from the mmap artifact)"""
+        return getattr(self.model, 'source_type', type(self.model).__name__)
+
+    def stats(self) -> dict:
+        return {
+            "model_version": self.version,
+            "model_type": self.model_type,
+            "source": self.source,
+            "feature_schema": self.pipeline.fingerprint,
+            "generation": self.generation,
+            "loaded_at": self.loaded_at,
+        }
+
+
+def model_files_signature(*paths) -> tuple:
+    """(inode, size, mtime) of each file; changes whenever a file is replaced"""
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            signature.append((st.st_ino, st.st_size, st.st_mtime_ns))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def save_model_files(model, model_path, encoder=None, encoder_path=None):
+    """
+    Write the model (and encoder) pickles atomically: both are fully written
+    to temp files first and then renamed over the old files back to back.
+    """
+    import joblib
+    pending = [(model, Path(model_path))]
+    if encoder is not None and encoder_path is not None:
+        pending.append((encoder, Path(encoder_path)))
+    written = []
+    try:
+        for obj, path in pending:
+            tmp_path = path.with_name(f".{path.name}.tmp-{os.getpid()}")
+            joblib.dump(obj, tmp_path)
+            with open(tmp_path, "rb") as f:
+                os.fsync(f.fileno())
+            written.append((tmp_path, path))
+        for tmp_path, path in written:
+            os.replace(tmp_path, path)
+    finally:
+        for tmp_path, _ in written:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+
+def load_model_bundle(model_path, encoder_path, artifact_dir, model_format: str = "pickle",
+                      generation: int = 1):
+    """
+    Load a new ModelBundle from disk without touching the one being served.
+    Returns None if there is no model. If the files are replaced while they
+    are being read, the load is retried so model and encoder always match.
+    """
+    model_path, encoder_path, artifact_dir = Path(model_path), Path(encoder_path), Path(artifact_dir)
+    if not model_path.exists() and not artifact_dir.exists():
+        return None
+    for _ in range(3):
+        signature = model_files_signature(model_path, encoder_path)
+        bundle = _load_bundle(model_path, encoder_path, artifact_dir, model_format, signature, generation)
+        if bundle is None or model_files_signature(model_path, encoder_path) == signature:
+            return bundle
+        print("⚠️  Model files changed while loading, loading again")
+    return bundle
+
+
+def _load_bundle(model_path: Path, encoder_path: Path, artifact_dir: Path, model_format: str, signature,
+                 generation: int):
+    start_time = time.time()
+    from model_artifact import export_model_artifact, load_model_artifact
+
+    # Memory-mapped artifact: nothing to unpickle, pages are shared between workers
+    artifact = None
+    if model_format == "mmap":
+        expected_version = fingerprint_files(model_path, encoder_path) if model_path.exists() else None
+        artifact = load_model_artifact(artifact_dir, expected_version=expected_version)
+
+    if artifact is not None:
+        print(f"📦 Mapping model artifact from {artifact_dir}...")
+        model, encoder, meta = artifact
+        bundle = ModelBundle(model, model, encoder, meta['model_version'], signature, "mmap", generation)
+        load_time = time.time() - start_time
+        print(f"✅ Model loaded successfully in {load_time:.2f} seconds! (memory-mapped artifact)")
+        print(f"   Model type: {bundle.model_type}")
+        print(f"   Number of trees: {model.n_estimators}")
+        if hasattr(model, 'feature_names_in_'):
+            print(f"   Expected features: {list(model.feature_names_in_)}")
+        if encoder is not None:
+            print(f"   Barangays: {list(encoder.classes_)}")
+        print(f"   Model version: {bundle.version}")
+        print(f"   Feature schema: {bundle.pipeline.fingerprint}")
+        return bundle
+
+    if not model_path.exists():
+        return None
+    print(f"📦 Loading model from {model_path}...")
+    import joblib
+
+    model = joblib.load(model_path)
+    if hasattr(model, 'n_jobs'):
+        # Parallelism comes from the inference executor, not from inside each call
+        model.n_jobs = INFERENCE_MODEL_JOBS
+
+    load_time = time.time() - start_time
+    print(f"✅ Model loaded successfully in {load_time:.2f} seconds!")
+    print(f"   Model type: {type(model).__name__}")
+    if hasattr(model, 'n_estimators'):
+        print(f"   Number of trees: {model.n_estimators}")
+    if hasattr(model, 'feature_names_in_'):
+        print(f"   Expected features: {list(model.feature_names_in_)}")
+    inference_model = build_inference_model(model)
+
+    # Load barangay encoder if it exists
+    encoder = None
+    if encoder_path.exists():
+        encoder = joblib.load(encoder_path)
+        print("✅ Barangay encoder loaded!")
+        if hasattr(encoder, 'classes_'):
+            print(f"   Barangays: {list(encoder.classes_)}")
+    else:
+        print("⚠️  Barangay encoder not found - using fallback")
+
+    version = fingerprint_files(model_path, encoder_path)
+    print(f"   Model version: {version}")
+    bundle = ModelBundle(model, inference_model, encoder, version, signature, "pickle", generation)
+    print(f"   Feature schema: {bundle.pipeline.fingerprint}")
+
+    if model_format == "mmap":
+        # Export once so the next start (and every other worker) can map it
+        try:
+            version_dir = export_model_artifact(model, encoder, artifact_dir, version)
+            print(f"✅ Model artifact exported to {version_dir}")
+        except Exception as e:
+            print(f"⚠️  Could not export model artifact: {e}")
+    return bundle
@@ -0,0 +1,250 @@
+"""
+Hyperparameter search for the Random Forest in retrain_model.py.
+
+retrain_model.py used to train one fixed configuration (100 trees,
+max_depth=10, min_samples_split=5). With tuning on, every candidate of
+PARAM_GRID (grid) or a random subset of it (random) is scored with
+time-series cross-validation: the training rows are ordered by date and
+each fold trains on earlier dates and validates on the dates right after,
+so no candidate is judged on days older than the ones it learned from.
+
+Candidates are cross-validated in a process pool (one single-threaded
+forest per process). Each one is also refit on all training rows so its
+serving cost can be measured: per-row predict_proba latency on a /predict
+sized batch (FORECAST_WEEKS rows, same INFERENCE_BACKEND and
+INFERENCE_MODEL_JOBS as the API) and pickled model size. Latency is timed
+in the parent one candidate at a time so the pool does not skew it.
+
+The chosen configuration is Pareto-optimal (accuracy, recall, latency,
+size) among the candidates that answer a /predict within the latency
+budget, preferring the higher RETRAIN_TUNE_METRIC. If none fits, the fastest
+candidate is used. Every candidate is written to the tuning report.
+
+Configuration (environment variables, also retrain_model.py flags):
+    RETRAIN_TUNE                off (default), grid or random
+    RETRAIN_TUNE_ITER           candidates tried in random mode (default 20)
+    RETRAIN_TUNE_FOLDS          time-series CV folds (default 4)
+    RETRAIN_TUNE_JOBS           processes, defaults to the number of CPU cores
+    RETRAIN_TUNE_METRIC         recall (default) or accuracy
+    RETRAIN_LATENCY_BUDGET_MS   max predict_proba time for one /predict (default 20)
+    RETRAIN_TUNE_REPORT         report path (default backend/data/tuning_report.json)
+"""
+import itertools
+import json
+import os
+import pickle
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from forecasting import FORECAST_WEEKS
+
+RETRAIN_TUNE = os.getenv("RETRAIN_TUNE", "off").lower()
+RETRAIN_TUNE_ITER = int(os.getenv("RETRAIN_TUNE_ITER", 20))
+RETRAIN_TUNE_FOLDS = int(os.getenv("RETRAIN_TUNE_FOLDS", 4))
+RETRAIN_TUNE_JOBS = int(os.getenv("RETRAIN_TUNE_JOBS", os.cpu_count() or 1))
+RETRAIN_TUNE_METRIC = os.getenv("RETRAIN_TUNE_METRIC", "recall").lower()
+RETRAIN_LATENCY_BUDGET_MS = float(os.getenv("RETRAIN_LATENCY_BUDGET_MS", 20))
+RETRAIN_TUNE_REPORT = Path(os.getenv("RETRAIN_TUNE_REPORT", Path(__file__).parent / "data" / "tuning_report.json"))
+
+# Settings shared by every candidate (as in the fixed configuration)
+BASE_PARAMS = {"class_weight": "balanced"}
+
+PARAM_GRID = {
+    "n_estimators": [50, 100, 200],
+    "max_depth": [6, 10, 16, None],
+    "min_samples_split": [2, 5],
+    "min_samples_leaf": [1, 2],
+    "max_features": ["sqrt", 1.0],
+}
+
+LATENCY_REPEATS = 50
+
+# Set once per pool process by _init_worker, so the data is not re-sent with every candidate
+_worker_data = None
+
+
+def candidate_params(mode: str, n_iter: int = RETRAIN_TUNE_ITER, seed: int = 42) -> list:
+    """Parameter dicts to try: the whole PARAM_GRID, or n_iter of them drawn at random"""
+    keys = list(PARAM_GRID)
+    grid = [dict(zip(keys, values)) for values in itertools.product(*PARAM_GRID.values())]
+    if mode == "grid":
+        return grid
+    if mode == "random":
+        return random.Random(seed).sample(grid, min(n_iter, len(grid)))
+    raise ValueError(f"Unknown tuning mode '{mode}' (use 'grid' or 'random')")
+
+
+def time_series_folds(dates, n_splits: int = RETRAIN_TUNE_FOLDS) -> list:
+    """
+    (train_rows, validation_rows) index pairs: the distinct dates are cut into
+    n_splits + 1 consecutive blocks and fold k trains on blocks 0..k and
+    validates on block k + 1. Rows sharing a date stay on the same side.
+    """
+    from sklearn.model_selection import TimeSeriesSplit
+    dates = np.asarray(dates)
+    unique_dates = np.unique(dates)
+    n_splits = min(n_splits, len(unique_dates) - 1)
+    if n_splits < 2:
+        return []
+    folds = []
+    for train_idx, val_idx in TimeSeriesSplit(n_splits=n_splits).split(unique_dates):
+        train_rows = np.flatnonzero(np.isin(dates, unique_dates[train_idx]))
+        val_rows = np.flatnonzero(np.isin(dates, unique_dates[val_idx]))
+        folds.append((train_rows, val_rows))
+    return folds
+
+
+def _init_worker(X, y, folds, random_state):
+    global _worker_data
+    _worker_data = (X, y, folds, random_state)
+
+
+def _evaluate(params: dict) -> dict:
+    """Cross-validate one candidate and refit it on all rows (runs in a pool process)"""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, recall_score
+    X, y, folds, random_state = _worker_data
+    accuracies, recalls = [], []
+    start = time.perf_counter()
+    for train_rows, val_rows in folds:
+        model = RandomForestClassifier(**BASE_PARAMS, **params, random_state=random_state, n_jobs=1)
+        model.fit(X[train_rows], y[train_rows])
+        y_pred = model.predict(X[val_rows])
+        accuracies.append(accuracy_score(y[val_rows], y_pred))
+        recalls.append(recall_score(y[val_rows], y_pred, zero_division=0))
+    cv_seconds = time.perf_counter() - start
+
+    model = RandomForestClassifier(**BASE_PARAMS, **params, random_state=random_state, n_jobs=1)
+    model.fit(X, y)
+    return {
+        "params": params,
+        "accuracy": round(float(np.mean(accuracies)), 4),
+        "recall": round(float(np.mean(recalls)), 4),
+        "accuracy_std": round(float(np.std(accuracies)), 4),
+        "cv_seconds": round(cv_seconds, 3),
+        "model": pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL),
+    }
+
+
+def measure_latency(model, X, repeats: int = LATENCY_REPEATS) -> float:
+    """Median predict_proba time in ms for one /predict (FORECAST_WEEKS rows), as served by the API"""
+    from inference import INFERENCE_MODEL_JOBS, build_inference_model
+    if hasattr(model, "n_jobs"):
+        model.n_jobs = INFERENCE_MODEL_JOBS
+    inference_model = build_inference_model(model)
+    batch = np.ascontiguousarray(X[:FORECAST_WEEKS], dtype=np.float64)
+    inference_model.predict_proba(batch)  # Warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        inference_model.predict_proba(batch)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def _dominates(a: dict, b: dict) -> bool:
+    """a is at least as good as b everywhere and better somewhere"""
+    no_worse = (a["accuracy"] >= b["accuracy"] and a["recall"] >= b["recall"]
+                and a["latency_ms"] <= b["latency_ms"] and a["model_bytes"] <= b["model_bytes"])
+    better = (a["accuracy"] > b["accuracy"] or a["recall"] > b["recall"]
+              or a["latency_ms"] < b["latency_ms"] or a["model_bytes"] < b["model_bytes"])
+    return no_worse and better
+
+
+def select_candidate(results: list, budget_ms: float, metric: str = RETRAIN_TUNE_METRIC) -> dict:
+    """
+    Mark the Pareto front of the candidates within the budget and return the
+    best of it by metric (then the other metric, latency and size). Falls back
+    to the fastest candidate when none is within the budget.
+    """
+    if metric not in ("recall", "accuracy"):
+        raise ValueError(f"Unknown tuning metric '{metric}' (use 'recall' or 'accuracy')")
+    other = "accuracy" if metric == "recall" else "recall"
+    within = [r for r in results if r["latency_ms"] <= budget_ms]
+    for r in results:
+        r["within_budget"] = r["latency_ms"] <= budget_ms
+        r["pareto"] = r["within_budget"] and not any(_dominates(o, r) for o in within)
+    if not within:
+        return min(results, key=lambda r: (r["latency_ms"], r["model_bytes"]))
+    front = [r for r in within if r["pareto"]]
+    return max(front, key=lambda r: (r[metric], r[other], -r["latency_ms"], -r["model_bytes"]))
+
+
+def tune(X, y, dates, mode: str = RETRAIN_TUNE, n_iter: int = RETRAIN_TUNE_ITER,
+         n_folds: int = RETRAIN_TUNE_FOLDS, jobs: int = RETRAIN_TUNE_JOBS,
+         budget_ms: float = RETRAIN_LATENCY_BUDGET_MS, metric: str = RETRAIN_TUNE_METRIC,
+         report_path: Path = RETRAIN_TUNE_REPORT, random_state: int = 42, progress=None):
+    """
+    Search the hyperparameters on (X, y) ordered by dates. Returns
+    (params, report) where params are the chosen RandomForestClassifier
+    settings, or (None, None) when there are too few dates to cross-validate.
+    progress(done, total) is called as candidates finish.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    folds = time_series_folds(dates, n_folds)
+    if not folds:
+        print(f"⚠️  Too few distinct dates ({len(np.unique(dates))}) for time-series CV - skipping tuning")
+        return None, None
+
+    candidates = candidate_params(mode, n_iter, seed=random_state)
+    jobs = max(1, min(jobs, len(candidates)))
+    print(f"\n🔎 Tuning: {len(candidates)} candidates ({mode}), {len(folds)} time-series folds, {jobs} processes")
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(X, y, folds, random_state)) as pool:
+        futures = [pool.submit(_evaluate, params) for params in candidates]
+        for future in as_completed(futures):
+            results.append(future.result())
+            if progress is not None:
+                progress(len(results), len(candidates))
+    search_seconds = time.perf_counter() - start
+
+    # Serving cost, measured one candidate at a time on an idle pool
+    for result in results:
+        blob = result.pop("model")
+        result["model_bytes"] = len(blob)
+        result["latency_ms"] = round(measure_latency(pickle.loads(blob), X), 3)
+        result["latency_us_per_row"] = round(result["latency_ms"] * 1000 / FORECAST_WEEKS, 1)
+
+    chosen = select_candidate(results, budget_ms, metric)
+    results.sort(key=lambda r: (not r["pareto"], -r[metric], r["latency_ms"]))
+
+    print(f"\n{'n_est':>5} {'depth':>5} {'split':>5} {'leaf':>4} {'feat':>5} "
+          f"{'acc':>6} {'recall':>6} {'ms':>7} {'KB':>8}")
+    for r in results:
+        p = r["params"]
+        mark = "⭐" if r is chosen else ("◆" if r["pareto"] else " ")
+        print(f"{p['n_estimators']:>5} {str(p['max_depth']):>5} {p['min_samples_split']:>5} "
+              f"{p['min_samples_leaf']:>4} {str(p['max_features']):>5} {r['accuracy']:>6.3f} "
+              f"{r['recall']:>6.3f} {r['latency_ms']:>7.2f} {r['model_bytes'] / 1024:>8.1f} {mark}")
+    if not chosen["within_budget"]:
+        print(f"⚠️  No candidate within {budget_ms} ms per /predict - using the fastest")
+    print(f"✅ Tuning finished in {search_seconds:.1f}s, chose {chosen['params']} "
+          f"({metric} {chosen[metric]:.3f}, {chosen['latency_ms']:.2f} ms per /predict)")
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "mode": mode,
+        "metric": metric,
+        "folds": len(folds),
+        "rows": int(len(y)),
+        "processes": jobs,
+        "latency_budget_ms": budget_ms,
+        "search_seconds": round(search_seconds, 2),
+        "chosen": chosen,
+        "candidates": results,
+    }
+    if report_path is not None:
+        report_path = Path(report_path)
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        report_path.write_text(json.dumps(report, indent=2))
+        print(f"   Tuning report: {report_path}")
+    return {**BASE_PARAMS, **chosen["params"]}, report
@@ -0,0 +1,343 @@
+"""
+Opt-in request profiler that can be switched on in a running server.
+
+When /predict or /case-reports gets slow in production, turn it on with
+PROFILE_ENABLED or POST /admin/profiling. Profiles of the last
+PROFILE_KEEP requests are kept in memory and can be downloaded as pstats
+(snakeviz, `python -m pstats`) or as collapsed stacks (flamegraph.pl,
+speedscope).
+
+Two modes:
+
+- "stack" (default): a background thread samples the stacks of every
+  thread in the process (event loop, inference workers, case writer)
+  every PROFILE_INTERVAL_MS and keeps the last PROFILE_WINDOW_SECONDS
+  of samples. A request is kept if it was sampled (PROFILE_SAMPLE_RATE)
+  or took longer than PROFILE_SLOW_MS. Its profile is the set of samples
+  taken while it ran, so a slow request can be captured after the fact.
+  Concurrent requests share the event loop, so the profile also shows
+  what was blocking it.
+- "cprofile": a sampled request runs under cProfile, which is
+  deterministic but only traces the event-loop thread, one request at a
+  time. Executor work shows up as time spent waiting. With
+  PROFILE_SLOW_MS set, only the sampled requests that were slower than
+  it are kept.
+
+Settings changed through the admin endpoint apply to the worker process
+that answered, like the profiles themselves. The admin endpoints, /metrics
+and the health probes are never profiled, so polling them does not push
+the requests of interest out of the ring buffer.
+
+Configuration (environment variables):
+    PROFILE_ENABLED          "1" to profile from startup (default off)
+    PROFILE_ADMIN_TOKEN      enables /admin/profiling; sent as the X-Admin-Token header
+    PROFILE_MODE             "stack" (default) or "cprofile"
+    PROFILE_SAMPLE_RATE      fraction of requests profiled (default 0.01)
+    PROFILE_SLOW_MS          also keep requests slower than this, stack mode (default 0 = off)
+    PROFILE_KEEP             profiles kept in the ring buffer (default 20)
+    PROFILE_INTERVAL_MS      stack sampling interval (default 5)
+    PROFILE_WINDOW_SECONDS   stack samples kept for slow requests (default 30)
+"""
+import itertools
+import marshal
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "0").lower() in ("1", "true", "yes", "on")
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_MODE = os.getenv("PROFILE_MODE", "stack").lower()
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0.01))
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", 0))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", 20))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+PROFILE_WINDOW_SECONDS = float(os.getenv("PROFILE_WINDOW_SECONDS", 30))
+PROFILE_MODES = ("stack", "cprofile")
+# Health probes, metrics scrapes and the profiler's own admin API
+UNPROFILED_PATHS = frozenset(("/", "/health", "/ready", "/metrics"))
+UNPROFILED_PREFIXES = ("/admin/",)
+MAX_STACK_DEPTH = 128
+
+
+class StackSampler:
+    """Background thread recording (thread name, stack) for every thread at a fixed interval"""
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS, window_seconds: float = PROFILE_WINDOW_SECONDS):
+        self.interval = interval_ms / 1000
+        self.window = window_seconds
+        self._samples = deque()  # (perf_counter, [(thread name, stack), ...]) oldest first
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        with self._lock:
+            self._samples.clear()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            tick = []
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                stack.reverse()
+                tick.append((names.get(ident, str(ident)), tuple(stack)))
+            now = time.perf_counter()
+            with self._lock:
+                self._samples.append((now, tick))
+                while self._samples and self._samples[0][0] < now - self.window:
+                    self._samples.popleft()
+
+    def between(self, start: float, end: float) -> Counter:
+        """Samples taken between two perf_counter values, counted per (thread, stack)"""
+        with self._lock:
+            ticks = [tick for at, tick in self._samples if start <= at <= end]
+        return Counter(itertools.chain.from_iterable(ticks))
+
+
+def _frame_label(frame) -> str:
+    filename, line, name = frame
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ":")
+
+
+def stacks_to_collapsed(stacks: Counter) -> str:
+    """Brendan Gregg's collapsed format: thread;outer;...;inner <samples>"""
+    lines = []
+    for (thread, stack), count in stacks.most_common():
+        lines.append(";".join([thread.replace(";", ":")] + [_frame_label(f) for f in stack]) + f" {count}")
+    return "\n".join(lines) + "\n"
+
+
+def stacks_to_pstats(stacks: Counter, interval: float) -> bytes:
+    """
+    Marshalled pstats data (what Stats.dump_stats writes) built from stack
+    samples: a sample adds `interval` seconds of own time to its innermost
+    function and of cumulative time to every function on the stack. Call
+    counts are sample counts.
+    """
+    stats = {}  # func -> [cc, nc, tt, ct, callers{func: [nc, cc, tt, ct]}]
+    for (_, stack), count in stacks.items():
+        seconds = count * interval
+        seen = set()
+        for depth, func in enumerate(stack):
+            entry = stats.setdefault(func, [0, 0, 0.0, 0.0, {}])
+            leaf = depth == len(stack) - 1
+            if func not in seen:  # Recursion counts once towards cumulative time
+                seen.add(func)
+                entry[0] += count
+                entry[1] += count
+                entry[3] += seconds
+            if leaf:
+                entry[2] += seconds
+            if depth:
+                edge = entry[4].setdefault(stack[depth - 1], [0, 0, 0.0, 0.0])
+                edge[0] += count
+                edge[1] += count
+                edge[2] += seconds if leaf else 0.0
+                edge[3] += seconds
+    return marshal.dumps({
+        func: (cc, nc, tt, ct, {caller: tuple(edge) for caller, edge in callers.items()})
+        for func, (cc, nc, tt, ct, callers) in stats.items()
+    })
+
+
+class RequestProfiler:
+    """Decides which requests are profiled and keeps the last `keep` profiles"""
+
+    def __init__(self, enabled: bool = PROFILE_ENABLED, mode: str = PROFILE_MODE,
+                 sample_rate: float = PROFILE_SAMPLE_RATE, slow_ms: float = PROFILE_SLOW_MS,
+                 keep: int = PROFILE_KEEP, interval_ms: float = PROFILE_INTERVAL_MS,
+                 window_seconds: float = PROFILE_WINDOW_SECONDS):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown PROFILE_MODE '{mode}' (use {' or '.join(PROFILE_MODES)})")
+        self.enabled = enabled
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.sampler = StackSampler(interval_ms, window_seconds)
+        self.profiles = deque(maxlen=max(1, keep))
+        self._ids = itertools.count(1)
+        self._cprofile_busy = threading.Lock()  # cProfile: one request at a time
+        self._started = False
+
+    def start(self):
+        """Start the stack sampler if needed (called from the app lifespan)"""
+        self._started = True
+        self._sync_sampler()
+
+    def stop(self):
+        self._started = False
+        self.sampler.stop()
+
+    def _sync_sampler(self):
+        if self._started and self.enabled and self.mode == "stack":
+            self.sampler.start()
+        elif self.sampler.running:
+            self.sampler.stop()
+
+    def configure(self, enabled=None, mode=None, sample_rate=None, slow_ms=None) -> dict:
+        """Change settings at runtime; None leaves a setting as it is"""
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}' (use {' or '.join(PROFILE_MODES)})")
+        if enabled is not None:
+            self.enabled = enabled
+        if mode is not None:
+            self.mode = mode
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        self._sync_sampler()
+        print(f"🔬 Profiling {'on' if self.enabled else 'off'}: mode {self.mode}, "
+              f"sample rate {self.sample_rate}, slow > {self.slow_ms} ms")
+        return self.status()
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "mode": self.mode,
+            "sample_rate": self.sample_rate,
+            "slow_ms": self.slow_ms,
+            "keep": self.profiles.maxlen,
+            "interval_ms": self.sampler.interval * 1000,
+            "window_seconds": self.sampler.window,
+            "sampler_running": self.sampler.running,
+            "pid": os.getpid(),
+            "profiles": [{k: v for k, v in p.items() if k != "data"} for p in reversed(self.profiles)],
+        }
+
+    def get(self, profile_id: int):
+        for profile in self.profiles:
+            if profile["id"] == profile_id:
+                return profile
+        return None
+
+    def clear(self) -> int:
+        cleared = len(self.profiles)
+        self.profiles.clear()
+        return cleared
+
+    def begin(self):
+        """Called before a request; returns a capture handle, or None when the request is not profiled"""
+        if not self.enabled:
+            return None
+        sampled = random.random() < self.sample_rate
+        if self.mode == "cprofile":
+            if not sampled or not self._cprofile_busy.acquire(blocking=False):
+                return None
+            import cProfile
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:  # Another profiler is active in this process
+                self._cprofile_busy.release()
+                return None
+            return {"mode": "cprofile", "sampled": True, "profile": profile, "start": time.perf_counter()}
+        if not sampled and self.slow_ms <= 0:
+            return None
+        return {"mode": "stack", "sampled": sampled, "start": time.perf_counter()}
+
+    def end(self, capture, route: str, method: str, path: str, status):
+        """Called after the request; keeps its profile if it qualifies"""
+        end = time.perf_counter()
+        duration_ms = (end - capture["start"]) * 1000
+        if capture["mode"] == "cprofile":
+            profile = capture["profile"]
+            profile.disable()
+            self._cprofile_busy.release()
+            if self.slow_ms > 0 and duration_ms < self.slow_ms:
+                return
+            profile.create_stats()
+            data, samples = marshal.dumps(profile.stats), None
+            reason = "sampled"
+        else:
+            slow = self.slow_ms > 0 and duration_ms >= self.slow_ms
+            if not capture["sampled"] and not slow:
+                return
+            data = self.sampler.between(capture["start"], end)
+            samples = sum(data.values())
+            reason = "sampled" if capture["sampled"] else "slow"
+        self.profiles.append({
+            "id": next(self._ids),
+            "route": route,
+            "method": method,
+            "path": path,
+            "status": status,
+            "duration_ms": round(duration_ms, 2),
+            "captured_at": datetime.now().isoformat(),
+            "mode": capture["mode"],
+            "reason": reason,
+            "samples": samples,
+            "data": data,
+        })
+
+    def export(self, profile: dict, fmt: str) -> bytes:
+        """pstats (marshalled stats) or collapsed stacks (stack mode only) for a kept profile"""
+        if profile["mode"] == "cprofile":
+            if fmt != "pstats":
+                raise ValueError("cProfile profiles have no stacks; download them as pstats")
+            return profile["data"]
+        if not profile["samples"]:
+            raise ValueError("No stack samples: the request was shorter than the sampling interval")
+        if fmt == "collapsed":
+            return stacks_to_collapsed(profile["data"]).encode()
+        return stacks_to_pstats(profile["data"], self.sampler.interval)
+
+
+def is_profiled(path: str) -> bool:
+    """False for the operational endpoints that are never profiled"""
+    return path not in UNPROFILED_PATHS and not path.startswith(UNPROFILED_PREFIXES)
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware handing each HTTP request to the profiler"""
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        capture = None
+        if scope["type"] == "http" and is_profiled(scope["path"]):
+            capture = self.profiler.begin()
+        if capture is None:
+            await self.app(scope, receive, send)
+            return
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.profiler.end(capture, route, scope["method"], scope["path"], status[0])
@@ -0,0 +1,276 @@
+"""
+Background retraining jobs.
+
+POST /model/retrain used to run retrain_model.py with subprocess.run inside
+the request, freezing the worker for the whole training (and timing the
+request out on Render), and two admins clicking at once started two
+trainings writing the same model file.
+
+RetrainJobManager.submit starts retrain_model.py as a child process and
+returns a job record right away. The child's stdout is appended to
+<job>.log as it arrives; lines of the form
+
+    ##progress {"stage": "training", "percent": 40, ...}
+
+(see report_progress in retrain_model.py) update the job's stage, progress
+and result. Job records are JSON files next to the logs, so any worker can
+answer status polls and finished jobs stay around for inspection (the
+newest RETRAIN_JOBS_KEEP are kept).
+
+Only one training runs at a time across all workers: the job holds an
+exclusive lock on .lock in the jobs directory; a submit while it is held
+returns the running job instead of starting another.
+
+Configuration (environment variables):
+    RETRAIN_JOBS_DIR          job records and logs (default backend/data/retrain_jobs)
+    RETRAIN_JOBS_KEEP         finished jobs kept on disk (default 20)
+    RETRAIN_TIMEOUT_SECONDS   a training running longer is killed (default 1800)
+    RETRAIN_LOG_LINE_BYTES    longer output lines are truncated in the log (default 1 MiB)
+"""
+import asyncio
+import json
+import os
+import sys
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-worker dev setups only, no cross-process lock
+    fcntl = None
+
+RETRAIN_JOBS_DIR = Path(os.getenv("RETRAIN_JOBS_DIR", Path(__file__).parent / "data" / "retrain_jobs"))
+RETRAIN_JOBS_KEEP = int(os.getenv("RETRAIN_JOBS_KEEP", 20))
+RETRAIN_TIMEOUT_SECONDS = float(os.getenv("RETRAIN_TIMEOUT_SECONDS", 1800))
+RETRAIN_LOG_LINE_BYTES = int(os.getenv("RETRAIN_LOG_LINE_BYTES", 1024 * 1024))
+
+PROGRESS_PREFIX = "##progress "
+FINISHED = ("succeeded", "failed", "cancelled")
+
+
+class RetrainJobManager:
+    """Single-flight runner for retrain_model.py; see the module docstring"""
+
+    def __init__(self, script: Path, cwd: Path, jobs_dir: Path = RETRAIN_JOBS_DIR,
+                 timeout: float = RETRAIN_TIMEOUT_SECONDS, keep: int = RETRAIN_JOBS_KEEP):
+        self.script = Path(script)
+        self.cwd = Path(cwd)
+        self.jobs_dir = Path(jobs_dir)
+        self.timeout = timeout
+        self.keep = keep
+        self.on_success = None  # async callable(job), e.g. reload the model
+        self._task = None
+        self._process = None
+        self._lock_file = None
+        self._running_id = None
+
+    def _record_path(self, job_id: str) -> Path:
+        return self.jobs_dir / f"{job_id}.json"
+
+    def _log_path(self, job_id: str) -> Path:
+        return self.jobs_dir / f"{job_id}.log"
+
+    def _save(self, job: dict):
+        path = self._record_path(job["id"])
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_text(json.dumps(job, indent=2))
+        os.replace(tmp_path, path)
+
+    def get(self, job_id: str):
+        """Job record, or None for an unknown id"""
+        if not job_id.replace("-", "").isalnum():
+            return None
+        try:
+            return json.loads(self._record_path(job_id).read_text())
+        except FileNotFoundError:
+            return None
+
+    def log_lines(self, job_id: str, since: int = 0) -> list:
+        """Output lines of a job starting at line `since` (0-based)"""
+        try:
+            with open(self._log_path(job_id)) as f:
+                return [line.rstrip("\n") for i, line in enumerate(f) if i >= since]
+        except FileNotFoundError:
+            return []
+
+    def list(self, limit: int = RETRAIN_JOBS_KEEP) -> list:
+        """Newest jobs first"""
+        if not self.jobs_dir.exists():
+            return []
+        jobs = []
+        for path in self.jobs_dir.glob("*.json"):
+            try:
+                jobs.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        jobs.sort(key=lambda job: job["created_at"], reverse=True)
+        return jobs[:limit]
+
+    def _try_lock(self) -> bool:
+        """Take the single-flight lock without waiting; False if another job holds it"""
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        lock_file = open(self.jobs_dir / ".lock", "a+")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                return False
+        self._lock_file = lock_file
+        return True
+
+    def _release_lock(self):
+        if self._lock_file is not None:
+            self._lock_file.close()  # Closing drops the flock
+            self._lock_file = None
+
+    def _unfinished(self) -> list:
+        return [job for job in self.list(limit=None) if job["status"] not in FINISHED]
+
+    def submit(self, args=(), trigger: str = "manual"):
+        """
+        Start a training with extra script arguments (e.g. ["--mode", "incremental"]);
+        returns (job, started). started is False if one was already running.
+        """
+        if self._task is not None and not self._task.done():
+            return self.get(self._running_id), False
+        if not self._try_lock():
+            # Another worker is training; its record is the newest unfinished one
+            unfinished = self._unfinished()
+            if not unfinished:
+                raise RuntimeError("Another training is starting, try again in a moment")
+            return unfinished[0], False
+        # We hold the lock, so unfinished records are left over from a worker that died mid-training
+        for stale in self._unfinished():
+            stale.update(status="failed", error="Interrupted (worker exited during training)",
+                         finished_at=stale["finished_at"] or datetime.now().isoformat())
+            self._save(stale)
+
+        now = datetime.now().isoformat()
+        job = {
+            "id": f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}",
+            "status": "queued",
+            "stage": "queued",
+            "progress": 0,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "returncode": None,
+            "error": None,
+            "result": {},
+            "log_lines": 0,
+            "worker_pid": os.getpid(),
+            "pid": None,
+            "args": list(args),
+            "trigger": trigger,
+        }
+        self._save(job)
+        self._running_id = job["id"]
+        self._task = asyncio.create_task(self._run(job))
+        return job, True
+
+    async def _run(self, job: dict):
+        try:
+            job["status"] = job["stage"] = "running"
+            job["started_at"] = datetime.now().isoformat()
+            self._process = await asyncio.create_subprocess_exec(
+                sys.executable, "-u", str(self.script), *job["args"],
+                cwd=str(self.cwd),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                limit=RETRAIN_LOG_LINE_BYTES,
+            )
+            job["pid"] = self._process.pid
+            self._save(job)
+            try:
+                await asyncio.wait_for(self._follow(job), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                self._process.kill()
+                job["error"] = f"Timed out after {self.timeout:.0f} seconds"
+            job["returncode"] = await self._process.wait()
+            if job["returncode"] == 0 and job["error"] is None:
+                job["status"] = job["stage"] = "succeeded"
+                job["progress"] = 100
+                if self.on_success is not None:
+                    await self.on_success(job)
+            else:
+                job["status"] = "failed"
+                job["error"] = job["error"] or f"retrain_model.py exited with code {job['returncode']}"
+        except asyncio.CancelledError:
+            if self._process is not None and self._process.returncode is None:
+                self._process.kill()
+            job["status"] = "cancelled"
+            job["error"] = "API shut down during training"
+            raise
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finished_at"] = datetime.now().isoformat()
+            self._save(job)
+            self._process = None
+            self._release_lock()
+            self._prune()
+            print(f"{'✅' if job['status'] == 'succeeded' else '❌'} Retrain job {job['id']} {job['status']}")
+
+    async def _follow(self, job: dict):
+        """Append the child's output to the job log, applying ##progress lines"""
+        with open(self._log_path(job["id"]), "a") as log:
+            while True:
+                line = await self._read_line()
+                if not line:
+                    break
+                text = line.decode("utf-8", errors="replace").rstrip("\n")
+                if text.startswith(PROGRESS_PREFIX):
+                    try:
+                        update = json.loads(text[len(PROGRESS_PREFIX):])
+                    except ValueError:
+                        update = {}
+                    job["stage"] = update.pop("stage", job["stage"])
+                    job["progress"] = update.pop("percent", job["progress"])
+                    job["result"].update(update)
+                    self._save(job)
+                    continue
+                log.write(text + "\n")
+                log.flush()
+                job["log_lines"] += 1
+
+    async def _read_line(self) -> bytes:
+        """
+        Next line of the child's output (b"" at the end). A line over
+        RETRAIN_LOG_LINE_BYTES (e.g. a huge traceback or dump) is cut there
+        instead of failing the job the way readline() would.
+        """
+        stream = self._process.stdout
+        head = None
+        while True:
+            try:
+                chunk = await stream.readuntil(b"\n")
+            except asyncio.IncompleteReadError as e:
+                chunk = e.partial  # Output ended without a newline
+            except asyncio.LimitOverrunError as e:
+                # Not a whole line within the limit: keep the first part, skip to the newline
+                chunk = await stream.readexactly(e.consumed)
+                if head is None:
+                    head = chunk[:RETRAIN_LOG_LINE_BYTES]
+                continue
+            if head is None:
+                return chunk
+            return head + b" ... [line truncated]\n"
+
+    def _prune(self):
+        """Drop the records and logs of all but the newest `keep` finished jobs"""
+        finished = [job for job in self.list(limit=None) if job["status"] in FINISHED]
+        for job in finished[self.keep:]:
+            self._record_path(job["id"]).unlink(missing_ok=True)
+            self._log_path(job["id"]).unlink(missing_ok=True)
+
+    async def close(self):
+        """Stop a training still running in this worker (on shutdown)"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
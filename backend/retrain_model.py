@@ -9,37 +9,59 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix, classification_report
 from pathlib import Path
+import os
 import sys
+import json
+import argparse
+from columnar_store import load_history_frame
+from model_bundle import save_model_files
+from incremental_training import FullRetrainNeeded, stamp_full_training, update_forest
+from feature_pipeline import FEATURE_NAMES, FeaturePipeline, training_arrays
+
+UPLOADS_DIR = Path(__file__).parent / "data"
+
+def report_progress(stage, percent, **details):
+    """Machine-readable progress line for the API's retrain jobs (see retrain_jobs.py)"""
+    print("##progress " + json.dumps({"stage": stage, "percent": percent, **details}), flush=True)
+
+def with_uploads(history, kind, keys):
+    """History plus the CSVs uploaded through the API (data/<kind>_*.csv); later rows win on duplicate keys"""
+    frames = [history]
+    for path in sorted(UPLOADS_DIR.glob(f"{kind}_*.csv")):
+        try:
+            frames.append(pd.read_csv(path, parse_dates=['date'])[list(history.columns)])
+        except Exception as e:
+            print(f"⚠️  Skipping upload {path.name}: {e}")
+    if len(frames) == 1:
+        return history
+    print(f"   + {len(frames) - 1} uploaded {kind} file(s)")
+    return pd.concat(frames, ignore_index=True).drop_duplicates(subset=keys, keep='last')
 
 def load_and_merge_data(climate_file, cases_file):
-    """Load and merge climate and dengue case data"""
+    """Load and merge climate and dengue case data per barangay (including uploads)"""
     print("📊 Loading and preparing data...")
+    report_progress("loading_data", 5)
 
     try:
         # Load climate data
-        climate = pd.read_csv(climate_file)
-        climate['date'] = pd.to_datetime(climate['date'], errors='coerce')
+        climate = with_uploads(load_history_frame(climate_file, "climate"), "climate", ['date'])
 
         # Load dengue cases
-        dengue = pd.read_csv(cases_file)
-        dengue['date'] = pd.to_datetime(dengue['date'], errors='coerce')
-
-        # Group dengue data to daily total cases
-        dengue_grouped = dengue.groupby('date')['cases'].sum().reset_index()
-
-        # Create binary label: outbreak if cases > 0
-        dengue_grouped['label'] = (dengue_grouped['cases'] > 0).astype(int)
+        dengue = with_uploads(load_history_frame(cases_file, "dengue", columns=['date', 'barangay', 'cases']),
+                              "dengue", ['date', 'barangay'])
 
-        # Merge on date
-        df = pd.merge(climate, dengue_grouped[['date', 'label']], on='date', how='inner')
+        # One row per date and barangay, as the API predicts (label: cases > 0, see feature_pipeline.py)
+        df = pd.merge(climate, dengue, on='date', how='inner')
 
         # Remove rows with missing values
-        df = df.dropna()
+        df = df.dropna().sort_values(['date', 'barangay']).reset_index(drop=True)
+        outbreaks = df['cases'] > 0
 
         print(f"✅ Data loaded successfully!")
         print(f"   Total records: {len(df)}")
-        print(f"   Outbreak cases: {df['label'].sum()} ({df['label'].mean()*100:.1f}%)")
-        print(f"   No outbreak: {(df['label'] == 0).sum()} ({(df['label'] == 0).mean()*100:.1f}%)")
+        print(f"   Barangays: {df['barangay'].nunique()}")
+        print(f"   Outbreak cases: {outbreaks.sum()} ({outbreaks.mean()*100:.1f}%)")
+        print(f"   No outbreak: {(~outbreaks).sum()} ({(~outbreaks).mean()*100:.1f}%)")
         
         return df
 
@@ -49,47 +71,74 @@ def load_and_merge_data(climate_file, cases_file):
         traceback.print_exc()
         return None
 
-def train_model(df, n_estimators=100, random_state=42):
-    """Train Random Forest model with optimized parameters"""
+def train_model(df, n_estimators=100, random_state=42, tune_mode="off", tune_options=None):
+    """
+    Train Random Forest model with optimized parameters.
+    With tune_mode "grid" or "random" the parameters are picked by the
+    hyperparameter search in model_tuning.py on the training split instead.
+    """
     print("\n🔁 Training Random Forest model...")
 
     try:
-        # Get numeric columns only (as original training does)
-        df_numeric = df.select_dtypes(include=[np.number])
-        
-        # Define features and label
-        X = df_numeric.drop('label', axis=1)
-        y = df_numeric['label']
+        # Same features as the API builds (float32 matrix in FEATURE_NAMES order)
+        pipeline, X, y = training_arrays(df)
+        dates = df['date'].to_numpy()
 
-        print(f"\n📋 Features: {list(X.columns)}")
-        print(f"   Feature order: {list(X.columns)}")
+        print(f"\n📋 Features: {FEATURE_NAMES}")
+        print(f"   Feature schema: {pipeline.fingerprint}")
         print(f"   Samples: {len(X)}")
 
         # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.25, random_state=random_state, stratify=y
+        train_rows, test_rows = train_test_split(
+            np.arange(len(y)), test_size=0.25, random_state=random_state,
+            stratify=y if len(np.unique(y)) > 1 else None
         )
+        X_train, X_test, y_train, y_test = X[train_rows], X[test_rows], y[train_rows], y[test_rows]
 
         print(f"\n   Training set: {len(X_train)} samples")
         print(f"   Test set: {len(X_test)} samples")
 
-        # Train Random Forest with optimized parameters
-        model = RandomForestClassifier(
+        # Fixed configuration, replaced by the tuned one when tuning is on
+        params = dict(
             n_estimators=n_estimators,
-            random_state=random_state,
             max_depth=10,
             min_samples_split=5,
             min_samples_leaf=2,
             class_weight='balanced',  # Handle class imbalance
+        )
+        if tune_mode != "off":
+            from model_tuning import tune
+            report_progress("tuning", 10)
+            tuned, report = tune(
+                X_train, y_train, dates[train_rows], mode=tune_mode, random_state=random_state,
+                progress=lambda done, total: report_progress("tuning", 10 + 20 * done // total,
+                                                             candidates_done=done, candidates=total),
+                **(tune_options or {})
+            )
+            if tuned is not None:
+                params = tuned
+                chosen = report["chosen"]
+                report_progress("tuned", 30, tuning={
+                    "mode": tune_mode, "candidates": len(report["candidates"]), "params": chosen["params"],
+                    "cv_accuracy": chosen["accuracy"], "cv_recall": chosen["recall"],
+                    "latency_ms": chosen["latency_ms"], "model_bytes": chosen["model_bytes"],
+                })
+
+        # Train Random Forest
+        model = RandomForestClassifier(
+            **params,
+            random_state=random_state,
             n_jobs=-1  # Use all CPU cores
         )
         
-        print(f"\n🌳 Training with {n_estimators} trees...")
+        print(f"\n🌳 Training with {model.n_estimators} trees...")
+        report_progress("training", 30, samples=int(len(X)), features=FEATURE_NAMES)
         model.fit(X_train, y_train)
+        pipeline.stamp(model)
+        report_progress("evaluating", 70)
 
         # Predictions
         y_pred = model.predict(X_test)
-        y_pred_proba = model.predict_proba(X_test)
 
         # Metrics
         acc = accuracy_score(y_test, y_pred)
@@ -112,18 +161,27 @@ def train_model(df, n_estimators=100, random_state=42):
         print(f"  False Positives (FP): {fp}")
         print(f"  False Negatives (FN): {fn}")
         print(f"  True Positives (TP):  {tp}")
+        report_progress("evaluated", 80, metrics={
+            "accuracy": round(float(acc), 4), "precision": round(float(prec), 4),
+            "recall": round(float(rec), 4), "f1": round(float(f1), 4),
+        })
+        # Baseline for the drift check of later incremental updates
+        stamp_full_training(model, dates, {
+            "accuracy": round(float(acc), 4), "recall": round(float(rec), 4),
+        })
         
         print("\n" + "="*60)
         print("📈 CLASSIFICATION REPORT")
         print("="*60)
-        print(classification_report(y_test, y_pred, target_names=['No Outbreak', 'Outbreak']))
+        print(classification_report(y_test, y_pred, labels=[0, 1], target_names=['No Outbreak', 'Outbreak'],
+                                    zero_division=0))
 
         # Feature importance
         print("\n" + "="*60)
         print("🎯 FEATURE IMPORTANCE")
         print("="*60)
         feature_importance = pd.DataFrame({
-            'feature': X.columns,
+            'feature': FEATURE_NAMES,
             'importance': model.feature_importances_
         }).sort_values('importance', ascending=False)
         
@@ -131,11 +189,15 @@ def train_model(df, n_estimators=100, random_state=42):
             print(f"  {row['feature']:15s}: {row['importance']:.4f} ({row['importance']*100:.2f}%)")
 
         # Save model
+        report_progress("saving", 90)
         model_path = Path(__file__).parent.parent / "rf_dengue_model.pkl"
-        joblib.dump(model, model_path)
+        encoder_path = Path(__file__).parent.parent / "barangay_encoder.pkl"
+        # Temp files + rename: serving workers never see a half-written or mismatched pair
+        save_model_files(model, model_path, pipeline.to_encoder(), encoder_path)
         print(f"\n✅ Model saved to: {model_path}")
+        print(f"✅ Encoder saved to: {encoder_path}")
         print(f"   Model type: {type(model).__name__}")
-        print(f"   Features: {list(X.columns)}")
+        print(f"   Features: {FEATURE_NAMES}")
         
         # Verify model can be loaded
         loaded_model = joblib.load(model_path)
@@ -151,7 +213,60 @@ def train_model(df, n_estimators=100, random_state=42):
         traceback.print_exc()
         return None
 
+def train_incremental(df, model_path, encoder_path, **full_options):
+    """
+    Update the saved forest with warm-started trees on the new rows (see
+    incremental_training.py); falls back to a full retrain when it cannot.
+    """
+    print("\n🔁 Incremental update of the Random Forest model...")
+    if not model_path.exists():
+        print(f"⚠️  No model at {model_path} - running a full retrain")
+        return train_model(df, **full_options)
+    try:
+        model = joblib.load(model_path)
+        pipeline = FeaturePipeline.from_encoder(joblib.load(encoder_path) if encoder_path.exists() else None)
+        new_barangays = set(df['barangay'].astype(str)) - set(pipeline.codes)
+        if new_barangays:
+            raise FullRetrainNeeded(f"new barangays {sorted(new_barangays)} need new codes")
+        _, X, y = training_arrays(df, pipeline)
+        report_progress("training", 30, samples=int(len(X)), features=FEATURE_NAMES, mode="incremental")
+        outcome = update_forest(model, X, y, df['date'].to_numpy(), schema=pipeline.fingerprint)
+    except FullRetrainNeeded as e:
+        print(f"⚠️  Incremental update not possible ({e}) - running a full retrain")
+        report_progress("full_retrain", 30, mode="full", fallback_reason=str(e))
+        return train_model(df, **full_options)
+
+    if outcome is None:
+        print(f"✅ Model already trained through {model.trained_through_} - nothing new to learn")
+        report_progress("up_to_date", 90, mode="incremental", trained_through=model.trained_through_)
+        return model
+
+    model, summary = outcome
+    print(f"🌳 Added {summary['trees_added']} trees on {summary['window_rows']} recent rows "
+          f"({summary['new_rows']} new), dropped {summary['trees_dropped']} oldest -> {summary['trees']} trees")
+    print(f"   History accuracy {summary['history_before']['accuracy']:.4f} -> {summary['history_after']['accuracy']:.4f}, "
+          f"recall {summary['history_before']['recall']:.4f} -> {summary['history_after']['recall']:.4f}")
+    report_progress("saving", 90, mode="incremental", incremental=summary)
+    save_model_files(model, model_path)
+    print(f"\n✅ Model saved to: {model_path}")
+    return model
+
 if __name__ == "__main__":
+    from model_tuning import (RETRAIN_TUNE, RETRAIN_TUNE_ITER, RETRAIN_TUNE_FOLDS, RETRAIN_TUNE_JOBS,
+                              RETRAIN_TUNE_METRIC, RETRAIN_LATENCY_BUDGET_MS)
+    parser = argparse.ArgumentParser(description="Retrain the dengue outbreak model")
+    parser.add_argument("--mode", choices=["full", "incremental"], default=os.getenv("RETRAIN_MODE", "full"),
+                        help="full rebuild, or add trees for the new rows (default: RETRAIN_MODE or full)")
+    parser.add_argument("--tune", choices=["off", "grid", "random"], default=RETRAIN_TUNE,
+                        help="hyperparameter search (default: RETRAIN_TUNE or off)")
+    parser.add_argument("--tune-iter", type=int, default=RETRAIN_TUNE_ITER, help="candidates in random mode")
+    parser.add_argument("--tune-folds", type=int, default=RETRAIN_TUNE_FOLDS, help="time-series CV folds")
+    parser.add_argument("--tune-jobs", type=int, default=RETRAIN_TUNE_JOBS, help="search processes")
+    parser.add_argument("--tune-metric", choices=["recall", "accuracy"], default=RETRAIN_TUNE_METRIC)
+    parser.add_argument("--latency-budget-ms", type=float, default=RETRAIN_LATENCY_BUDGET_MS,
+                        help="max predict_proba time for one /predict")
+    args = parser.parse_args()
+
     # Get paths
     base_dir = Path(__file__).parent.parent
     climate_file = base_dir / "climate.csv"
@@ -177,7 +292,15 @@ if __name__ == "__main__":
     
     if df is not None:
         # Train model
-        model = train_model(df, n_estimators=100, random_state=42)
+        full_options = dict(n_estimators=100, random_state=42, tune_mode=args.tune, tune_options={
+            "n_iter": args.tune_iter, "n_folds": args.tune_folds, "jobs": args.tune_jobs,
+            "metric": args.tune_metric, "budget_ms": args.latency_budget_ms,
+        })
+        if args.mode == "incremental":
+            model = train_incremental(df, base_dir / "rf_dengue_model.pkl", base_dir / "barangay_encoder.pkl",
+                                      **full_options)
+        else:
+            model = train_model(df, **full_options)
         
         if model is not None:
             print("\n" + "="*60)
@@ -0,0 +1,115 @@
+"""
+Precomputed daily risk grid.
+
+With the default climate the forecast only depends on barangay, start date
+and model, so a background job scores every barangay x next N days x
+forecast week in one predict_proba call and keeps the result as dense NumPy
+arrays. The default-climate endpoints are then served as pure lookups.
+
+Configuration (environment variables):
+    RISK_GRID_DAYS            start dates covered from today, 0 disables the grid (default 30)
+    RISK_GRID_REFRESH_HOURS   rebuild interval so the window keeps rolling (default 6)
+"""
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
+
+from forecasting import (
+    FORECAST_WEEKS,
+    build_horizon_climate,
+    build_weekly_forecast,
+    forecast_weeks,
+    score_outbreak_probability,
+)
+from feature_pipeline import FEATURE_DTYPE
+
+RISK_GRID_DAYS = int(os.getenv("RISK_GRID_DAYS", 30))
+RISK_GRID_REFRESH_HOURS = float(os.getenv("RISK_GRID_REFRESH_HOURS", 6))
+
+CLIMATE_COLUMNS = ('rainfall', 'temperature', 'humidity')
+
+
+class RiskGrid:
+    """
+    Immutable risk table for one model version.
+
+    probabilities: float64 (barangays, days, weeks) outbreak probabilities
+    climates:      float64 (days, weeks, 3) climate used for each forecast week
+    Kept in float64 so lookups round exactly like the live forecasting path.
+    """
+
+    def __init__(self, barangays: List[str], start_date: datetime, probabilities: np.ndarray,
+                 climates: np.ndarray, model_version: str, climate_version: int = None):
+        self.barangays = list(barangays)
+        self.index = {name: i for i, name in enumerate(self.barangays)}
+        self.start_date = start_date
+        self.probabilities = probabilities
+        self.climates = climates
+        self.model_version = model_version
+        self.climate_version = climate_version  # Climatology the weeks 2-4 climate came from
+        self.generated_at = datetime.now().isoformat()
+
+    @property
+    def days(self) -> int:
+        return self.probabilities.shape[1]
+
+    def lookup(self, barangay: str, start_date: datetime) -> Optional[List[dict]]:
+        """weekly_forecast entries for (barangay, start_date), or None if outside the grid"""
+        row = self.index.get(barangay)
+        offset = (start_date - self.start_date).days
+        if row is None or not (0 <= offset < self.days):
+            return None
+        climates = [dict(zip(CLIMATE_COLUMNS, week)) for week in self.climates[offset].tolist()]
+        return build_weekly_forecast(start_date, climates, self.probabilities[row, offset].tolist())
+
+    def lookup_many(self, barangays: List[str], start_date: datetime) -> List[Optional[List[dict]]]:
+        """lookup() for several barangays: the climate rows and probabilities are gathered once"""
+        offset = (start_date - self.start_date).days
+        if not (0 <= offset < self.days):
+            return [None] * len(barangays)
+        rows = [self.index.get(barangay) for barangay in barangays]
+        found = [row for row in rows if row is not None]
+        climates = [dict(zip(CLIMATE_COLUMNS, week)) for week in self.climates[offset].tolist()]
+        weeks = forecast_weeks(start_date, climates)
+        probabilities = iter(self.probabilities[found, offset].tolist())
+        return [None if row is None else build_weekly_forecast(start_date, climates, next(probabilities), weeks)
+                for row in rows]
+
+    def stats(self) -> dict:
+        return {
+            "barangays": len(self.barangays),
+            "days": self.days,
+            "weeks": self.probabilities.shape[2],
+            "start_date": self.start_date.strftime("%Y-%m-%d"),
+            "model_version": self.model_version,
+            "climate_version": self.climate_version,
+            "generated_at": self.generated_at,
+            "nbytes": int(self.probabilities.nbytes + self.climates.nbytes),
+        }
+
+
+def build_risk_grid(model, barangays: List[str], barangay_codes: List[int], base_climate: dict,
+                    start_date: datetime, days: int, climate_for_date: Callable, model_version: str,
+                    weeks: int = FORECAST_WEEKS, climate_version: int = None) -> RiskGrid:
+    """Score barangays x days x weeks in a single predict_proba call"""
+    import numpy as np
+    start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    climates = np.array([
+        [[c[col] for col in CLIMATE_COLUMNS]
+         for c in build_horizon_climate(start_date + timedelta(days=day), base_climate, climate_for_date, weeks)]
+        for day in range(days)
+    ], dtype=np.float64)  # (days, weeks, 3)
+
+    # Same climate block for every barangay, only the code column differs
+    climate_rows = climates.reshape(days * weeks, len(CLIMATE_COLUMNS))
+    features = np.empty((len(barangays) * days * weeks, len(CLIMATE_COLUMNS) + 1), dtype=FEATURE_DTYPE)
+    features[:, :3] = np.tile(climate_rows, (len(barangays), 1))
+    features[:, 3] = np.repeat(np.asarray(barangay_codes, dtype=FEATURE_DTYPE), days * weeks)
+
+    probabilities = score_outbreak_probability(model, features).reshape(len(barangays), days, weeks)
+    return RiskGrid(barangays, start_date, probabilities, climates, model_version, climate_version)
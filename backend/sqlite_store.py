@@ -0,0 +1,511 @@
+"""
+SQLite storage backend (STORAGE_BACKEND=sqlite).
+
+Keeps case reports and the rows of uploaded climate/dengue CSVs in one
+SQLite database in WAL mode, so several uvicorn workers can read while one
+writes. Filters and paging use indexes on barangay, date and reported_at,
+and the case-report analytics are GROUP BY queries instead of Python loops.
+
+SQLiteStore exposes the same case-report interface as CaseReportStore
+(append_many / page / newest / analytics / export_lines), so the API and
+the group-commit writer do not care which backend is active.
+
+The first start against an empty database imports the existing files once:
+case_reports.jsonl (in file order) and every CSV in the data directory.
+One worker claims the import (pid, host and a heartbeat in the meta
+table); the others skip it. Case reports are imported in batches that
+commit the file offset they reached, and a CSV import replaces its upload,
+so an import cut short (crash, redeploy) resumes where it stopped: the
+next start takes over a claim whose process is gone or whose heartbeat is
+older than SQLITE_MIGRATION_STALE_SECONDS. The import is marked done only
+when every source went in; otherwise the claim is released and the next
+start retries. The same migration can be run by hand:
+    python sqlite_store.py migrate            # from the backend directory
+
+Configuration (environment variables):
+    SQLITE_PATH                      database file (default backend/data/moskita.db)
+    SQLITE_MIGRATION_STALE_SECONDS   heartbeat age after which an import claim is taken over (default 300)
+"""
+import csv
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from case_store import ACTION_KEYS, RISK_KEYS, SYMPTOM_KEYS, report_date, risk_class
+
+SQLITE_PATH = Path(os.getenv("SQLITE_PATH", Path(__file__).parent / "data" / "moskita.db"))
+SCHEMA_VERSION = 1
+SQLITE_MIGRATION_STALE_SECONDS = float(os.getenv("SQLITE_MIGRATION_STALE_SECONDS", 300))
+
+UPLOAD_COLUMNS = {
+    "climate": ("date", "rainfall", "temperature", "humidity"),
+    "dengue": ("date", "barangay", "cases"),
+}
+
+# Orders GROUP BY keys like a newest-first scan meets them: by the key's newest
+# (reported_at, -id). ' ' sorts below every character of an ISO timestamp, so
+# the concatenation compares like the tuple.
+NEWEST_FIRST = "ORDER BY MAX({prefix}reported_at || ' ' || printf('%012d', 999999999999 - {prefix}id)) DESC"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS case_reports (
+    id INTEGER PRIMARY KEY,
+    reported_at TEXT NOT NULL,
+    barangay TEXT,
+    report_date TEXT NOT NULL,
+    date_reported TEXT,
+    risk TEXT,
+    report TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_case_reports_recency ON case_reports (reported_at, id);
+CREATE INDEX IF NOT EXISTS idx_case_reports_barangay ON case_reports (barangay COLLATE NOCASE, reported_at);
+CREATE INDEX IF NOT EXISTS idx_case_reports_report_date ON case_reports (report_date);
+CREATE INDEX IF NOT EXISTS idx_case_reports_date_reported ON case_reports (date_reported);
+CREATE INDEX IF NOT EXISTS idx_case_reports_risk ON case_reports (risk);
+CREATE TABLE IF NOT EXISTS case_report_flags (
+    report_id INTEGER NOT NULL REFERENCES case_reports (id),
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_case_report_flags ON case_report_flags (kind, name);
+CREATE TABLE IF NOT EXISTS uploads (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    filename TEXT NOT NULL UNIQUE,
+    original_filename TEXT,
+    size INTEGER,
+    rows INTEGER,
+    modified TEXT
+);
+CREATE TABLE IF NOT EXISTS climate_rows (
+    upload_id INTEGER NOT NULL REFERENCES uploads (id),
+    date TEXT NOT NULL,
+    rainfall REAL,
+    temperature REAL,
+    humidity REAL
+);
+CREATE INDEX IF NOT EXISTS idx_climate_rows_date ON climate_rows (date);
+CREATE TABLE IF NOT EXISTS dengue_rows (
+    upload_id INTEGER NOT NULL REFERENCES uploads (id),
+    date TEXT NOT NULL,
+    barangay TEXT NOT NULL,
+    cases INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_dengue_rows_barangay_date ON dengue_rows (barangay COLLATE NOCASE, date);
+CREATE INDEX IF NOT EXISTS idx_dengue_rows_date ON dengue_rows (date);
+"""
+
+
+def _number(value, cast=float):
+    try:
+        return cast(float(value)) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+class SQLiteStore:
+    """Case reports + uploaded datasets in SQLite (WAL mode)"""
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        # Not cached: the store is created at import, which gunicorn's preload_app does in the
+        # parent, and a connection must not be shared with the forked workers
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread and process; WAL lets readers run while a writer commits"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid != os.getpid():
+            # Inherited through a fork: leave the parent's connection alone and open our own
+            conn = None
+            self._local.synchronous = None
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _write(self, fn, *args):
+        """Run fn(conn, *args) in one IMMEDIATE transaction"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn, *args)
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    # ----- case reports -----
+
+    @staticmethod
+    def _insert_reports(conn, reports):
+        for report in reports:
+            text = json.dumps(report)
+            cursor = conn.execute(
+                "INSERT INTO case_reports (reported_at, barangay, report_date, date_reported, risk, report) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (str(report.get("reported_at", "")), report.get("barangay", "Unknown"), report_date(report),
+                 report.get("dateReported") or None, risk_class(report), text),
+            )
+            flags = []
+            for kind, field in (("symptom", "symptoms"), ("action", "actionTaken")):
+                values = report.get(field)
+                if isinstance(values, dict):
+                    flags.extend((cursor.lastrowid, kind, name) for name, on in values.items() if on)
+            if flags:
+                conn.executemany("INSERT INTO case_report_flags (report_id, kind, name) VALUES (?, ?, ?)", flags)
+        return len(reports)
+
+    def refresh(self) -> int:
+        """Nothing to catch up on: every worker reads the same database"""
+        return 0
+
+    def append(self, report: dict) -> dict:
+        self.append_many([report])
+        return report
+
+    def append_many(self, reports: list, fsync: bool = True):
+        """Insert a batch of reports in one transaction (synchronous=FULL when fsync is requested)"""
+        conn = self._connect()
+        synchronous = "FULL" if fsync else "NORMAL"
+        if getattr(self._local, "synchronous", None) != synchronous:
+            conn.execute(f"PRAGMA synchronous={synchronous}")
+            self._local.synchronous = synchronous
+        self._write(self._insert_reports, reports)
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM case_reports").fetchone()[0]
+
+    def exists(self) -> bool:
+        return True
+
+    @staticmethod
+    def _where(cursor=None, barangay=None, date_from=None, date_to=None, risk=None):
+        clauses, params = [], []
+        if cursor is not None:
+            reported_at, sep, seq = cursor.rpartition("|")
+            if sep and seq.isdigit():
+                clauses.append("(reported_at < ? OR (reported_at = ? AND id > ?))")
+                params += [reported_at, reported_at, int(seq)]
+            else:
+                clauses.append("reported_at < ?")
+                params.append(cursor)
+        if barangay:
+            clauses.append("barangay = ? COLLATE NOCASE")
+            params.append(barangay)
+        if date_from:
+            clauses.append("report_date >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("report_date <= ?")
+            params.append(date_to)
+        if risk:
+            clauses.append("risk = ?")
+            params.append(risk)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def newest(self, limit: int = None, offset: int = 0) -> list:
+        """Reports newest first (ties in insertion order)"""
+        rows = self._connect().execute(
+            "SELECT report FROM case_reports ORDER BY reported_at DESC, id ASC LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset),
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def page(self, limit: int, cursor: str = None, **filters):
+        """Same contract as CaseReportStore.page; the cursor is <reported_at>|<id>"""
+        where, params = self._where(cursor, **filters)
+        rows = self._connect().execute(
+            f"SELECT id, reported_at, report FROM case_reports{where} ORDER BY reported_at DESC, id ASC LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+        reports = [json.loads(row[2]) for row in rows]
+        if len(rows) < limit:
+            return reports, None
+        last_id, last_reported_at, _ = rows[-1]
+        return reports, f"{last_reported_at}|{last_id}"
+
+    def export_lines(self, **filters):
+        """Report lines (bytes) in insertion order, fetched in chunks"""
+        where, params = self._where(**filters)
+        # A dedicated connection: StreamingResponse iterates from threadpool threads
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        try:
+            rows = conn.execute(f"SELECT report FROM case_reports{where} ORDER BY id", params)
+            while True:
+                chunk = rows.fetchmany(500)
+                if not chunk:
+                    break
+                for (text,) in chunk:
+                    yield text.encode() + b"\n"
+        finally:
+            conn.close()
+
+    def _counts(self, sql, params=(), fixed_keys=()) -> dict:
+        """{key: count} from a GROUP BY: fixed keys first, then the others in query order"""
+        counts = {key: 0 for key in fixed_keys}
+        for key, count in self._connect().execute(sql, params):
+            counts[key] = count
+        return counts
+
+    def analytics(self, recent: int = 10) -> dict:
+        conn = self._connect()
+        by_risk = {key: 0 for key in RISK_KEYS}
+        for risk, count in conn.execute("SELECT risk, COUNT(*) FROM case_reports WHERE risk IS NOT NULL GROUP BY risk"):
+            by_risk[risk] = count
+        flag_sql = (
+            "SELECT f.name, COUNT(*) FROM case_report_flags f JOIN case_reports r ON r.id = f.report_id "
+            "WHERE f.kind = ? GROUP BY f.name " + NEWEST_FIRST.format(prefix="r.")
+        )
+        return {
+            "total_reports": len(self),
+            "by_barangay": self._counts(
+                "SELECT barangay, COUNT(*) FROM case_reports GROUP BY barangay " + NEWEST_FIRST.format(prefix="")),
+            "by_risk": by_risk,
+            "by_symptoms": self._counts(flag_sql, ("symptom",), SYMPTOM_KEYS),
+            "by_date": self._counts(
+                "SELECT date_reported, COUNT(*) FROM case_reports WHERE date_reported IS NOT NULL "
+                "GROUP BY date_reported " + NEWEST_FIRST.format(prefix="")),
+            "by_action": self._counts(flag_sql, ("action",), ACTION_KEYS),
+            "recent_reports": self.newest(recent),
+        }
+
+    def stats(self) -> dict:
+        conn = self._connect()
+        return {
+            "backend": "sqlite",
+            "path": str(self.path),
+            "reports": len(self),
+            "uploads": conn.execute("SELECT COUNT(*) FROM uploads").fetchone()[0],
+            "climate_rows": conn.execute("SELECT COUNT(*) FROM climate_rows").fetchone()[0],
+            "dengue_rows": conn.execute("SELECT COUNT(*) FROM dengue_rows").fetchone()[0],
+        }
+
+    # ----- uploaded datasets -----
+
+    def record_upload(self, kind: str, file_path, rows, original_filename: str = None) -> int:
+        """
+        Register an uploaded CSV and index its rows. `rows` yields tuples in
+        UPLOAD_COLUMNS[kind] order (ignored for kind "other").
+        Returns the number of rows stored.
+        """
+        file_path = Path(file_path)
+        stat = file_path.stat() if file_path.exists() else None
+
+        def insert(conn):
+            conn.execute("DELETE FROM climate_rows WHERE upload_id IN (SELECT id FROM uploads WHERE filename = ?)",
+                         (file_path.name,))
+            conn.execute("DELETE FROM dengue_rows WHERE upload_id IN (SELECT id FROM uploads WHERE filename = ?)",
+                         (file_path.name,))
+            conn.execute("DELETE FROM uploads WHERE filename = ?", (file_path.name,))
+            upload_id = conn.execute(
+                "INSERT INTO uploads (kind, filename, original_filename, size, modified) VALUES (?, ?, ?, ?, ?)",
+                (kind, file_path.name, original_filename,
+                 stat.st_size if stat else None,
+                 datetime.fromtimestamp(stat.st_mtime).isoformat() if stat else None),
+            ).lastrowid
+            if kind == "climate":
+                stored = conn.executemany(
+                    "INSERT INTO climate_rows (upload_id, date, rainfall, temperature, humidity) VALUES (?, ?, ?, ?, ?)",
+                    ((upload_id, str(date), _number(r), _number(t), _number(h)) for date, r, t, h in rows),
+                ).rowcount
+            elif kind == "dengue":
+                stored = conn.executemany(
+                    "INSERT INTO dengue_rows (upload_id, date, barangay, cases) VALUES (?, ?, ?, ?)",
+                    ((upload_id, str(date), str(barangay), _number(cases, int)) for date, barangay, cases in rows),
+                ).rowcount
+            else:
+                stored = 0
+            conn.execute("UPDATE uploads SET rows = ? WHERE id = ?", (stored, upload_id))
+            return stored
+
+        return self._write(insert)
+
+    def list_uploads(self) -> list:
+        rows = self._connect().execute("SELECT filename, size, modified FROM uploads ORDER BY id")
+        return [{"filename": filename, "size": size, "modified": modified} for filename, size, modified in rows]
+
+    def climate_rows(self, date_from: str = None, date_to: str = None, limit: int = 1000) -> list:
+        where, params = [], []
+        if date_from:
+            where.append("c.date >= ?")
+            params.append(date_from)
+        if date_to:
+            where.append("c.date <= ?")
+            params.append(date_to)
+        sql = ("SELECT c.date, c.rainfall, c.temperature, c.humidity, u.filename FROM climate_rows c "
+               "JOIN uploads u ON u.id = c.upload_id"
+               + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY c.date LIMIT ?")
+        rows = self._connect().execute(sql, (*params, limit))
+        return [{"date": d, "rainfall": r, "temperature": t, "humidity": h, "source": f} for d, r, t, h, f in rows]
+
+    def dengue_rows(self, barangay: str = None, date_from: str = None, date_to: str = None, limit: int = 1000) -> list:
+        where, params = [], []
+        if barangay:
+            where.append("d.barangay = ? COLLATE NOCASE")
+            params.append(barangay)
+        if date_from:
+            where.append("d.date >= ?")
+            params.append(date_from)
+        if date_to:
+            where.append("d.date <= ?")
+            params.append(date_to)
+        sql = ("SELECT d.date, d.barangay, d.cases, u.filename FROM dengue_rows d "
+               "JOIN uploads u ON u.id = d.upload_id"
+               + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY d.date, d.barangay LIMIT ?")
+        rows = self._connect().execute(sql, (*params, limit))
+        return [{"date": d, "barangay": b, "cases": c, "source": f} for d, b, c, f in rows]
+
+    # ----- one-shot migration from flat files -----
+
+    def _claim_migration(self):
+        """
+        Claim the file import for this process. Returns (True, None) when claimed,
+        or (False, value) with the finished marker or the live claim of another process.
+        """
+        claim = json.dumps({"pid": os.getpid(), "host": socket.gethostname(), "heartbeat": time.time()})
+
+        def take(conn):
+            row = conn.execute("SELECT value FROM meta WHERE key = 'migrated_from_files'").fetchone()
+            if row is not None:
+                if row[0] != "in progress" and not row[0].startswith("{"):
+                    return False, row[0]  # Finished: the value is the completion time
+                # "in progress" is the claim of older versions, which had no heartbeat
+                holder = json.loads(row[0]) if row[0].startswith("{") else {"pid": None, "host": None, "heartbeat": 0}
+                if not self._claim_is_stale(holder):
+                    return False, holder
+                owner = f"pid {holder['pid']} on {holder['host']}" if holder["pid"] else "an older version"
+                print(f"⚠️  Taking over the unfinished file import of {owner}")
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from_files', ?)", (claim,))
+            return True, None
+
+        return self._write(take)
+
+    @staticmethod
+    def _claim_is_stale(holder: dict) -> bool:
+        """A claim whose heartbeat is too old, or whose process is gone (checked when on this host)"""
+        if time.time() - holder["heartbeat"] >= SQLITE_MIGRATION_STALE_SECONDS:
+            return True
+        if holder["host"] != socket.gethostname():
+            return False
+        if holder["pid"] == os.getpid():
+            return True  # Our own earlier attempt
+        try:
+            os.kill(holder["pid"], 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+
+    @staticmethod
+    def _heartbeat(conn):
+        conn.execute("UPDATE meta SET value = ? WHERE key = 'migrated_from_files'",
+                     (json.dumps({"pid": os.getpid(), "host": socket.gethostname(), "heartbeat": time.time()}),))
+
+    def _import_reports(self, conn, reports, offset):
+        """One batch of case_reports.jsonl plus the line offset it reaches, in the same transaction"""
+        self._insert_reports(conn, reports)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_case_report_lines', ?)",
+                     (str(offset),))
+        self._heartbeat(conn)
+        return len(reports)
+
+    def migrate_from_files(self, case_reports_path, data_dir) -> dict:
+        """Import case_reports.jsonl and data/*.csv once; resumes an interrupted import"""
+        # Claimed in a transaction so that workers starting together import only once
+        claimed, holder = self._claim_migration()
+        if not claimed:
+            if isinstance(holder, dict):
+                return {"skipped": True, "in_progress": holder}
+            return {"skipped": True, "migrated_at": holder}
+
+        summary = {"case_reports": 0, "uploads": 0, "rows": 0, "errors": []}
+        try:
+            case_reports_path = Path(case_reports_path)
+            if case_reports_path.exists():
+                from case_store import iter_report_lines
+                row = self._connect().execute(
+                    "SELECT value FROM meta WHERE key = 'migrated_case_report_lines'").fetchone()
+                done_lines = int(row[0]) if row else 0
+                if done_lines:
+                    summary["resumed_after_lines"] = done_lines
+                # An import cut short by an older version left rows but no offset: skip what is there
+                existing = set()
+                if row is None and len(self):
+                    existing = {text for (text,) in self._connect().execute("SELECT report FROM case_reports")}
+                batch, offset = [], 0
+                for line in iter_report_lines(case_reports_path):
+                    offset += 1
+                    if offset <= done_lines:
+                        continue
+                    report = json.loads(line)
+                    if existing and json.dumps(report) in existing:
+                        continue
+                    batch.append(report)
+                    if len(batch) >= 1000:
+                        summary["case_reports"] += self._write(self._import_reports, batch, offset)
+                        batch = []
+                if batch:
+                    summary["case_reports"] += self._write(self._import_reports, batch, offset)
+        except Exception as e:
+            summary["errors"].append(f"{Path(case_reports_path).name}: {e}")
+
+        for csv_path in sorted(Path(data_dir).glob("*.csv")):
+            kind = csv_path.name.split("_", 1)[0]
+            columns = UPLOAD_COLUMNS.get(kind)
+            try:
+                with open(csv_path, newline="") as f:
+                    reader = csv.DictReader(f)
+                    if columns is None or not set(columns) <= set(reader.fieldnames or ()):
+                        kind, rows = "other", []
+                    else:
+                        rows = [tuple(row[c] for c in columns) for row in reader]
+                # Replaces the upload if a previous attempt got this far
+                summary["rows"] += self.record_upload(kind, csv_path, rows)
+                summary["uploads"] += 1
+                self._write(self._heartbeat)
+            except Exception as e:
+                summary["errors"].append(f"{csv_path.name}: {e}")
+
+        if summary["errors"]:
+            # Release the claim: the next start retries and resumes from what was committed
+            self._write(lambda conn: conn.execute("DELETE FROM meta WHERE key = 'migrated_from_files'"))
+            print(f"⚠️  File import incomplete, it will be retried on the next start: {summary['errors']}")
+        else:
+            self._write(lambda conn: conn.execute("UPDATE meta SET value = ? WHERE key = 'migrated_from_files'",
+                                                  (datetime.now().isoformat(),)))
+        return summary
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] != ["migrate"]:
+        raise SystemExit("Usage: python sqlite_store.py migrate")
+    backend_dir = Path(__file__).parent
+    reports_path = Path(os.getenv("CASE_REPORTS_PATH", backend_dir / "data" / "case_reports.jsonl"))
+    store = SQLiteStore(SQLITE_PATH)
+    print(f"✅ Migration: {store.migrate_from_files(reports_path, backend_dir / 'data')}")
+    print(f"   Database: {store.path}")
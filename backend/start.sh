@@ -1,5 +1,5 @@
 #!/bin/bash
 # Start script for Render deployment
 cd backend
-uvicorn app:app --host 0.0.0.0 --port ${PORT:-10000}
+PORT=${PORT:-10000} gunicorn -c gunicorn.conf.py app:app
 
@@ -0,0 +1,11 @@
+"""
+Tests for the backend. Run from the backend directory:
+    python -m pytest -q tests
+"""
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+# The backend runs with flat imports from its own directory
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(BACKEND_DIR / "benchmarks"))
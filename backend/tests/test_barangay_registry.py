@@ -0,0 +1,36 @@
+import csv
+
+import barangay_registry
+from barangay_registry import BarangayRegistry
+
+
+def write_cases(path, names):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["date", "barangay", "cases"])
+        writer.writerows(["2024-01-01", name, 1] for name in names)
+
+
+def test_rebuild_reads_only_new_case_files(tmp_path, monkeypatch):
+    history = tmp_path / "dengue_cases.csv"
+    write_cases(history, ["Tinago", "Sta. Cruz"])
+    BarangayRegistry.load(None, [history])
+
+    reads = []
+    real_reader = csv.DictReader
+    monkeypatch.setattr(barangay_registry.csv, "DictReader", lambda f: reads.append(f.name) or real_reader(f))
+    upload = tmp_path / "dengue_20240201.csv"
+    write_cases(upload, ["Balatas"])
+    registry = BarangayRegistry.load(None, [history, upload])
+
+    assert reads == [str(upload)]
+    assert registry.names == ["Sta. Cruz", "Tinago", "Balatas"]
+    assert registry.canonical("santa cruz") == "Sta. Cruz"
+
+
+def test_changed_case_file_is_read_again(tmp_path):
+    history = tmp_path / "dengue_cases.csv"
+    write_cases(history, ["Tinago"])
+    assert BarangayRegistry.load(None, [history]).names == ["Tinago"]
+    write_cases(history, ["Tinago", "Balatas", "Calauag"])
+    assert BarangayRegistry.load(None, [history]).names == ["Balatas", "Calauag", "Tinago"]
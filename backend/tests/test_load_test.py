@@ -0,0 +1,16 @@
+from load_test import summarize
+
+
+def test_percentiles_never_exceed_max():
+    # Few samples with a slow tail: exclusive quantiles would report p95/p99 above the max
+    samples = [("/predict/batch", ms, 200) for ms in (120.0, 150.0, 180.0, 240.0, 1180.0)]
+    summary = summarize(samples, seconds=1.0)
+    assert summary["p50_ms"] <= summary["p95_ms"] <= summary["p99_ms"] <= summary["max_ms"] == 1180.0
+
+
+def test_errors_counted_by_status():
+    samples = [("/report-case", 10.0, 200), ("/report-case", 12.0, 503), ("/report-case", 11.0, "ReadTimeout")]
+    summary = summarize(samples, seconds=2.0)
+    assert summary["requests"] == 3
+    assert summary["rps"] == 1.5
+    assert summary["errors"] == {"503": 1, "ReadTimeout": 1}
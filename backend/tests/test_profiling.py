@@ -0,0 +1,38 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from profiling import ProfilingMiddleware, RequestProfiler
+
+
+def make_client():
+    profiler = RequestProfiler(enabled=True, mode="cprofile", sample_rate=1.0, slow_ms=0)
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+    @app.get("/admin/profiling")
+    def admin():
+        return profiler.status()
+
+    @app.get("/metrics")
+    def metrics():
+        return {}
+
+    @app.get("/case-reports")
+    def case_reports():
+        return []
+
+    return TestClient(app), profiler
+
+
+def test_admin_and_metrics_requests_are_not_profiled():
+    client, profiler = make_client()
+    for path in ("/admin/profiling", "/metrics", "/admin/profiling"):
+        assert client.get(path).status_code == 200
+    assert len(profiler.profiles) == 0
+
+
+def test_other_requests_are_profiled():
+    client, profiler = make_client()
+    client.get("/admin/profiling")
+    client.get("/case-reports")
+    assert [p["path"] for p in profiler.profiles] == ["/case-reports"]
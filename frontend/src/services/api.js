@@ -63,9 +63,24 @@ export const reportCase = async (barangay, reportData) => {
   return response.data
 }
 
-export const retrainModel = async () => {
-  const response = await api.post('/model/retrain')
-  return response.data
+// Retraining runs as a background job: start it, then poll its status until it finishes
+export const retrainModel = async (onProgress, pollMs = 2000) => {
+  const started = await api.post('/model/retrain')
+  const jobId = started.data.job_id
+  let since = 0
+  for (;;) {
+    const response = await api.get(`/model/retrain/${jobId}`, { params: { since } })
+    const job = response.data
+    since = job.next_since
+    if (onProgress) onProgress(job)
+    if (job.status === 'succeeded') {
+      return { ...job, message: 'Model retrained successfully' }
+    }
+    if (job.status === 'failed' || job.status === 'cancelled') {
+      throw new Error(job.error || `Retraining ${job.status}`)
+    }
+    await new Promise((resolve) => setTimeout(resolve, pollMs))
+  }
 }
 
 export const predictBatch = async (requests) => {
@@ -1,30 +1,27 @@
 import pandas as pd
-import numpy as np
-import joblib
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+from columnar_store import load_history_frame
+from model_bundle import save_model_files
+from feature_pipeline import training_arrays
 
 def load_and_merge_data(climate_file, cases_file):
     print("Loading and preparing data...")
 
     try:
         # Load climate data
-        climate = pd.read_csv(climate_file)
-        climate['date'] = pd.to_datetime(climate['date'], errors='coerce')
+        climate = load_history_frame(climate_file, "climate")
 
         # Load dengue cases
-        dengue = pd.read_csv(cases_file)
-        dengue['date'] = pd.to_datetime(dengue['date'], errors='coerce')
-
-        # Group dengue data to daily total cases (if not already)
-        dengue_grouped = dengue.groupby('date')['cases'].sum().reset_index()
+        dengue = load_history_frame(cases_file, "dengue", columns=['date', 'barangay', 'cases'])
 
-        # Create binary label: outbreak if cases > 0
-        dengue_grouped['label'] = (dengue_grouped['cases'] > 0).astype(int)
-
-        # Merge on date
-        df = pd.merge(climate, dengue_grouped[['date', 'label']], on='date')
+        # Merge on date: one row per date and barangay (label: cases > 0, see feature_pipeline.py)
+        df = pd.merge(climate, dengue, on='date').dropna().reset_index(drop=True)
 
         print("Data loaded successfully!")
         return df
@@ -37,12 +34,8 @@ def train_model(df):
     print("🔁 Training model...")
 
     try:
-        # Drop non-numeric columns if any
-        df = df.select_dtypes(include=[np.number])
-
-        # Define features and label
-        X = df.drop('label', axis=1)
-        y = df['label']
+        # Same features as the API builds
+        pipeline, X, y = training_arrays(df)
 
         # Split
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.25, random_state=42)
@@ -50,6 +43,7 @@ def train_model(df):
         # Train
         model = RandomForestClassifier(n_estimators=100, random_state=42)
         model.fit(X_train, y_train)
+        pipeline.stamp(model)
 
         # Predict
         y_pred = model.predict(X_test)
@@ -59,7 +53,7 @@ def train_model(df):
         prec = precision_score(y_test, y_pred, zero_division=0)
         rec = recall_score(y_test, y_pred, zero_division=0)
         f1 = f1_score(y_test, y_pred, zero_division=0)
-        tn, fp, fn, tp = confusion_matrix(y_test, y_pred).ravel()
+        tn, fp, fn, tp = confusion_matrix(y_test, y_pred, labels=[0, 1]).ravel()
 
         print("\nMODEL PERFORMANCE:")
         print(f"Accuracy: {acc:.2f}")
@@ -68,9 +62,9 @@ def train_model(df):
         print(f"F1 Score: {f1:.2f}")
         print(f"Confusion Matrix — TP: {tp}, TN: {tn}, FP: {fp}, FN: {fn}")
 
-        # Save model
-        joblib.dump(model, "rf_dengue_model.pkl")
-        print("\nModel saved as rf_dengue_model.pkl!")
+        # Save model and the matching barangay encoder
+        save_model_files(model, "rf_dengue_model.pkl", pipeline.to_encoder(), "barangay_encoder.pkl")
+        print("\nModel saved as rf_dengue_model.pkl (encoder: barangay_encoder.pkl)!")
 
     except Exception as e:
         print(f"Error during training: {e}")
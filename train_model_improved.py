@@ -11,8 +11,13 @@ import joblib
 from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix, classification_report
-from sklearn.preprocessing import LabelEncoder
 from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+from columnar_store import load_history_frame
+from model_bundle import save_model_files
+from feature_pipeline import FEATURE_NAMES, training_arrays
 
 def load_and_merge_data(climate_file, cases_file):
     """Load and merge climate and dengue case data PER BARANGAY"""
@@ -20,12 +25,10 @@ def load_and_merge_data(climate_file, cases_file):
 
     try:
         # Load climate data
-        climate = pd.read_csv(climate_file)
-        climate['date'] = pd.to_datetime(climate['date'], errors='coerce')
+        climate = load_history_frame(climate_file, "climate")
 
         # Load dengue cases
-        dengue = pd.read_csv(cases_file)
-        dengue['date'] = pd.to_datetime(dengue['date'], errors='coerce')
+        dengue = load_history_frame(cases_file, "dengue", columns=['date', 'barangay', 'cases'])
 
         # Merge climate with dengue cases (keeping barangay information!)
         # This creates one row per date per barangay
@@ -67,24 +70,17 @@ def train_model_with_barangay(df, use_barangay_as_feature=True):
     print("\n🔁 Training Random Forest model with barangay data...")
 
     try:
-        # Encode barangay as numeric feature
-        le = LabelEncoder()
-        df_encoded = df.copy()
-        df_encoded['barangay_encoded'] = le.fit_transform(df['barangay'])
-        
-        # Get numeric columns
-        df_numeric = df_encoded.select_dtypes(include=[np.number])
-        
         if use_barangay_as_feature:
             # Use barangay as a feature (one model)
             print("\n📋 Using barangay as a feature (single model for all barangays)")
             
-            # Features: rainfall, temperature, humidity, barangay_encoded
-            # Label: cases > 0 (binary) OR actual case count
-            X = df_numeric[['rainfall', 'temperature', 'humidity', 'barangay_encoded']]
-            y_binary = (df_numeric['cases'] > 0).astype(int)  # Binary classification
+            # Features: rainfall, temperature, humidity, barangay_encoded (the API's feature pipeline)
+            # Label: cases > 0 (binary)
+            pipeline, X, y_binary = training_arrays(df.reset_index(drop=True))
+            le = pipeline.to_encoder()
             
-            print(f"   Features: {list(X.columns)}")
+            print(f"   Features: {FEATURE_NAMES}")
+            print(f"   Feature schema: {pipeline.fingerprint}")
             print(f"   Samples: {len(X)}")
             print(f"   Outbreak cases: {y_binary.sum()} ({y_binary.mean()*100:.1f}%)")
             
@@ -106,6 +102,7 @@ def train_model_with_barangay(df, use_barangay_as_feature=True):
             
             print(f"\n🌳 Training with {model.n_estimators} trees...")
             model.fit(X_train, y_train)
+            pipeline.stamp(model)
             
             # Predictions
             y_pred = model.predict(X_test)
@@ -137,9 +134,8 @@ def train_model_with_barangay(df, use_barangay_as_feature=True):
             print("\n" + "="*60)
             print("🎯 FEATURE IMPORTANCE")
             print("="*60)
-            feature_names = list(X.columns)
             feature_importance = pd.DataFrame({
-                'feature': feature_names,
+                'feature': FEATURE_NAMES,
                 'importance': model.feature_importances_
             }).sort_values('importance', ascending=False)
             
@@ -150,13 +146,13 @@ def train_model_with_barangay(df, use_barangay_as_feature=True):
             model_path = Path(__file__).parent / "rf_dengue_model.pkl"
             encoder_path = Path(__file__).parent / "barangay_encoder.pkl"
             
-            joblib.dump(model, model_path)
-            joblib.dump(le, encoder_path)
+            # Both written to temp files first, then renamed together (a running API hot-reloads the pair)
+            save_model_files(model, model_path, le, encoder_path)
             
             print(f"\n✅ Model saved to: {model_path}")
             print(f"✅ Encoder saved to: {encoder_path}")
             print(f"   Model type: {type(model).__name__}")
-            print(f"   Features: {list(X.columns)}")
+            print(f"   Features: {FEATURE_NAMES}")
             print(f"   Barangay mapping:")
             for i, barangay in enumerate(le.classes_):
                 print(f"     {i} = {barangay}")